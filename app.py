@@ -1,216 +1,485 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
-import plotly.express as px
-import pandas as pd
+import flask
+from dash import dcc, html, Input, Output, State, dash_table, ClientsideFunction
 import dash_bootstrap_components as dbc 
 
-from modules.data_preparer import prepare_merged_data
-from modules.analyzer import analyze_country_gdp, analyze_comparison, analyze_world_data, analyze_continent_growth
-from modules.visualizer import create_layout
+from modules.logs import configure_logging
+from modules.ingestion import Dataset
+from modules.analyzer import analyze_world_data, analyze_ranking, selection_kpis
+from modules.visualizer import create_layout, data_control_props, DEFAULT_RANKING_N
+from modules.data_table import table_page, leaderboard_rows
+from modules.figure_cache import FIGURES, figure_key
+from modules.analytics_store import get_store
+from modules.downsampling import MAX_POINTS_PER_TRACE, zoom_range
+from modules.api import create_api
+from modules.health import create_health
+from modules.transport import COMPRESSION, AssetManifest, install_compression
+from modules.background import create_manager, is_heavy, POLL_INTERVAL_MS as BACKGROUND_POLL_MS
+from modules.presets import SelectionWarmer, expand_presets, has_presets, preset_groups
+from modules.profiling import install as install_profiling, profiled_callback
+from modules import figures
 
 # --- 1. Cargar y Preparar Datos ---
-GDP_DATA_PATH = 'data/2020-2025.csv'
-POP_DATA_PATH = 'data/world_population.csv' 
-df = prepare_merged_data(GDP_DATA_PATH, POP_DATA_PATH)
+# Registros de la carga de datos (incidencias por fichero y bloque) a stderr;
+# VIZPIB_LOG_FORMAT=json para una línea JSON por registro
+configure_logging()
+# Rutas configurables (p. ej. los benchmarks apuntan a datos sintéticos)
+GDP_DATA_PATH = os.environ.get('VIZPIB_GDP_PATH', 'data/2020-2025.csv')
+POP_DATA_PATH = os.environ.get('VIZPIB_POP_PATH', 'data/world_population.csv')
+# 'eager': importar app.py prepara los datos, el layout y los grupos
+# predefinidos (con `gunicorn --preload`, una sola vez para todos los workers).
+# 'lazy': el import solo define la aplicación y la primera petición (p. ej. la
+# sonda /health) lanza esa preparación en un hilo; hasta que termina, /health
+# responde 503 y los callbacks esperan. Para workers sin --preload, que así
+# aceptan conexiones enseguida.
+STARTUP_MODE = os.environ.get('VIZPIB_STARTUP', 'eager')
+# DATASET incorpora en caliente los ficheros de PIB que se añadan a data/;
+# los callbacks leen siempre DATASET.current().
+DATASET = Dataset(GDP_DATA_PATH, POP_DATA_PATH, lazy=STARTUP_MODE == 'lazy')
+DATASET.on_change(lambda dataset: FIGURES.clear())
+
+# 'clientside': el mapa viaja una vez con todos los años y el slider solo cambia `z`
+# en el navegador. 'server': una figura completa por cada posición del slider.
+MAP_MODE = os.environ.get('VIZPIB_MAP_MODE', 'clientside')
+
+# Selecciones grandes en procesos aparte; None si faltan las dependencias opcionales.
+# Los resultados se reutilizan mientras no cambie el contenido del dataset.
+BACKGROUND = create_manager(
+    os.path.join(os.path.dirname(GDP_DATA_PATH), 'cache', 'background'), cache_by=[lambda: DATASET.tag]
+)
 
 # --- 2. Inicializar la Aplicación Dash ---
+# style.css y clientside.js se enlazan por su huella de contenido (URL nueva en
+# cada cambio, caché inmutable en el navegador) en lugar de con el ?m=<mtime>
+# de Dash, que los navegadores revalidan en cada carga.
+ASSETS = AssetManifest(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets'))
 # --- CAMBIO: Se cambia el tema a DARKLY para el modo oscuro ---
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
+app = dash.Dash(
+    __name__,
+    external_stylesheets=[dbc.themes.DARKLY, ASSETS.url('style.css')],
+    external_scripts=[ASSETS.url('clientside.js')],
+    assets_ignore=r'\.(css|js)$',
+)
 server = app.server
-app.layout = create_layout(df)
+server.register_blueprint(ASSETS.blueprint())
+# Respuestas de los callbacks, layout y dependencias comprimidas (brotli o
+# gzip). Antes que el resto de hooks: Flask ejecuta el último registrado primero.
+install_compression(server)
+
+def ranking_outputs(df, metric_type, year, n, countries=()):
+    """Pie (cacheado) y filas de la clasificación para una métrica, un año y un top `n`."""
+    fig_pie = FIGURES.get_or_build(
+        figure_key('distribution_pie', metric_type, year=year, variant=n),
+        figures.distribution_pie_figure, df, metric_type, year, n
+    )
+    return fig_pie, leaderboard_rows(analyze_ranking(df, metric_type, year, n, countries), metric_type)
+
+def build_layout(df, version):
+    """
+    Layout completo para una versión del dataset. Las salidas que no dependen
+    de la selección (mapa, pie, clasificación y controles) se envían ya
+    construidas con él; solo se vuelven a enviar si cambia la versión del
+    dataset o el usuario cambia sus selectores.
+    """
+    population_map = figures.population_map_frames_figure(df) if MAP_MODE == 'clientside' else None
+    pie, leaderboard = ranking_outputs(df, 'total', int(get_store(df).years[-1]), DEFAULT_RANKING_N)
+    return create_layout(
+        df, population_map=population_map, distribution_pie=pie, leaderboard=leaderboard,
+        refresh_seconds=DATASET.poll_seconds, data_version=version
+    )
+
+# Último layout construido, por versión del dataset, y su JSON: las cargas de
+# página siguientes lo reutilizan tal cual
+LAYOUT = {'version': None, 'layout': None, 'json': (None, None)}
+LAYOUT_LOCK = threading.Lock()
+
+def layout_for(df, version):
+    with LAYOUT_LOCK:
+        if LAYOUT['version'] != version or LAYOUT['layout'] is None:
+            LAYOUT.update(version=version, layout=build_layout(df, version))
+        return LAYOUT['layout']
+
+@lru_cache(maxsize=1)
+def skeleton_layout():
+    """Los mismos componentes sin datos: lo que valida Dash antes de que estén listos."""
+    return create_layout(None, refresh_seconds=DATASET.poll_seconds)
+
+def serve_layout():
+    """
+    `app.layout`: Dash lo llama en cada carga de página. Sin datos todavía solo
+    se espera por ellos si es una carga de página (/_dash-layout); a la
+    validación que hace Dash al asignarlo y en la primera petición le basta el
+    esqueleto, así que no bloquea el arranque.
+    """
+    if not DATASET.ready and not (flask.has_request_context() and flask.request.path.endswith('/_dash-layout')):
+        return skeleton_layout()
+    df, version, _ = DATASET.snapshot()
+    return layout_for(df, version)
+
+app.layout = serve_layout
+
+@server.before_request
+def serve_layout_json():
+    """
+    /_dash-layout desde el JSON ya serializado de la versión vigente. Dash
+    vuelve a serializar el layout en cada petición (~350 ms en la escala grande,
+    por el mapa y las opciones de países); aquí se hace una vez por versión,
+    con el propio `app.serve_layout` de Dash.
+    """
+    if not flask.request.path.endswith('/_dash-layout') or not DATASET.ready:
+        return None
+    version = DATASET.snapshot()[1]
+    json_version, body = LAYOUT['json']
+    if json_version != version:
+        body = app.serve_layout().get_data()
+        LAYOUT['json'] = (version, body)
+    return flask.Response(body, mimetype='application/json')
+
+# /health: 503 hasta que los datos, el layout y los grupos predefinidos están listos
+server.register_blueprint(create_health(DATASET))
+# API de solo lectura (JSON/CSV con ETag) para servicios que consultan los datos sin el dashboard
+server.register_blueprint(create_api(DATASET))
+# Tiempos por callback y fase, bytes por Output: /metrics (Prometheus) y /debug/profile,
+# solo con VIZPIB_PROFILE_ENDPOINTS=1 (ver modules.profiling)
+install_profiling(server, extra_metrics=lambda: FIGURES.prometheus() + COMPRESSION.prometheus())
 
 # --- 3. Lógica de Interacción (Callbacks) ---
 
-# Variable global para el template de Plotly
-PLOTLY_TEMPLATE = "plotly_dark"
+# Las figuras se construyen en `modules.figures` y se memorizan en FIGURES,
+# indexadas por (callback, métrica, países ordenados, año).
+
+def selection_keys(selected_countries, metric_type):
+    """Claves en FIGURES de todo lo que muestra una selección: evolución, KPIs y barras de crecimiento."""
+    return (
+        figure_key('update_dynamic_content', metric_type, selected_countries),
+        figure_key('selection_kpis', metric_type, selected_countries),
+        figure_key('update_growth_comparison', 'total', selected_countries),
+    )
+
+def warm_selection(df, selected_countries, pinned=False):
+    """
+    Calcula la selección completa para las dos métricas y la guarda en FIGURES.
+    Si entretanto han cambiado los datos no guarda nada: serían figuras viejas.
+    """
+    entries = []
+    for metric_type in ('total', 'per_capita'):
+        fig_key, kpi_key, _ = selection_keys(selected_countries, metric_type)
+        entries.append((fig_key, figures.country_evolution_figure(df, selected_countries, metric_type)))
+        entries.append((kpi_key, selection_kpis(df, selected_countries, metric_type)))
+    entries.append((selection_keys(selected_countries, 'total')[2], figures.growth_comparison_figure(df, selected_countries)))
+    if df is not DATASET.df:
+        return
+    for key, value in entries:
+        FIGURES.put(key, value, pinned=pinned)
+
+def selection_cached(selected_countries, metric_type):
+    """True si la selección se puede servir entera desde FIGURES (p. ej. un grupo predefinido)."""
+    return all(key in FIGURES for key in selection_keys(selected_countries, metric_type))
+
+def requested_countries(df, selected_countries):
+    """Selección del desplegable con los grupos predefinidos sustituidos por sus países."""
+    if not has_presets(selected_countries):
+        return selected_countries
+    return expand_presets(selected_countries, preset_groups(df))
+
+def prepare_startup(dataset):
+    """Grupos predefinidos y layout inicial, antes de dar los datos por listos."""
+    WARMER.warm_groups(dataset.df)
+    layout_for(dataset.df, dataset.version)
 
-# Callback para el contenido dinámico (KPIs y Gráfico Principal)
+# Grupos predefinidos (G7, BRICS, UE, las 10 mayores economías): se precalculan
+# al tener los datos, antes de servir nada, y otra vez cada vez que cambian. Las
+# selecciones de usuario que se repiten se precalculan igual (ver SelectionWarmer).
+WARMER = SelectionWarmer(warm_selection)
+DATASET.on_ready(prepare_startup)
+DATASET.on_change(lambda dataset: WARMER.rewarm_groups(dataset.df))
+
+# Callback para el contenido dinámico (KPIs y Gráfico Principal).
+# Las selecciones grandes no se calculan aquí: se deja la petición en
+# 'background-request' y la resuelve `compute_background_selection`.
 @app.callback(
     Output('gdp-evolution-graph', 'figure'),
     Output('kpi-gdp-actual', 'children'),
     Output('kpi-max-gdp', 'children'),
     Output('kpi-min-gdp', 'children'),
     Output('kpi-avg-growth', 'children'),
+    Output('evolution-view', 'data'),
+    Output('background-request', 'data'),
+    Output('background-trigger', 'data'),
     Input('apply-button', 'n_clicks'),
     State('country-dropdown', 'value'),
     Input('metric-selector', 'value')
 )
+@profiled_callback
 def update_dynamic_content(n_clicks, selected_countries, metric_type):
-    
+    df = DATASET.current()
+    no_request = (dash.no_update, dash.no_update)
+
     # --- Lógica de estado inicial (VISTA MUNDIAL) ---
     if n_clicks == 0:
         world_metrics = analyze_world_data(df)
-        fig_line = px.line(
-            world_metrics['world_total_gdp'], x='Año', y='PIB (Billones USD)',
-            title='Evolución del PIB Mundial Total', markers=True,
-            template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
+        fig_line = FIGURES.get_or_build(
+            figure_key('update_dynamic_content'), figures.world_evolution_figure, df
         )
-        fig_line.update_layout(margin=dict(l=20, r=20, t=40, b=20))
         
         kpi_actual = f"Mundial: {world_metrics['gdp_actual']:,.0f} B"
         kpi_max = f"Mundial: {world_metrics['max_gdp']['value']:,.0f} B"
         kpi_min = f"Mundial: {world_metrics['min_gdp']['value']:,.0f} B"
         kpi_growth = f"Mundial: {world_metrics['avg_growth_percent']}%"
-        return fig_line, kpi_actual, kpi_max, kpi_min, kpi_growth
+        return (fig_line, kpi_actual, kpi_max, kpi_min, kpi_growth, None, *no_request)
 
     # --- Lógica de Interacción del Usuario ---
-    prefix = 'GDP_' if metric_type == 'total' else 'GDP_per_capita_'
-    y_axis_label = 'PIB (Billones USD)' if metric_type == 'total' else 'PIB Per Cápita (USD)'
-    title_suffix = 'PIB Total' if metric_type == 'total' else 'PIB Per Cápita'
-    value_format = '{:,.2f} B' if metric_type == 'total' else '${:,.0f}'
-
     if not selected_countries:
-        empty_fig = px.line(
-            title='Seleccione países y presione "Aplicar"', 
-            template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
-        ) 
-        return empty_fig, "N/A", "N/A", "N/A", "N/A"
-
-    comparison_df = df[df['Country'].isin(selected_countries)]
-    
-    if metric_type == 'total':
-        gdp_cols = [col for col in df.columns if col.startswith(prefix) and 'per_capita' not in col]
-    else:
-        gdp_cols = [col for col in df.columns if col.startswith(prefix)]
-    
-    melted_df = comparison_df.melt(id_vars=['Country'], value_vars=gdp_cols, var_name='Año', value_name=y_axis_label)
-    melted_df['Año'] = melted_df['Año'].str.replace(prefix, '').str.replace('_', ' ')
-    
-    fig_line = px.line(
-        melted_df, x='Año', y=y_axis_label, color='Country', 
-        title=f'Evolución del {title_suffix}', markers=True,
-        template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
-    )
-    fig_line.update_layout(margin=dict(l=20, r=20, t=40, b=20), legend_title_text='Países')
-    
-    if len(selected_countries) == 1:
-        metrics = analyze_country_gdp(df, selected_countries[0], metric_type)
-        kpi_actual = value_format.format(metrics['gdp_actual'])
-        kpi_max = f"{value_format.format(metrics['max_gdp']['value'])} ({metrics['max_gdp']['year']})"
-        kpi_min = f"{value_format.format(metrics['min_gdp']['value'])} ({metrics['min_gdp']['year']})"
-        kpi_growth = f"{metrics['avg_growth_percent']}% anual"
-    else:
-        comp_metrics = analyze_comparison(df, selected_countries, metric_type)
-        max_gdp_data = comp_metrics['overall_max_gdp']
-        min_gdp_data = comp_metrics['overall_min_gdp']
-        growth_data = comp_metrics['highest_growth']
-        kpi_actual = "Comparación"
-        kpi_max = f"{max_gdp_data['country']}: {value_format.format(max_gdp_data['max_gdp']['value'])}"
-        kpi_min = f"{min_gdp_data['country']}: {value_format.format(min_gdp_data['min_gdp']['value'])}"
-        kpi_growth = f"{growth_data['country']}: {growth_data['avg_growth_percent']}%"
-
-    return fig_line, kpi_actual, kpi_max, kpi_min, kpi_growth
-
-# Callback para el contenido "estático"
+        empty_fig = FIGURES.get_or_build(
+            figure_key('update_dynamic_content', 'empty'), figures.empty_evolution_figure
+        )
+        return (empty_fig, "N/A", "N/A", "N/A", "N/A", None, *no_request)
+
+    selected_countries = requested_countries(df, selected_countries)
+    view = {'countries': sorted(selected_countries), 'metric': metric_type}
+    WARMER.record(df, selected_countries)
+    if is_heavy(selected_countries, BACKGROUND) and not selection_cached(selected_countries, metric_type):
+        return (dash.no_update, *("Calculando...",) * 4, dash.no_update, view, time.time_ns())
+
+    fig_key, kpi_key, _ = selection_keys(selected_countries, metric_type)
+    fig_line = FIGURES.get_or_build(fig_key, figures.country_evolution_figure, df, selected_countries, metric_type)
+    kpis = FIGURES.get_or_build(kpi_key, selection_kpis, df, selected_countries, metric_type)
+    return (fig_line, *kpis, view, *no_request)
+
+# Callback para la comparación de crecimiento: la única salida inferior que depende
+# de la selección. El pie no depende de ella y viaja con el layout (ver más abajo).
 @app.callback(
-    Output('gdp-distribution-pie', 'figure'),
     Output('growth-comparison-bar', 'figure'),
-    Output('raw-data-table', 'data'),
-    Output('raw-data-table', 'columns'),
     Input('apply-button', 'n_clicks'),
     State('country-dropdown', 'value')
 )
-def update_static_content(n_clicks, selected_countries):
-    # --- Lógica de la tabla ---
-    table_df = df.copy()
-    if 'Continent' in table_df.columns:
-        table_df = table_df.drop(columns=['Continent'])
-
-    total_gdp_cols = [col for col in table_df.columns if col.startswith('GDP_') and 'per_capita' not in col]
-    per_capita_cols = [col for col in table_df.columns if col.startswith('GDP_per_capita_')]
-    pop_cols = [col for col in table_df.columns if col.startswith('Population')]
-
-    for col in total_gdp_cols:
-        table_df[col] = table_df[col].apply(lambda x: f'{x:,.2f} B' if pd.notna(x) else x)
-    for col in per_capita_cols:
-        table_df[col] = table_df[col].apply(lambda x: f'${x:,.0f}' if pd.notna(x) else x)
-    for col in pop_cols:
-            table_df[col] = table_df[col].apply(lambda x: f'{x:,.0f}' if pd.notna(x) else x)
-
-    table_df.fillna('N/A', inplace=True)
-    
-    table_data = table_df.to_dict('records')
-    table_columns = [{"name": i, "id": i} for i in table_df.columns]
-    
-    # --- Lógica de los gráficos ---
-    df_2025 = df.sort_values(by='GDP_2025', ascending=False)
-    top_5 = df_2025.head(5)
-    others_gdp = df_2025.iloc[5:]['GDP_2025'].sum()
-    others_row_df = pd.DataFrame([{'Country': 'Otros', 'GDP_2025': others_gdp}])
-    plot_df_pie = pd.concat([top_5, others_row_df], ignore_index=True)
-    
-    fig_pie = px.pie(
-        plot_df_pie, names='Country', values='GDP_2025', 
-        title='Distribución GDP Mundial 2025 (Total)', hole=0.4,
-        template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
-    ) 
-
+@profiled_callback
+def update_growth_comparison(n_clicks, selected_countries):
+    df = DATASET.current()
     if n_clicks == 0:
-        world_metrics = analyze_world_data(df)
-        fig_bar = px.bar(
-            world_metrics['world_growth_data'], x='Año', y='Crecimiento (%)',
-            title='Crecimiento Anual del PIB Mundial (%)',
-            template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
-        )
-    elif not selected_countries:
-        fig_bar = px.bar(
-            title='Comparación de Crecimiento Anual (%)', 
-            template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
+        return FIGURES.get_or_build(figure_key('update_growth_comparison'), figures.world_growth_figure, df)
+    if not selected_countries:
+        return FIGURES.get_or_build(figure_key('update_growth_comparison', 'empty'), figures.empty_growth_figure)
+    selected_countries = requested_countries(df, selected_countries)
+    key = figure_key('update_growth_comparison', 'total', selected_countries)
+    if is_heavy(selected_countries, BACKGROUND) and key not in FIGURES:
+        return dash.no_update  # Lo calcula `compute_background_selection`
+    return FIGURES.get_or_build(key, figures.growth_comparison_figure, df, selected_countries)
+
+# Elegir un grupo predefinido en el desplegable lo sustituye por sus países,
+# que el usuario puede seguir editando.
+@app.callback(
+    Output('country-dropdown', 'value'),
+    Input('country-dropdown', 'value'),
+    prevent_initial_call=True
+)
+@profiled_callback
+def expand_country_presets(selected_countries):
+    if not has_presets(selected_countries):
+        return dash.no_update
+    return requested_countries(DATASET.current(), selected_countries)
+
+# Comparaciones grandes en un proceso aparte (DiskcacheManager): el worker de
+# gunicorn queda libre, la barra de progreso de los KPIs muestra la fase y un
+# cambio en la selección cancela el cálculo. El resultado se guarda en disco
+# por selección y versión de los datos, así que repetirla no vuelve a calcularla.
+# Corre fuera del proceso, por eso no lleva `profiled_callback`.
+if BACKGROUND is not None:
+    @app.callback(
+        Output('gdp-evolution-graph', 'figure', allow_duplicate=True),
+        Output('kpi-gdp-actual', 'children', allow_duplicate=True),
+        Output('kpi-max-gdp', 'children', allow_duplicate=True),
+        Output('kpi-min-gdp', 'children', allow_duplicate=True),
+        Output('kpi-avg-growth', 'children', allow_duplicate=True),
+        Output('evolution-view', 'data', allow_duplicate=True),
+        Output('growth-comparison-bar', 'figure', allow_duplicate=True),
+        Input('background-trigger', 'data'),
+        State('background-request', 'data'),
+        background=True,
+        manager=BACKGROUND,
+        running=[(Output('kpi-progress-row', 'style'), {'display': 'flex'}, {'display': 'none'})],
+        progress=[Output('kpi-progress', 'value'), Output('kpi-progress', 'label')],
+        progress_default=[0, ''],
+        cancel=[Input('country-dropdown', 'value')],
+        cache_args_to_ignore=[0],
+        interval=BACKGROUND_POLL_MS,
+        prevent_initial_call=True
+    )
+    def compute_background_selection(set_progress, trigger, request):
+        df = DATASET.current()
+        countries, metric_type = request['countries'], request['metric']
+
+        set_progress((1, 'Métricas'))
+        kpis = selection_kpis(df, countries, metric_type)
+        set_progress((2, 'Evolución'))
+        fig_line = figures.country_evolution_figure(df, countries, metric_type)
+        set_progress((3, 'Crecimiento anual'))
+        fig_bar = figures.growth_comparison_figure(df, countries)
+        return (fig_line, *kpis, request, fig_bar)
+
+def projected(df, fig, countries, metric_type, model, horizon, multiplier):
+    """`fig` con la proyección elegida encima, o sin proyección si no hay ninguna."""
+    if not model or model == 'none':
+        return figures.without_projection(fig) if isinstance(fig, dict) else fig
+    return figures.projection_figure(fig, df, countries, metric_type, model, horizon, multiplier)
+
+# Al hacer zoom sobre series largas (reducidas con LTTB) se piden los puntos
+# reales de la ventana visible; al volver a la vista completa, la versión reducida.
+@app.callback(
+    Output('gdp-evolution-graph', 'figure', allow_duplicate=True),
+    Input('gdp-evolution-graph', 'relayoutData'),
+    State('evolution-view', 'data'),
+    State('projection-model', 'value'),
+    State('projection-horizon', 'value'),
+    State('projection-multiplier', 'value'),
+    prevent_initial_call=True
+)
+@profiled_callback
+def refine_evolution_window(relayout_data, view, model, horizon, multiplier):
+    x_range = zoom_range(relayout_data)
+    if not view or x_range is None:
+        return dash.no_update
+    df = DATASET.current()
+    countries, metric_type = view['countries'], view['metric']
+    if len(get_store(df).metrics[metric_type].years) <= MAX_POINTS_PER_TRACE:
+        return dash.no_update  # La figura ya tiene todos los puntos
+    if x_range == 'auto':
+        fig = FIGURES.get_or_build(
+            figure_key('update_dynamic_content', metric_type, countries),
+            figures.country_evolution_figure, df, countries, metric_type
         )
     else:
-        comparison_df = df[df['Country'].isin(selected_countries)]
-        gdp_cols = [col for col in df.columns if col.startswith('GDP_') and 'per_capita' not in col]
-        growth_df = comparison_df[gdp_cols].pct_change(axis='columns', fill_method=None) * 100
-        growth_df['Country'] = comparison_df['Country']
-        melted_growth_df = growth_df.melt(id_vars=['Country'], value_vars=[col for col in gdp_cols if col != 'GDP_2020'], var_name='Año', value_name='Crecimiento (%)')
-        melted_growth_df['Año'] = melted_growth_df['Año'].str.replace('GDP_', '')
-        
-        fig_bar = px.bar(
-            melted_growth_df, x='Año', y='Crecimiento (%)', color='Country', 
-            barmode='group', title='Comparación de Crecimiento Anual (%)',
-            template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
-        )
-    
-    return fig_pie, fig_bar, table_data, table_columns
+        fig = figures.country_evolution_figure(df, countries, metric_type, x_range)
+    return projected(df, fig, countries, metric_type, model, horizon, multiplier)
+
+# Proyección de la selección sobre el gráfico principal. Se redibuja al cambiar
+# el modelo, los años o el multiplicador del escenario y cada vez que llega una
+# selección nueva. Los parámetros de cada modelo se ajustan una sola vez por
+# métrica para todos los países (ver AnalyticsStore.projection): mover el
+# slider solo los vuelve a aplicar. La evolución de base es la figura que ya
+# tiene el cliente, sin la proyección anterior: reconstruirla aquí, si no
+# estuviera en FIGURES, sacaría del proceso de fondo las selecciones grandes.
+@app.callback(
+    Output('gdp-evolution-graph', 'figure', allow_duplicate=True),
+    Input('projection-model', 'value'),
+    Input('projection-horizon', 'value'),
+    Input('projection-multiplier', 'value'),
+    Input('evolution-view', 'data'),
+    State('gdp-evolution-graph', 'figure'),
+    prevent_initial_call=True
+)
+@profiled_callback
+def update_projection(model, horizon, multiplier, view, current_figure):
+    if not view or not current_figure or (model == 'none' and dash.ctx.triggered_id == 'evolution-view'):
+        return dash.no_update  # Vista mundial, o la selección nueva ya se ha dibujado sin proyección
+    df = DATASET.current()
+    countries, metric_type = view['countries'], view['metric']
+    return projected(df, current_figure, countries, metric_type, model, horizon, multiplier)
+
+# Callback para la tabla de datos (paginación, orden y filtro en el servidor)
+@app.callback(
+    Output('raw-data-table', 'data'),
+    Output('raw-data-table', 'page_count'),
+    Input('raw-data-table', 'page_current'),
+    Input('raw-data-table', 'page_size'),
+    Input('raw-data-table', 'sort_by'),
+    Input('raw-data-table', 'filter_query')
+)
+@profiled_callback
+def update_table(page_current, page_size, sort_by, filter_query):
+    df = DATASET.current()
+    return table_page(df, page_current, page_size, sort_by, filter_query)
 
 # Callback para continentes
 @app.callback(
     Output('continent-growth-bar', 'figure'),
     Input('continent-year-selector', 'value')
 )
+@profiled_callback
 def update_continent_growth(selected_year):
-    continent_growth_df = analyze_continent_growth(df, selected_year)
-    fig_continent = px.bar(
-        continent_growth_df, x='Growth', y='Continent', orientation='h', 
-        title=f"Crecimiento Promedio por Continente ({selected_year})",
-        template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
+    df = DATASET.current()
+    return FIGURES.get_or_build(
+        figure_key('update_continent_growth', year=selected_year), figures.continent_growth_figure, df, selected_year
     )
-    fig_continent.update_layout(margin=dict(l=20, r=20, t=40, b=20), yaxis={'categoryorder':'total ascending'})
-    fig_continent.update_traces(text=continent_growth_df['Growth'].apply(lambda x: f'{x:.2f}%'), textposition='outside')
-    return fig_continent
 
-# Callback para el Mapa de Calor de Población
+# Callback para el pie de distribución y la clasificación: top N de la métrica
+# y el año elegidos, leídos del índice de rankings, más los países de la
+# selección aplicada. También se redibujan cuando cambia la versión del dataset.
 @app.callback(
-    Output('population-heatmap', 'figure'),
-    Input('map-year-slider', 'value')
+    Output('gdp-distribution-pie', 'figure'),
+    Output('ranking-leaderboard', 'data'),
+    Input('ranking-metric', 'value'),
+    Input('ranking-year', 'value'),
+    Input('ranking-n', 'value'),
+    Input('evolution-view', 'data'),
+    Input('data-version', 'data'),
+    prevent_initial_call=True
 )
-def update_population_map(selected_year):
-    pop_col_map = f'Population_{selected_year}'
-    map_data = df.dropna(subset=['CCA3', pop_col_map])
-    fig_map = px.choropleth(
-        map_data,
-        locations="CCA3",
-        color=pop_col_map,
-        hover_name="Country",
-        color_continuous_scale=px.colors.sequential.Viridis,
-        title=f"Concentración de Población Mundial en {selected_year}",
-        template=PLOTLY_TEMPLATE # CAMBIO: Template oscuro
+@profiled_callback
+def update_ranking(metric_type, year, n, view, data_version):
+    df = DATASET.current()
+    ranking = get_store(df).rankings[metric_type]
+    if year not in ranking.year_index:
+        year = int(ranking.years[-1])
+    countries = view['countries'] if view else ()
+    return ranking_outputs(df, metric_type, year, n or DEFAULT_RANKING_N, countries)
+
+# Callback para las salidas que dependen de los datos pero no de la selección
+# (años, países y columnas). Se dispara periódicamente y solo envía cambios si
+# el dataset tiene una versión distinta de la del navegador.
+@app.callback(
+    Output('data-version', 'data'),
+    Output('country-dropdown', 'options'),
+    Output('continent-year-selector', 'options'),
+    Output('continent-year-selector', 'value'),
+    Output('raw-data-table', 'columns'),
+    Output('ranking-year', 'options'),
+    Output('ranking-year', 'value'),
+    Input('data-refresh-interval', 'n_intervals'),
+    State('data-version', 'data'),
+    State('continent-year-selector', 'value'),
+    State('ranking-year', 'value')
+)
+@profiled_callback
+def update_data_controls(n_intervals, known_version, selected_year, ranking_year):
+    df, version, _ = DATASET.snapshot()
+    if known_version == version:
+        return (dash.no_update,) * 7
+    props = data_control_props(df)
+    year_values = [option['value'] for option in props['continent_year_options']]
+    year = selected_year if selected_year in year_values else props['continent_year_value']
+    ranking_values = [option['value'] for option in props['ranking_year_options']]
+    ranking_year = ranking_year if ranking_year in ranking_values else props['ranking_year_value']
+    return (
+        version, props['country_options'], props['continent_year_options'], year, props['table_columns'],
+        props['ranking_year_options'], ranking_year
     )
-    fig_map.update_layout(
-        geo=dict(showframe=False, showcoastlines=False),
-        margin={"r":0,"t":40,"l":0,"b":0}
+
+# Callback para el Mapa de Calor de Población
+if MAP_MODE == 'clientside':
+    app.clientside_callback(
+        ClientsideFunction(namespace='population_map', function_name='switch_year'),
+        Output('population-heatmap', 'figure'),
+        Input('map-year-slider', 'value'),
+        State('population-heatmap', 'figure'),
+        prevent_initial_call=True
     )
-    return fig_map
+else:
+    @app.callback(
+        Output('population-heatmap', 'figure'),
+        Input('map-year-slider', 'value')
+    )
+    @profiled_callback
+    def update_population_map(selected_year):
+        df = DATASET.current()
+        return FIGURES.get_or_build(
+            figure_key('update_population_map', year=selected_year), figures.population_map_figure, df, selected_year
+        )
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
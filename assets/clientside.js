@@ -0,0 +1,25 @@
+// Callbacks que se ejecutan en el navegador, sin ida y vuelta al servidor.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    population_map: {
+        // Cambia el año del mapa sustituyendo solo `z` a partir de `customdata`
+        // (matriz países × años enviada una única vez con el layout).
+        switch_year: function(year, figure) {
+            if (!figure || !figure.layout || !figure.layout.meta) {
+                return window.dash_clientside.no_update;
+            }
+            const column = figure.layout.meta.years.indexOf(year);
+            if (column < 0) {
+                return window.dash_clientside.no_update;
+            }
+            const trace = figure.data[0];
+            const z = trace.customdata.map(row => row[column]);
+            const title = Object.assign({}, figure.layout.title, {
+                text: `Concentración de Población Mundial en ${year}`
+            });
+            return Object.assign({}, figure, {
+                data: [Object.assign({}, trace, {z: z})].concat(figure.data.slice(1)),
+                layout: Object.assign({}, figure.layout, {title: title})
+            });
+        }
+    }
+});
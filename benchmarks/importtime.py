@@ -0,0 +1,190 @@
+"""
+Informe de arranque de un worker en los dos modos de VIZPIB_STARTUP, sobre
+datos sintéticos (ver benchmarks/synthetic.py). Cada repetición es un proceso
+nuevo con `python -X importtime` que importa app.py y sondea /health:
+
+- import: lo que tarda `import app` (hasta entonces el worker no acepta conexiones)
+- listo: hasta que /health responde 200 (en 'eager' coincide con el import)
+- los módulos más caros del import y los que quedan para después, según -X importtime
+
+La primera ejecución de cada escala crea la caché de data/cache y no se cuenta:
+el informe refleja el arranque habitual, con la caché ya escrita.
+
+    python -m benchmarks.importtime                          # escala small
+    python -m benchmarks.importtime --scale large --save     # y escribe benchmarks/importtime_report.md
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import SCALES, write_dataset
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), 'importtime_report.md')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('eager', 'lazy')
+# Imports pesados que el modo lazy debería dejar fuera del arranque
+DEFERRED = ('plotly.express', 'pycountry_convert')
+TOP_MODULES = 10
+# Separa en la salida de -X importtime lo importado por `import app` de lo posterior
+MARKER = '@@ import app terminado'
+
+CHILD = f'''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+sys.stderr.write({MARKER!r} + '\\n')
+client = app.server.test_client()
+while True:
+    status = client.get('/health').json['status']
+    if status == 'ready':
+        break
+    if status == 'failed':
+        sys.exit('La carga de datos ha fallado.')
+    time.sleep(0.005)
+print(json.dumps({{'import': imported, 'ready': time.perf_counter() - start}}))
+'''
+
+
+# --- 1. MEDICIÓN ---
+def parse_importtime(stderr):
+    """
+    ([(módulo, nivel, acumulado µs)] del import de app, [... de después]) a
+    partir de la salida de -X importtime; el nivel es la profundidad de anidación.
+    """
+    phases, current = ([], []), 0
+    for line in stderr.splitlines():
+        if line == MARKER:
+            current = 1
+            continue
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        phases[current].append((name.strip(), level, int(cumulative)))
+    return phases
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    times = json.loads(result.stdout.strip().splitlines()[-1])
+    return times, parse_importtime(result.stderr)
+
+
+def measure_mode(mode, gdp_path, pop_path, repeat):
+    env = dict(
+        os.environ, VIZPIB_STARTUP=mode, VIZPIB_GDP_PATH=gdp_path, VIZPIB_POP_PATH=pop_path,
+        VIZPIB_DATA_POLL_SECONDS='1e9', VIZPIB_LOG_LEVEL='WARNING',
+    )
+    runs = [run_once(env) for _ in range(repeat)]
+    return {
+        'import_ms': statistics.median(times['import'] for times, _ in runs) * 1000,
+        'ready_ms': statistics.median(times['ready'] for times, _ in runs) * 1000,
+        'modules': runs[-1][1],
+    }
+
+
+# --- 2. INFORME ---
+def _loaded(modules, name):
+    """Acumulado (ms) de `name` si se importó en esa fase, o None."""
+    return next((cumulative / 1000 for module, _, cumulative in modules if module == name), None)
+
+
+def _ms(value):
+    return f'{value:,.0f} ms' if value is not None else '-'
+
+
+def report_scale(scale, repeat):
+    """Líneas markdown con las tablas de una escala."""
+    entities, years = SCALES[scale]
+    data_dir = tempfile.mkdtemp(prefix=f'vizpib-importtime-{scale}-')
+    try:
+        gdp_path, pop_path = write_dataset(data_dir, entities, years)
+        measure_mode('eager', gdp_path, pop_path, 1)  # Crea la caché de data/cache
+        results = {mode: measure_mode(mode, gdp_path, pop_path, repeat) for mode in MODES}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    lines = [
+        f'## {scale}: {entities} países × {years} años',
+        '',
+        '| modo | import app | listo (/health 200) | ' + ' | '.join(f'`{name}` en el import' for name in DEFERRED) + ' |',
+        '|---|---:|---:|' + '---:|' * len(DEFERRED),
+    ]
+    for mode, result in results.items():
+        imported, _ = result['modules']
+        lines.append(
+            f"| {mode} | {_ms(result['import_ms'])} | {_ms(result['ready_ms'])} | "
+            + ' | '.join(_ms(_loaded(imported, name)) for name in DEFERRED) + ' |'
+        )
+
+    imported, deferred = results['lazy']['modules']
+    ipython = _loaded(imported, 'IPython')
+    if ipython is not None:
+        # dash/_jupyter.py lo importa si está instalado; requirements.txt no lo incluye
+        lines += ['', f'IPython está instalado en este entorno y `dash` lo importa al importarse ({_ms(ipython)}).']
+    lines += [
+        '',
+        f'Modo lazy: imports directos más caros de `import app` (acumulado, {TOP_MODULES} primeros)',
+        '',
+        '| módulo | acumulado |',
+        '|---|---:|',
+    ]
+    top = sorted((entry for entry in imported if entry[1] == 1), key=lambda entry: -entry[2])[:TOP_MODULES]
+    lines += [f'| `{name}` | {_ms(cumulative / 1000)} |' for name, _, cumulative in top]
+    lines += [
+        '',
+        f'Modo lazy: importados después, al preparar los datos y las primeras figuras ({TOP_MODULES} primeros)',
+        '',
+        '| módulo | acumulado |',
+        '|---|---:|',
+    ]
+    later = sorted((entry for entry in deferred if entry[1] == 0), key=lambda entry: -entry[2])[:TOP_MODULES]
+    lines += [f'| `{name}` | {_ms(cumulative / 1000)} |' for name, _, cumulative in later]
+    return lines + ['']
+
+
+# --- 3. PROGRAMA ---
+def main():
+    parser = argparse.ArgumentParser(description='Informe de arranque de VIZ-PIB sobre datos sintéticos.')
+    parser.add_argument('--scale', choices=sorted(SCALES), action='append', help='Escala (repetible); por defecto small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help=f'Escribe el informe en {REPORT_PATH}')
+    args = parser.parse_args()
+
+    import dash
+    import pandas as pd
+
+    lines = [
+        '# Informe de arranque',
+        '',
+        'Generado con `python -m benchmarks.importtime --save` '
+        f'(Python {platform.python_version()}, dash {dash.__version__}, pandas {pd.__version__}; '
+        f'mediana de {args.repeat} procesos por modo).',
+        "'eager' prepara datos, layout y grupos predefinidos dentro de `import app`; 'lazy' los deja para un "
+        'hilo que arranca con la primera petición (aquí, la propia sonda /health).',
+        '',
+    ]
+    for scale in args.scale or ['small']:
+        lines += report_scale(scale, args.repeat)
+
+    report = '\n'.join(lines)
+    print('\n' + report)
+    if args.save:
+        with open(REPORT_PATH, 'w', encoding='utf-8') as fh:
+            fh.write(report)
+        print(f">>> Informe guardado en {REPORT_PATH}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Informe de memoria del DataFrame preparado y del almacén analítico en tres
+representaciones, sobre datos sintéticos (ver benchmarks/synthetic.py):
+
+- 'object + float64': claves de texto como object e índice por posición (formato anterior)
+- 'categórico + float64': `compact_frame` por defecto
+- 'categórico + float32': `compact_frame` con VIZPIB_FLOAT32=1
+
+    python -m benchmarks.memory                         # todas las escalas
+    python -m benchmarks.memory --scale large --save    # y escribe benchmarks/memory_report.md
+"""
+import argparse
+import gc
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SCALES, write_dataset
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), 'memory_report.md')
+MIB = 1024 * 1024
+
+
+# --- 1. REPRESENTACIONES ---
+def variants(df):
+    """[(nombre, DataFrame)] a partir del DataFrame preparado en formato compacto float64."""
+    from modules.data_preparer import KEY_COLUMNS, compact_frame
+
+    legacy = df.astype({col: object for col in KEY_COLUMNS if col in df.columns}).reset_index(drop=True)
+    return [
+        ('object + float64', legacy),
+        ('categórico + float64', df),
+        ('categórico + float32', compact_frame(df, float32=True)),
+    ]
+
+
+# --- 2. MEDICIÓN ---
+def frame_bytes(df):
+    """
+    Bytes del DataFrame con su índice. Cada cadena y cada array de categorías
+    compartido (p. ej. entre el índice y la columna 'Country') cuenta una sola
+    vez, a diferencia de `memory_usage(deep=True)`.
+    """
+    seen, total = set(), 0
+
+    def strings(values):
+        size = 0
+        for value in values:
+            if isinstance(value, str) and id(value) not in seen:
+                seen.add(id(value))
+                size += sys.getsizeof(value)
+        return size
+
+    for values in [df.index, *(df[col] for col in df.columns)]:
+        array = values.array
+        if isinstance(array, pd.Categorical):
+            total += array.codes.nbytes
+            if id(array.categories) not in seen:
+                seen.add(id(array.categories))
+                categories = array.categories.to_numpy()
+                total += categories.nbytes + strings(categories)
+        elif isinstance(values, pd.RangeIndex):
+            continue
+        else:
+            array = values.to_numpy()
+            total += array.nbytes + (strings(array) if array.dtype == object else 0)
+    return total
+
+
+def measure(df):
+    """Bytes del DataFrame (con índice y cadenas), del almacén y pico de memoria al construir el almacén."""
+    from modules.analytics_store import AnalyticsStore
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        store = AnalyticsStore(df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    usage = store.memory_usage()
+    return {
+        'frame': frame_bytes(df),
+        'store': sum(usage.values()),
+        'store_matrices': sum(value for name, value in usage.items() if name.endswith(('.matrix', '.growth'))),
+        'build_peak': peak,
+    }
+
+
+def report_scale(scale):
+    """Líneas markdown con la tabla de una escala."""
+    from modules.data_preparer import prepare_merged_data
+
+    entities, years = SCALES[scale]
+    data_dir = tempfile.mkdtemp(prefix=f'vizpib-memory-{scale}-')
+    try:
+        gdp_path, pop_path = write_dataset(data_dir, entities, years)
+        df = prepare_merged_data(gdp_path, pop_path, use_cache=False)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    rows = [(name, measure(frame)) for name, frame in variants(df)]
+    base = rows[0][1]['frame'] + rows[0][1]['store']
+    lines = [
+        f'## {scale}: {entities} países × {years} años',
+        '',
+        '| representación | DataFrame | almacén | (matrices y crecimientos) | total | vs. object + float64 | pico al construir el almacén |',
+        '|---|---:|---:|---:|---:|---:|---:|',
+    ]
+    for name, result in rows:
+        total = result['frame'] + result['store']
+        lines.append(
+            f"| {name} | {result['frame'] / MIB:.2f} MiB | {result['store'] / MIB:.2f} MiB"
+            f" | {result['store_matrices'] / MIB:.2f} MiB | {total / MIB:.2f} MiB"
+            f" | {(total - base) / base * 100:+.0f}% | {result['build_peak'] / MIB:.2f} MiB |"
+        )
+    return lines + ['']
+
+
+# --- 3. PROGRAMA ---
+def main():
+    parser = argparse.ArgumentParser(description='Informe de memoria de VIZ-PIB sobre datos sintéticos.')
+    parser.add_argument('--scale', choices=sorted(SCALES), action='append', help='Escala (repetible); por defecto todas')
+    parser.add_argument('--save', action='store_true', help=f'Escribe el informe en {REPORT_PATH}')
+    args = parser.parse_args()
+
+    scales = args.scale or sorted(SCALES, key=lambda name: SCALES[name])
+    lines = [
+        '# Informe de memoria',
+        '',
+        'Generado con `python -m benchmarks.memory --save` '
+        f'(Python {platform.python_version()}, pandas {pd.__version__}, numpy {np.__version__}).',
+        'DataFrame: arrays, índice y cadenas, cada objeto compartido una sola vez (`frame_bytes`). Almacén: bytes de sus arrays '
+        '(`AnalyticsStore.memory_usage`). El pico se mide con tracemalloc durante `AnalyticsStore(df)`.',
+        '',
+    ]
+    for scale in scales:
+        lines += report_scale(scale)
+
+    report = '\n'.join(lines)
+    print('\n' + report)
+    if args.save:
+        with open(REPORT_PATH, 'w', encoding='utf-8') as fh:
+            fh.write(report)
+        print(f">>> Informe guardado en {REPORT_PATH}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Benchmarks del pipeline de datos, del analizador y de cada callback de app.py,
+sobre datos sintéticos con el esquema real (ver benchmarks/synthetic.py).
+
+Para cada caso se mide la mediana y el mínimo de `--repeat` ejecuciones, el pico
+de memoria (tracemalloc, en una ejecución aparte) y, en los callbacks, los bytes
+JSON de la respuesta y los que viajan comprimidos con gzip (ver modules/transport.py). Se compara contra benchmarks/baseline.json y se
+señalan los casos que empeoran más allá de la tolerancia. Los tiempos de la
+línea base solo valen en la máquina que la grabó: por defecto las regresiones
+se informan sin fallar, y con --strict (en una máquina que haya grabado su
+propia línea base) el proceso termina con código 1.
+
+    python -m benchmarks.run --scale small            # comparar con la línea base
+    python -m benchmarks.run --scale small --strict   # y fallar si algo empeora
+    python -m benchmarks.run --scale large --save     # regrabar la línea base de esa escala
+
+Cada escala se ejecuta en su propio proceso: app.py carga el dataset al importarse.
+"""
+import argparse
+import gc
+import gzip
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import SCALES, write_dataset
+from modules.transport import GZIP_LEVEL
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Tolerancias relativas frente a la línea base
+TOLERANCES = {'time_ms': 0.30, 'peak_kib': 0.20, 'payload_bytes': 0.05, 'wire_bytes': 0.05}
+# Diferencias absolutas por debajo de esto son ruido del reloj, no regresiones
+MIN_TIME_DELTA_MS = 0.5
+MIN_PEAK_DELTA_KIB = 64
+
+
+class Case:
+    """Un caso de benchmark: `func()` es lo medido; `setup()` se ejecuta antes de cada repetición sin medirse."""
+
+    def __init__(self, name, func, setup=None, payload=False):
+        self.name = name
+        self.func = func
+        self.setup = setup or (lambda: None)
+        self.payload = payload
+
+
+# --- 1. MEDICIÓN ---
+def _payload(result):
+    from plotly.io.json import to_json_plotly
+
+    outputs = result if isinstance(result, tuple) else (result,)
+    return ''.join(to_json_plotly(output) for output in outputs).encode('utf-8')
+
+
+def measure(case, repeat):
+    case.setup()
+    result = case.func()  # Calentamiento
+    times = []
+    for _ in range(repeat):
+        case.setup()
+        start = time.perf_counter()
+        result = case.func()
+        times.append(time.perf_counter() - start)
+
+    case.setup()
+    gc.collect()  # Que la basura de las repeticiones anteriores no cuente en el pico
+    tracemalloc.start()
+    try:
+        case.func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    payload = _payload(result) if case.payload else None
+    return {
+        'time_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'peak_kib': round(peak / 1024, 1),
+        'payload_bytes': len(payload) if payload is not None else None,
+        'wire_bytes': len(gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)) if payload is not None else None,
+    }
+
+
+# --- 2. CASOS ---
+def build_cases(data_dir, gdp_path, pop_path):
+    """Casos sobre el dataset sintético. Importa app.py, que carga los datos de las rutas del entorno."""
+    import app
+    from modules import analyzer
+    from modules.analytics_store import AnalyticsStore
+    from modules.data_preparer import prepare_merged_data
+    from modules.figure_cache import FIGURES
+    from modules import figures
+    from modules.projections import PROJECTION_MODELS, project
+
+    df = app.DATASET.df
+    store = AnalyticsStore(df)
+    countries = list(store.countries[:5])
+    comparison = list(store.countries[:10])
+    year = int(store.years[-1])
+    cache_dir = os.path.join(data_dir, 'cache')
+
+    def callback(name):
+        # Sin el envoltorio de Dash, pero con el resto (instrumentación incluida)
+        func = getattr(app, name)
+        return getattr(func, '__wrapped__', func)
+
+    clear = FIGURES.clear
+
+    def fit_projections():
+        for metric_type in store.metrics:
+            for model in PROJECTION_MODELS:
+                store.projection(metric_type, model)
+
+    def project_scenarios():
+        # Un movimiento del slider con todos los países y todos los modelos
+        return [project(store.projection('total', model), year, 10, 1.5) for model in PROJECTION_MODELS]
+
+    # La figura que el cliente devuelve a `update_projection` (se reutiliza: cada
+    # llamada retira la proyección anterior antes de dibujar la nueva)
+    evolution = figures.country_evolution_figure(df, comparison, 'per_capita').to_plotly_json()
+
+    def warm_presets():
+        clear()
+        app.WARMER.warm_groups(df)
+
+    cases = [
+        Case('prepare_merged_data.cold', lambda: prepare_merged_data(gdp_path, pop_path, use_cache=False)),
+        Case('prepare_merged_data.cached', lambda: prepare_merged_data(gdp_path, pop_path, cache_dir=cache_dir)),
+        Case('analytics_store.build', lambda: AnalyticsStore(df)),
+        Case('analyze_country_gdp', lambda: analyzer.analyze_country_gdp(df, countries[0], 'total')),
+        Case('analyze_comparison', lambda: analyzer.analyze_comparison(df, comparison, 'per_capita')),
+        Case('analyze_series', lambda: analyzer.analyze_series(df, comparison, 'total')),
+        Case('analyze_world_data', lambda: analyzer.analyze_world_data(df)),
+        Case('analyze_continent_growth', lambda: analyzer.analyze_continent_growth(df, year)),
+        Case('analyze_ranking', lambda: analyzer.analyze_ranking(df, 'total', year, 10, comparison)),
+        Case('projection.fit', fit_projections, lambda: store._projections.clear()),
+        Case('projection.scenario_all', project_scenarios, fit_projections),
+        Case('update_dynamic_content.world', lambda: callback('update_dynamic_content')(0, None, 'total'), clear, True),
+        Case('update_dynamic_content.single', lambda: callback('update_dynamic_content')(1, countries[:1], 'total'), clear, True),
+        Case('update_dynamic_content.compare', lambda: callback('update_dynamic_content')(1, countries, 'per_capita'), clear, True),
+        Case('update_dynamic_content.cached', lambda: callback('update_dynamic_content')(1, countries, 'per_capita'), None, True),
+        Case('update_dynamic_content.preset', lambda: callback('update_dynamic_content')(1, ['preset:Top 10'], 'total'), warm_presets, True),
+        Case('update_growth_comparison.world', lambda: callback('update_growth_comparison')(0, None), clear, True),
+        Case('update_growth_comparison.compare', lambda: callback('update_growth_comparison')(1, countries), clear, True),
+        Case('update_projection.slider', lambda: callback('update_projection')(
+            'log_linear', 10, 1.5, {'countries': comparison, 'metric': 'per_capita'}, evolution
+        ), None, True),
+        Case('update_table.first_page', lambda: callback('update_table')(0, 20, [], ''), None, True),
+        Case('update_table.sort_filter', lambda: callback('update_table')(
+            3, 20, [{'column_id': f'GDP_{year}', 'direction': 'desc'}], '{Country} icontains 1'
+        ), None, True),
+        Case('update_continent_growth', lambda: callback('update_continent_growth')(year), clear, True),
+        Case('build_layout', lambda: app.build_layout(df, app.DATASET.version), None, True),
+        Case('serve_layout.cached', app.serve_layout, None, True),
+        Case('update_data_controls', lambda: callback('update_data_controls')(0, None, None, None), clear, True),
+        Case('update_ranking.top10', lambda: callback('update_ranking')('total', year, 10, None, None), clear, True),
+        Case('update_ranking.selection', lambda: callback('update_ranking')(
+            'per_capita', year, 5, {'countries': comparison, 'metric': 'per_capita'}, None
+        ), clear, True),
+    ]
+    if hasattr(app, 'update_population_map'):
+        year_pop = int(store.pop_years[-1])
+        cases.append(Case('update_population_map', lambda: callback('update_population_map')(year_pop), clear, True))
+    else:
+        cases.append(Case('population_map_frames_figure', lambda: figures.population_map_frames_figure(df), None, True))
+    return cases
+
+
+# --- 3. LÍNEA BASE ---
+def load_baseline():
+    try:
+        with open(BASELINE_PATH, encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(scale, entities, years, results):
+    baseline = load_baseline()
+    # Con --only se actualizan solo los casos ejecutados; el resto se conserva
+    cases = baseline.get(scale, {}).get('cases', {})
+    cases.update(results)
+    baseline[scale] = {
+        'entities': entities,
+        'years': years,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': cases,
+    }
+    with open(BASELINE_PATH, 'w', encoding='utf-8') as fh:
+        json.dump(baseline, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def compare(current, reference, tolerances):
+    """Lista de (métrica, actual, base) que empeoran más allá de la tolerancia."""
+    regressions = []
+    for metric, tolerance in tolerances.items():
+        value, base = current.get(metric), (reference or {}).get(metric)
+        if value is None or not base:
+            continue
+        if metric == 'time_ms' and value - base < MIN_TIME_DELTA_MS:
+            continue
+        if metric == 'peak_kib' and value - base < MIN_PEAK_DELTA_KIB:
+            continue
+        if value > base * (1 + tolerance):
+            regressions.append((metric, value, base))
+    return regressions
+
+
+def _delta(value, base):
+    if value is None or not base:
+        return ''
+    return f'{(value - base) / base * 100:+.0f}%'
+
+
+# --- 4. PROGRAMA ---
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de VIZ-PIB sobre datos sintéticos.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='Ejecuta solo los casos cuyo nombre contenga este texto')
+    parser.add_argument('--save', action='store_true', help='Guarda los resultados como nueva línea base')
+    parser.add_argument('--strict', action='store_true', help='Termina con código 1 si hay regresiones')
+    parser.add_argument('--time-tolerance', type=float, default=TOLERANCES['time_ms'])
+    parser.add_argument('--json', help='Escribe también los resultados en este fichero')
+    args = parser.parse_args()
+
+    entities, years = SCALES[args.scale]
+    data_dir = tempfile.mkdtemp(prefix=f'vizpib-bench-{args.scale}-')
+    try:
+        gdp_path, pop_path = write_dataset(data_dir, entities, years)
+        os.environ['VIZPIB_GDP_PATH'] = gdp_path
+        os.environ['VIZPIB_POP_PATH'] = pop_path
+        os.environ.setdefault('VIZPIB_DATA_POLL_SECONDS', '1e9')
+        # Cada caso repite la misma selección: sin esto se promocionaría y su
+        # precálculo en segundo plano competiría con las mediciones
+        os.environ.setdefault('VIZPIB_PROMOTE_AFTER', '1000000000')
+        cases = build_cases(data_dir, gdp_path, pop_path)
+
+        baseline = load_baseline().get(args.scale, {})
+        reference = baseline.get('cases', {})
+        recorded_on = (baseline.get('python'), baseline.get('machine'))
+        if reference and recorded_on != (platform.python_version(), platform.machine()):
+            print(f'>>> Línea base grabada con Python {recorded_on[0]} en {recorded_on[1]}: los tiempos no son comparables')
+        tolerances = dict(TOLERANCES, time_ms=args.time_tolerance)
+        results, failures = {}, []
+        print(f"\n{'caso':<34}{'mediana ms':>12}{'mín ms':>10}{'pico KiB':>12}{'payload B':>12}{'gzip B':>10}  vs. base")
+        for case in cases:
+            if args.only and args.only not in case.name:
+                continue
+            result = measure(case, args.repeat)
+            results[case.name] = result
+            base = reference.get(case.name)
+            regressions = compare(result, base, tolerances)
+            failures += [(case.name, *regression) for regression in regressions]
+            deltas = ' '.join(filter(None, (
+                _delta(result['time_ms'], (base or {}).get('time_ms')),
+                _delta(result['peak_kib'], (base or {}).get('peak_kib')),
+                _delta(result['payload_bytes'], (base or {}).get('payload_bytes')),
+                _delta(result['wire_bytes'], (base or {}).get('wire_bytes')),
+            )))
+            flag = '  <-- REGRESIÓN' if regressions else ''
+            payload = result['payload_bytes'] if result['payload_bytes'] is not None else '-'
+            wire = result['wire_bytes'] if result['wire_bytes'] is not None else '-'
+            print(
+                f"{case.name:<34}{result['time_ms']:>12.2f}{result['min_ms']:>10.2f}{result['peak_kib']:>12.1f}"
+                f"{payload:>12}{wire:>10}  {deltas}{flag}"
+            )
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+    if args.save:
+        save_baseline(args.scale, entities, years, results)
+        print(f"\n>>> Línea base '{args.scale}' guardada en {BASELINE_PATH}")
+        return 0
+    if failures:
+        print('\n>>> Regresiones frente a la línea base:')
+        for name, metric, value, base in failures:
+            print(f'    {name}: {metric} {value} (base {base})')
+        return 1 if args.strict else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
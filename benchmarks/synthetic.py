@@ -0,0 +1,88 @@
+"""
+Generador de datos sintéticos con el mismo esquema que data/2020-2025.csv y
+data/world_population.csv, escalado a N entidades × M años.
+
+    python -m benchmarks.synthetic --entities 10000 --years 100 --out /tmp/vizpib-bench
+"""
+import argparse
+import os
+import string
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+# Escalas predefinidas: (entidades, años)
+SCALES = {
+    'small': (200, 6),
+    'medium': (2000, 30),
+    'large': (10000, 100),
+}
+CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+CENSUS_YEARS = [2022, 2020, 2015, 2010, 2000, 1990, 1980, 1970]
+# Fracción de celdas de PIB vacías, como los huecos del CSV real
+MISSING_RATE = 0.03
+
+
+def _codes(count):
+    """Códigos CCA3 únicos: AAA, AAB, ... (hasta 26³ entidades)."""
+    letters = string.ascii_uppercase
+    return [''.join(code) for code, _ in zip(product(letters, repeat=3), range(count))]
+
+
+def generate(entities, years, last_year=2025, seed=0):
+    """Devuelve (df_gdp, df_pop) con el formato de los CSV de origen."""
+    rng = np.random.default_rng(seed)
+    countries = [f'Country {position:05d}' for position in range(entities)]
+    year_labels = [str(year) for year in range(last_year - years + 1, last_year + 1)]
+
+    # PIB: nivel inicial log-normal y crecimiento anual con ruido
+    start = rng.lognormal(mean=10, sigma=2, size=(entities, 1))
+    growth = 1 + rng.normal(loc=0.03, scale=0.06, size=(entities, years - 1))
+    gdp = np.round(start * np.cumprod(np.hstack([np.ones((entities, 1)), growth]), axis=1))
+    gdp[rng.random(gdp.shape) < MISSING_RATE] = np.nan
+    df_gdp = pd.DataFrame(gdp, columns=year_labels)
+    df_gdp.insert(0, 'Country', countries)
+
+    # Población: censos de 1970 a 2022 con crecimiento suave
+    base = rng.lognormal(mean=15, sigma=1.5, size=entities)
+    df_pop = pd.DataFrame({
+        'Rank': np.arange(1, entities + 1),
+        'CCA3': _codes(entities),
+        'Country/Territory': countries,
+        'Capital': [f'Capital {position:05d}' for position in range(entities)],
+        'Continent': rng.choice(CONTINENTS, size=entities),
+    })
+    for year in CENSUS_YEARS:
+        df_pop[f'{year} Population'] = np.round(base * (1.01 ** (year - 2022))).astype(np.int64)
+    df_pop['Area (km²)'] = rng.integers(100, 10_000_000, size=entities)
+    df_pop['Density (per km²)'] = df_pop['2022 Population'] / df_pop['Area (km²)']
+    df_pop['Growth Rate'] = 1.01
+    df_pop['World Population Percentage'] = df_pop['2022 Population'] / df_pop['2022 Population'].sum() * 100
+    return df_gdp, df_pop
+
+
+def write_dataset(out_dir, entities, years, seed=0):
+    """Escribe los dos CSV en `out_dir` y devuelve sus rutas (pib, población)."""
+    os.makedirs(out_dir, exist_ok=True)
+    df_gdp, df_pop = generate(entities, years, seed=seed)
+    gdp_path = os.path.join(out_dir, 'gdp.csv')
+    pop_path = os.path.join(out_dir, 'world_population.csv')
+    df_gdp.to_csv(gdp_path, index=False)
+    df_pop.to_csv(pop_path, index=False)
+    return gdp_path, pop_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera CSV sintéticos de PIB y población.')
+    parser.add_argument('--entities', type=int, default=SCALES['large'][0])
+    parser.add_argument('--years', type=int, default=SCALES['large'][1])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    gdp_path, pop_path = write_dataset(args.out, args.entities, args.years, args.seed)
+    print(f">>> Datos sintéticos escritos en '{gdp_path}' y '{pop_path}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,725 @@
+import copy
+import os
+import shutil
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.derived_metrics import DERIVED_METRICS, MetricInputs, derive
+from modules.projections import PROJECTION_MODELS, fit_model
+
+# --- 1. REGISTRO DE ALMACENES ---
+# Cada DataFrame preparado tiene asociado un único almacén. Se indexa por id()
+# porque los DataFrames no son hashables; weakref.finalize limpia la entrada
+# cuando el DataFrame se libera.
+_STORES = {}
+
+
+# Columnas del resultado de `AnalyticsStore.countries_metrics`
+METRIC_COLUMNS = ['gdp_actual', 'max_value', 'max_year', 'min_value', 'min_year', 'avg_growth_percent']
+
+
+# --- 2. ARRAYS COMPARTIDOS ENTRE PROCESOS ---
+def shared_array_dir(cache_dir, key):
+    """Directorio del bundle .npy para una versión concreta del dataset."""
+    return os.path.join(cache_dir, f'arrays_{key}')
+
+
+def _attach_shared(bundle_dir, name, build):
+    """
+    Devuelve la matriz `name` mapeada en memoria y de solo lectura desde
+    `bundle_dir`. Si aún no existe se construye con `build()` y se escribe de
+    forma atómica; los demás workers la abren sin copiarla a su propia memoria.
+    """
+    path = os.path.join(bundle_dir, f'{name}.npy')
+    if not os.path.exists(path):
+        os.makedirs(bundle_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+        np.save(tmp_path, np.ascontiguousarray(build()))
+        os.replace(tmp_path, path)
+        _remove_stale_bundles(bundle_dir)
+    return np.load(path, mmap_mode='r')
+
+
+def _remove_stale_bundles(bundle_dir):
+    parent, current = os.path.split(bundle_dir)
+    for name in os.listdir(parent):
+        if name.startswith('arrays_') and name != current:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+def _year_columns(df, prefix, exclude=None):
+    """Devuelve [(año, columna)] ordenado por año para las columnas '<prefix>YYYY'."""
+    cols = []
+    for col in df.columns:
+        if not col.startswith(prefix) or (exclude and exclude in col):
+            continue
+        suffix = col[len(prefix):]
+        if suffix.isdigit():
+            cols.append((int(suffix), col))
+    return sorted(cols)
+
+
+def _numeric_matrix(df, year_cols, rows=None):
+    """
+    Matriz (filas × años) de las columnas indicadas; `rows` limita a esas
+    posiciones. Cada columna se copia una sola vez sobre un array reservado de
+    antemano, sin DataFrame intermedio. Es float32 si todas las columnas lo son
+    (ver `compact_frame`) y float64 en otro caso.
+    """
+    frame = df if rows is None else df.iloc[list(rows)]
+    columns = [frame[col] for _, col in year_cols]
+    dtype = np.float32 if columns and all(column.dtype == np.float32 for column in columns) else np.float64
+    matrix = np.empty((len(frame), len(columns)), dtype=dtype)
+    for position, column in enumerate(columns):
+        if not pd.api.types.is_float_dtype(column.dtype):
+            column = pd.to_numeric(column, errors='coerce')
+        matrix[:, position] = column.to_numpy(dtype=dtype, na_value=np.nan)
+    return matrix
+
+
+def _labels(column):
+    """Array de etiquetas de texto. En columnas categóricas reutiliza las cadenas de las categorías."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.categories.astype(str).to_numpy()[column.cat.codes.to_numpy()]
+    return column.astype(str).to_numpy()
+
+
+def _growth_matrix(matrix):
+    """Variación porcentual entre columnas consecutivas (equivalente a pct_change(fill_method=None))."""
+    if matrix.shape[1] < 2:
+        return np.empty((matrix.shape[0], 0), dtype=matrix.dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (matrix[:, 1:] / matrix[:, :-1] - 1) * 100
+
+
+def _extrema(matrix, reducer):
+    """Valor y posición del extremo por fila, ignorando NaN. Filas sin datos quedan en NaN / -1."""
+    rows = matrix.shape[0]
+    values = np.full(rows, np.nan)
+    positions = np.full(rows, -1)
+    if not matrix.size:
+        return values, positions
+    valid = ~np.isnan(matrix).all(axis=1)
+    fill = -np.inf if reducer is np.argmax else np.inf
+    found = reducer(np.where(np.isnan(matrix), fill, matrix), axis=1)
+    positions[valid] = found[valid]
+    values[valid] = matrix[valid, found[valid]]
+    return values, positions
+
+
+def _row_sums(matrix):
+    """Suma y número de valores presentes (no NaN) por fila."""
+    present = ~np.isnan(matrix)
+    return np.where(present, matrix, 0).sum(axis=1, dtype=np.float64), present.sum(axis=1)
+
+
+def _mean_from_sums(sums, counts):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _pad_rows(array, rows, fill):
+    """Añade filas al final de `array` hasta tener `rows`, rellenas con `fill`."""
+    missing = rows - array.shape[0]
+    if missing <= 0:
+        return np.array(array)
+    padding = np.full((missing,) + array.shape[1:], fill, dtype=array.dtype)
+    return np.concatenate([array, padding])
+
+
+class MetricBlock:
+    """Matriz países × años de una métrica con sus agregados precalculados."""
+
+    def __init__(self, years, matrix):
+        self.years = years
+        self.matrix = matrix
+        self.growth = _growth_matrix(matrix)
+        self.max_value, self.max_pos = _extrema(matrix, np.argmax)
+        self.min_value, self.min_pos = _extrema(matrix, np.argmin)
+        self.growth_sum, self.growth_count = _row_sums(self.growth)
+
+    @property
+    def avg_growth(self):
+        return _mean_from_sums(self.growth_sum, self.growth_count)
+
+    def latest(self, row):
+        return self.matrix[row, -1] if self.matrix.shape[1] else np.nan
+
+    def extended(self, years, matrix, recompute_rows):
+        """
+        Bloque para `matrix`, que amplía la actual con años y/o filas al final.
+        Las filas existentes solo procesan los años nuevos; las de
+        `recompute_rows` (nuevas o con celdas rellenadas) se calculan completas.
+        """
+        old_rows, old_cols = self.matrix.shape
+        rows = matrix.shape[0]
+        if old_cols == 0:
+            return MetricBlock(years, matrix)
+
+        block = MetricBlock.__new__(MetricBlock)
+        block.years, block.matrix = years, matrix
+
+        # Años nuevos para las filas existentes
+        added = matrix[:old_rows, old_cols:]
+        block.growth = _pad_rows(np.hstack([self.growth, _growth_matrix(matrix[:old_rows, old_cols - 1:])]), rows, np.nan)
+        added_sum, added_count = _row_sums(block.growth[:old_rows, old_cols - 1:])
+        block.growth_sum = _pad_rows(self.growth_sum + added_sum, rows, 0.0)
+        block.growth_count = _pad_rows(self.growth_count + added_count, rows, 0)
+
+        block.max_value, block.max_pos = self._merge_extrema(self.max_value, self.max_pos, added, old_cols, np.argmax, rows)
+        block.min_value, block.min_pos = self._merge_extrema(self.min_value, self.min_pos, added, old_cols, np.argmin, rows)
+
+        # Filas nuevas o modificadas: cálculo completo solo para ellas
+        recompute_rows = np.asarray(sorted(recompute_rows), dtype=int)
+        if recompute_rows.size:
+            partial = MetricBlock(years, matrix[recompute_rows])
+            for name in ('growth', 'max_value', 'max_pos', 'min_value', 'min_pos', 'growth_sum', 'growth_count'):
+                getattr(block, name)[recompute_rows] = getattr(partial, name)
+        return block
+
+    @staticmethod
+    def _merge_extrema(values, positions, added, offset, reducer, rows):
+        new_values, new_positions = _extrema(added, reducer)
+        with np.errstate(invalid='ignore'):
+            better = new_values > values if reducer is np.argmax else new_values < values
+        take = ~np.isnan(new_values) & (np.isnan(values) | better)
+        merged_values = np.where(take, new_values, values)
+        merged_positions = np.where(take, new_positions + offset, positions)
+        return _pad_rows(merged_values, rows, np.nan), _pad_rows(merged_positions, rows, -1)
+
+
+# --- 3. AGREGADOS POR CONTINENTE (sumas y conteos acumulables) ---
+_PART_ORDER = ('sum', 'count', 'safe')
+
+
+def _continent_parts(matrix, continents, years):
+    """
+    Sumas y conteos por continente del crecimiento entre columnas consecutivas
+    de `matrix`, en un único groupby. `years` etiqueta el año final de cada
+    transición. Al ser aditivos, se pueden ampliar con filas o años nuevos.
+    """
+    previous, current = matrix[:, :-1], matrix[:, 1:]
+    safe = ~np.isnan(previous) & (previous != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(safe, (current - previous) / previous * 100, np.nan)
+    present = ~np.isnan(growth)
+
+    groups = pd.Series(continents, name='Continent')
+    frame = pd.DataFrame(
+        np.hstack([np.where(present, growth, 0), present, safe], dtype=np.float64),
+        columns=pd.MultiIndex.from_product([_PART_ORDER, [int(year) for year in years]])
+    )
+    parts = frame.groupby(groups, observed=True).sum()
+    # Índice como texto para poder sumar partes con categorías distintas
+    parts.index = parts.index.astype(str)
+    return parts
+
+
+def _continent_growth_tables(parts):
+    results = {}
+    if parts is None or parts.empty:
+        return results
+    means = parts['sum'] / parts['count'].where(parts['count'] > 0)
+    for year in parts['sum'].columns:
+        present = parts['safe'][year] > 0
+        continent_growth = means.loc[present, year].rename('Growth').reset_index()
+        continent_growth['Continent'] = continent_growth['Continent'].astype(str)
+        results[int(year)] = continent_growth.sort_values(by='Growth', ascending=False)
+    return results
+
+
+def _world_metrics(years, totals):
+    if not len(years):
+        return None
+    growth = _growth_matrix(totals[np.newaxis, :])[0]
+    years = np.asarray(years, dtype=int)
+
+    world_growth_df = pd.DataFrame({'Año': years[1:], 'Crecimiento (%)': growth})
+    world_growth_df = world_growth_df.dropna().reset_index(drop=True)
+
+    growth_sum, growth_count = _row_sums(growth[np.newaxis, :])
+    return {
+        'gdp_actual': totals[-1],
+        'max_gdp': {'value': totals.max(), 'year': int(years[totals.argmax()])},
+        'min_gdp': {'value': totals.min(), 'year': int(years[totals.argmin()])},
+        'avg_growth_percent': round(_mean_from_sums(growth_sum, growth_count)[0], 2),
+        'world_total_gdp': pd.DataFrame({'Año': years, 'PIB (Billones USD)': totals}),
+        'world_growth_data': world_growth_df,
+    }
+
+
+# --- 4. VISTA LARGA (país, métrica, año) ---
+class LongStore:
+    """
+    Datos del almacén en formato largo: un valor por (país, métrica, año), con
+    años enteros. No copia nada: los valores de cada métrica son su matriz
+    aplanada (país mayor, año menor), así que la serie de un país es un tramo
+    contiguo cuya posición sale en O(1) de los índices de grupo
+    (`country_index` y `year_index[métrica]`), sin melt ni textos de columna.
+    """
+
+    def __init__(self, countries, country_index, metrics):
+        self.countries = countries
+        self.country_index = country_index
+        self.years = {name: np.asarray(years, dtype=int) for name, (years, _) in metrics.items()}
+        self.values = {name: matrix.reshape(-1) for name, (_, matrix) in metrics.items()}
+        self.year_index = {
+            name: {int(year): col for col, year in enumerate(years)} for name, years in self.years.items()
+        }
+
+    @property
+    def metrics(self):
+        return list(self.values)
+
+    def add(self, name, years, matrix):
+        """Añade la métrica `name` (matriz países × `years`) a la vista."""
+        years = np.asarray(years, dtype=int)
+        self.year_index[name] = {int(year): col for col, year in enumerate(years)}
+        self.years[name] = years
+        self.values[name] = matrix.reshape(-1)
+
+    def positions(self, metric, rows, years=None):
+        """
+        Posiciones en `values[metric]` de las filas `rows` y los años `years`
+        (todos si es None), agrupadas por país. Devuelve (posiciones, columnas).
+        """
+        year_index = self.year_index[metric]
+        if years is None:
+            cols = np.arange(len(year_index))
+        else:
+            cols = np.array([year_index[year] for year in years if year in year_index], dtype=int)
+        rows = np.asarray(rows, dtype=int)
+        return (rows[:, np.newaxis] * len(year_index) + cols).reshape(-1), cols
+
+    def series(self, countries, metric, years=None):
+        """
+        Filas (country, year, value) de `countries` para `metric`, en el orden
+        pedido y omitiendo países desconocidos. `years` limita a esos años.
+        """
+        rows = [self.country_index[country] for country in countries if country in self.country_index]
+        positions, cols = self.positions(metric, rows, years)
+        return pd.DataFrame({
+            'country': np.repeat(self.countries[rows], len(cols)),
+            'year': np.tile(self.years[metric][cols], len(rows)),
+            'value': self.values[metric][positions],
+        })
+
+    def frame(self, metrics=None):
+        """
+        DataFrame largo completo, indexado por (country, metric, year) y con la
+        columna 'value'. El índice se arma con códigos enteros (sin factorizar
+        textos); los valores sí se copian a un array nuevo.
+        """
+        metrics = list(metrics or self.values)
+        all_years = np.unique(np.concatenate([self.years[name] for name in metrics]))
+        codes = [[], [], []]
+        for position, name in enumerate(metrics):
+            n_rows, n_years = len(self.countries), len(self.years[name])
+            codes[0].append(np.repeat(np.arange(n_rows), n_years))
+            codes[1].append(np.full(n_rows * n_years, position))
+            codes[2].append(np.tile(np.searchsorted(all_years, self.years[name]), n_rows))
+        codes = [np.concatenate(level) for level in codes]
+        # Orden por códigos (país, métrica, año): índice ordenado para cortes con .loc
+        order = np.lexsort(codes[::-1])
+        index = pd.MultiIndex(
+            levels=[pd.Index(self.countries), pd.Index(metrics), pd.Index(all_years)],
+            codes=[level[order] for level in codes],
+            names=['country', 'metric', 'year'], verify_integrity=False
+        )
+        values = np.concatenate([self.values[name] for name in metrics])[order]
+        return pd.DataFrame({'value': values}, index=index)
+
+
+# --- 5. RANKINGS POR AÑO ---
+class _YearRanking:
+    """Ranking de un año: filas en orden descendente, puesto por fila y sumas acumuladas en ese orden."""
+
+    def __init__(self, values):
+        missing = np.isnan(values)
+        # Claves de orden: -valor y los países sin dato (+inf) al final; sumas en float64
+        keys = np.negative(values, dtype=np.float64)
+        keys[missing] = np.inf
+        self.count = int(len(values) - missing.sum())
+        self.order = np.argsort(keys, kind='stable').astype(np.int32)
+        ordered = -keys[self.order[:self.count]]
+        self.cumsum = np.cumsum(ordered)
+        self.ranks = np.full(len(values), -1, dtype=np.int32)
+        self.ranks[self.order[:self.count]] = np.arange(1, self.count + 1, dtype=np.int32)
+
+
+class RankingIndex:
+    """
+    Ranking de una métrica en cada año: orden descendente de las filas (los
+    países sin dato al final), puesto de cada fila y sumas acumuladas en ese
+    orden. Cada año se ordena una sola vez, con un argsort, la primera vez que
+    se consulta (`prepare` lo adelanta, p. ej. al construir el almacén); a
+    partir de ahí top-N cuesta O(N) y resto, puesto y percentil, O(1).
+    """
+
+    def __init__(self, years, matrix):
+        self.years = np.asarray(years, dtype=int)
+        self.year_index = {int(year): col for col, year in enumerate(self.years)}
+        self.matrix = matrix
+        self._rankings = {}
+
+    def extended(self, years, matrix):
+        """Índice para `matrix`, que solo añade años al final (mismas filas): reutiliza los años ya ordenados."""
+        index = RankingIndex(years, matrix)
+        index._rankings.update(self._rankings)
+        return index
+
+    def prepare(self, *years):
+        for year in years:
+            self._year(int(year))
+
+    def _year(self, year):
+        col = self.year_index[year]
+        ranking = self._rankings.get(col)
+        if ranking is None:
+            # Dos hilos pueden calcular el mismo año a la vez: el resultado es idéntico
+            ranking = self._rankings[col] = _YearRanking(self.matrix[:, col])
+        return ranking
+
+    def top(self, year, n):
+        """Filas de los `n` mayores valores de `year` (solo con dato), de mayor a menor."""
+        ranking = self._year(year)
+        return ranking.order[:min(n, ranking.count)]
+
+    def total(self, year):
+        ranking = self._year(year)
+        return ranking.cumsum[-1] if ranking.count else 0.0
+
+    def rest(self, year, n):
+        """Suma de los valores fuera del top `n` en `year`."""
+        ranking = self._year(year)
+        taken = min(n, ranking.count)
+        return self.total(year) - (ranking.cumsum[taken - 1] if taken else 0.0)
+
+    def rank(self, year, row):
+        """Puesto (1 = mayor valor) de la fila `row` en `year`, o None si no tiene dato."""
+        rank = int(self._year(year).ranks[row])
+        return rank if rank > 0 else None
+
+    def percentile(self, year, row):
+        """Porcentaje de los países con dato en `year` que quedan por debajo de la fila `row`."""
+        rank = self.rank(year, row)
+        if rank is None:
+            return None
+        count = self._year(year).count
+        return 100.0 if count == 1 else (count - rank) / (count - 1) * 100
+
+    def arrays(self):
+        """Arrays de los años ya ordenados (para `memory_usage`)."""
+        return [array for ranking in self._rankings.values() for array in (ranking.order, ranking.ranks, ranking.cumsum)]
+
+
+class AnalyticsStore:
+    """
+    Arrays densos y agregados calculados una sola vez a partir del DataFrame
+    preparado. Las funciones de `modules.analyzer` consultan este almacén en
+    lugar de recorrer el DataFrame en cada callback.
+
+    Con `shared_dir`, las matrices de PIB, per cápita y población se leen de un
+    bundle .npy mapeado en memoria, compartido por todos los workers.
+    """
+
+    def __init__(self, df, shared_dir=None):
+        self.shared_dir = shared_dir
+        self._set_keys(df)
+
+        gdp_cols = _year_columns(df, 'GDP_', exclude='per_capita')
+        pc_cols = _year_columns(df, 'GDP_per_capita_')
+        pop_cols = _year_columns(df, 'Population_')
+
+        self.years = np.array([year for year, _ in gdp_cols], dtype=int)
+        self.pop_years = np.array([year for year, _ in pop_cols], dtype=int)
+        self.population = self._matrix(df, pop_cols, 'population')
+
+        self.metrics = {
+            'total': MetricBlock(self.years, self._matrix(df, gdp_cols, 'gdp')),
+            'per_capita': MetricBlock(np.array([year for year, _ in pc_cols], dtype=int), self._matrix(df, pc_cols, 'per_capita')),
+        }
+        self._refresh_aliases()
+        self.long = self._long_store()
+        self._derived = {}
+        self._projections = {}
+        self.rankings = {name: RankingIndex(block.years, block.matrix) for name, block in self.metrics.items()}
+        self._prepare_rankings()
+
+        self.world_totals = np.nansum(self.gdp, axis=0, dtype=np.float64)
+        self.world = _world_metrics(self.years, self.world_totals)
+        self.continents = self._resolve_continents(df)
+        self._continent_parts = _continent_parts(self.gdp, self.continents, self.years[1:]) if len(self.years) > 1 else None
+        self.continent_growth = _continent_growth_tables(self._continent_parts)
+
+    def _set_keys(self, df):
+        self.countries = _labels(df['Country'])
+        self.country_index = {country: row for row, country in enumerate(self.countries)}
+
+    def _refresh_aliases(self):
+        self.gdp = self.metrics['total'].matrix
+        self.per_capita = self.metrics['per_capita'].matrix
+
+    def _prepare_rankings(self):
+        # El último año es el que muestran por defecto el pie y la clasificación
+        for ranking in self.rankings.values():
+            if len(ranking.years):
+                ranking.prepare(ranking.years[-1])
+
+    def _long_store(self):
+        metrics = {name: (block.years, block.matrix) for name, block in self.metrics.items()}
+        metrics['population'] = (self.pop_years, self.population)
+        return LongStore(self.countries, self.country_index, metrics)
+
+    def _matrix(self, df, year_cols, name):
+        if self.shared_dir is None:
+            return _numeric_matrix(df, year_cols)
+        return _attach_shared(self.shared_dir, name, lambda: _numeric_matrix(df, year_cols))
+
+    def _resolve_continents(self, df):
+        if 'Continent' in df.columns and isinstance(df['Continent'].dtype, pd.CategoricalDtype):
+            return df['Continent'].to_numpy()
+        from modules.analyzer import get_continent  # Import local: analyzer depende de este módulo
+
+        # DataFrames no preparados: una resolución por país único, no por fila
+        resolved = {country: get_continent(country) for country in self.country_index}
+        return pd.Categorical([resolved[country] for country in self.countries])
+
+    # --- 6. AMPLIACIÓN INCREMENTAL ---
+    def can_extend_to(self, df):
+        """True si `df` solo añade países al final y años posteriores a los actuales."""
+        years = [year for year, _ in _year_columns(df, 'GDP_', exclude='per_capita')]
+        countries = _labels(df['Country'])
+        return (
+            len(countries) >= len(self.countries)
+            and np.array_equal(countries[:len(self.countries)], self.countries)
+            and years[:len(self.years)] == self.years.tolist()
+        )
+
+    def extended(self, df, dirty_rows=()):
+        """
+        Almacén para `df`, que amplía el actual con países al final y/o años
+        posteriores. Solo se calculan las filas nuevas, las de `dirty_rows`
+        (celdas antes vacías que ahora tienen dato) y los años nuevos. El
+        almacén actual no se modifica: los callbacks en curso siguen leyendo
+        un estado coherente.
+        """
+        store = copy.copy(self)
+        store.shared_dir = None
+        old_rows, old_years = len(self.countries), len(self.years)
+        store._set_keys(df)
+        rows = len(store.countries)
+
+        gdp_cols = _year_columns(df, 'GDP_', exclude='per_capita')
+        pc_cols = _year_columns(df, 'GDP_per_capita_')
+        store.years = np.array([year for year, _ in gdp_cols], dtype=int)
+        recompute = sorted(set(dirty_rows) | set(range(old_rows, rows)))
+
+        store.metrics = {
+            'total': self.metrics['total'].extended(store.years, _numeric_matrix(df, gdp_cols), recompute),
+            'per_capita': self.metrics['per_capita'].extended(
+                np.array([year for year, _ in pc_cols], dtype=int), _numeric_matrix(df, pc_cols), recompute
+            ),
+        }
+        store._refresh_aliases()
+        store._derived = {}
+        store._projections = {}
+        # Filas nuevas o modificadas cambian los puestos de todos los años; si
+        # solo llegan años nuevos, los ya ordenados se reutilizan
+        store.rankings = {
+            name: RankingIndex(block.years, block.matrix) if recompute
+            else self.rankings[name].extended(block.years, block.matrix)
+            for name, block in store.metrics.items()
+        }
+        store._prepare_rankings()
+        if rows > old_rows:
+            pop_cols = [(year, f'Population_{year}') for year in self.pop_years]
+            store.population = np.vstack([self.population, _numeric_matrix(df, pop_cols, range(old_rows, rows))])
+        store.long = store._long_store()
+
+        # Totales mundiales: años nuevos completos, años previos solo con el delta
+        dirty = np.asarray(sorted(dirty_rows), dtype=int)
+        previous = self.world_totals + np.nansum(store.gdp[old_rows:, :old_years], axis=0, dtype=np.float64)
+        if dirty.size:
+            previous = previous + np.nansum(store.gdp[dirty, :old_years], axis=0, dtype=np.float64) \
+                - np.nansum(self.gdp[dirty, :old_years], axis=0, dtype=np.float64)
+        store.world_totals = np.concatenate([previous, np.nansum(store.gdp[:, old_years:], axis=0, dtype=np.float64)])
+        store.world = _world_metrics(store.years, store.world_totals)
+
+        # Continentes: las transiciones nuevas sobre todas las filas; las
+        # previas se corrigen con lo aportado por filas nuevas o modificadas
+        store.continents = store._resolve_continents(df)
+        parts = self._continent_parts
+        if old_years > 1 and recompute:
+            changed = np.asarray(recompute, dtype=int)
+            delta = _continent_parts(store.gdp[changed, :old_years], store.continents[changed], self.years[1:])
+            if dirty.size:
+                delta = delta.sub(_continent_parts(self.gdp[dirty], self.continents[dirty], self.years[1:]), fill_value=0)
+            parts = parts.add(delta, fill_value=0)
+        if len(store.years) > old_years and len(store.years) > 1:
+            start = max(old_years - 1, 0)
+            fresh = _continent_parts(store.gdp[:, start:], store.continents, store.years[start + 1:])
+            parts = fresh if parts is None else pd.concat([parts, fresh], axis=1).fillna(0)
+        if parts is not None:
+            parts = parts[[(part, year) for part in _PART_ORDER for year in sorted(parts['sum'].columns)]]
+        store._continent_parts = parts
+        store.continent_growth = _continent_growth_tables(parts)
+        return store
+
+    # --- 7. MEMORIA ---
+    def memory_usage(self):
+        """
+        Bytes de los arrays del almacén por componente. Las matrices mapeadas
+        desde el bundle compartido van aparte, en 'shared': sus páginas son
+        comunes a todos los workers.
+        """
+        arrays = {'countries': [self.countries], 'population': [self.population], 'world': [self.world_totals]}
+        arrays['derived'] = [matrix for _, matrix in self._derived.values()]
+        arrays['projections'] = [array for fitted in self._projections.values() for array in fitted.arrays()]
+        arrays['rankings'] = [array for ranking in self.rankings.values() for array in ranking.arrays()]
+        for name, block in self.metrics.items():
+            arrays[f'{name}.matrix'] = [block.matrix]
+            arrays[f'{name}.growth'] = [block.growth]
+            arrays[f'{name}.aggregates'] = [
+                block.max_value, block.max_pos, block.min_value, block.min_pos, block.growth_sum, block.growth_count
+            ]
+        usage = {'shared': 0}
+        for name, values in arrays.items():
+            usage[name] = 0
+            for array in values:
+                target = 'shared' if isinstance(array, np.memmap) else name
+                usage[target] += array.nbytes
+        return usage
+
+    # --- 8. CONSULTAS ---
+    def countries_metrics(self, countries, metric_type='total'):
+        """
+        Métricas de varios países de una vez: una selección por posiciones sobre
+        los arrays precalculados. Omite países desconocidos o sin datos.
+        """
+        block = self.metrics.get(metric_type)
+        if block is None:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        names = [country for country in countries if country in self.country_index]
+        rows = np.fromiter((self.country_index[country] for country in names), dtype=int, count=len(names))
+        rows_with_data = block.max_pos[rows] >= 0
+        rows, names = rows[rows_with_data], [name for name, keep in zip(names, rows_with_data) if keep]
+
+        latest = block.matrix[rows, -1] if block.matrix.shape[1] else np.full(len(rows), np.nan)
+        frame = pd.DataFrame({
+            'gdp_actual': latest,
+            'max_value': block.max_value[rows],
+            'max_year': block.years[block.max_pos[rows]],
+            'min_value': block.min_value[rows],
+            'min_year': block.years[block.min_pos[rows]],
+            'avg_growth_percent': np.round(block.avg_growth[rows], 2),
+        }, index=pd.Index(names, name='country'))
+        return frame
+
+    def country_series(self, country_name, metric_type='total'):
+        """Serie anual (año, valor) de un país. Devuelve None si el país o la métrica no existen."""
+        if country_name not in self.country_index or metric_type not in self.metrics:
+            return None
+        return self.long.series([country_name], metric_type)[['year', 'value']]
+
+    def derived(self, name):
+        """
+        (años, matriz países × años) de la métrica derivada `name` (ver
+        `modules.derived_metrics`), calculada sobre la matriz de PIB la primera
+        vez que se pide y añadida a la vista larga. None si no está registrada.
+        """
+        if name not in self._derived:
+            if name not in DERIVED_METRICS:
+                return None
+            inputs = MetricInputs(self.gdp, self.years, self.pop_years, self.population)
+            matrix = derive(name, inputs)
+            self.long.add(name, self.years, matrix)
+            self._derived[name] = (self.years, matrix)
+        return self._derived[name]
+
+    def projection(self, metric_type, model):
+        """
+        Parámetros del modelo de proyección `model` (ver `modules.projections`)
+        ajustados para todos los países en `metric_type`, la primera vez que se
+        piden. None si la métrica o el modelo no existen.
+        """
+        key = (metric_type, model)
+        if key not in self._projections:
+            block = self.metrics.get(metric_type)
+            if block is None or model not in PROJECTION_MODELS:
+                return None
+            self._projections[key] = fit_model(model, block.years, block.matrix)
+        return self._projections[key]
+
+    def ranking_table(self, metric_type, year=None, n=10, countries=()):
+        """
+        Clasificación de `metric_type` en `year` (por defecto el último año): los
+        `n` primeros y, detrás, los países de `countries` con dato que queden
+        fuera, con puesto, valor, percentil y, en PIB total, su cuota del total.
+        None si la métrica o el año no existen.
+        """
+        ranking = self.rankings.get(metric_type)
+        if ranking is None or not len(ranking.years):
+            return None
+        year = int(ranking.years[-1]) if year is None else int(year)
+        if year not in ranking.year_index:
+            return None
+        rows = ranking.top(year, n).tolist()
+        for country in countries or ():
+            row = self.country_index.get(country)
+            if row is not None and row not in rows and ranking.rank(year, row) is not None:
+                rows.append(row)
+        values = self.metrics[metric_type].matrix[rows, ranking.year_index[year]]
+        table = pd.DataFrame({
+            'rank': [ranking.rank(year, row) for row in rows],
+            'country': self.countries[rows],
+            'value': values,
+            'percentile': np.round([ranking.percentile(year, row) for row in rows], 1),
+        })
+        if metric_type == 'total':
+            total = ranking.total(year)
+            table['share_percent'] = np.round(values / total * 100, 2) if total else np.nan
+        return table
+
+    def population_by_year(self, year):
+        """Población de todos los países en `year` (uno de `pop_years`), o None si no hay dato de ese año."""
+        positions = np.flatnonzero(self.pop_years == year)
+        if not len(positions):
+            return None
+        return pd.DataFrame({'country': self.countries, 'population': self.population[:, positions[0]]})
+
+    def country_metrics(self, country_name, metric_type='total'):
+        """Métricas de un país en O(1). Devuelve None si el país o la métrica no existen."""
+        row = self.country_index.get(country_name)
+        block = self.metrics.get(metric_type)
+        if row is None or block is None or block.max_pos[row] < 0:
+            return None
+        return {
+            'gdp_actual': block.latest(row),
+            'max_gdp': {'value': block.max_value[row], 'year': int(block.years[block.max_pos[row]])},
+            'min_gdp': {'value': block.min_value[row], 'year': int(block.years[block.min_pos[row]])},
+            'avg_growth_percent': round(block.avg_growth[row], 2),
+        }
+
+
+def register_store(df, store):
+    """Asocia `store` a `df` para las consultas posteriores."""
+    key = id(df)
+    _STORES[key] = store
+    weakref.finalize(df, _STORES.pop, key, None)
+    return store
+
+
+def build_store(df, shared_dir=None):
+    """Construye el almacén para `df` y lo registra para las consultas posteriores."""
+    return register_store(df, AnalyticsStore(df, shared_dir=shared_dir))
+
+
+def get_store(df):
+    """Devuelve el almacén asociado a `df`, construyéndolo si aún no existe."""
+    store = _STORES.get(id(df))
+    if store is None:
+        store = build_store(df)
+    return store
@@ -1,5 +1,7 @@
 import pandas as pd
-import pycountry_convert as pc
+
+from modules.analytics_store import get_store
+from modules.profiling import profiled
 
 # --- 1. EL MAPA MANUAL VIVE AQUÍ ---
 MANUAL_MAP = {
@@ -24,7 +26,9 @@ def get_continent(country_name):
     """
     if country_name in MANUAL_MAP:
         return MANUAL_MAP[country_name]
-    
+    # Import diferido: solo hace falta si el índice de continentes no cubre el país
+    import pycountry_convert as pc
+
     try:
         country_alpha2 = pc.country_name_to_country_alpha2(country_name)
         continent_code = pc.country_alpha2_to_continent_code(country_alpha2)
@@ -33,104 +37,129 @@ def get_continent(country_name):
         return 'Otros'
 
 # --- 3. EL RESTO DE FUNCIONES DE ANÁLISIS ---
+# Todas consultan el almacén precalculado en `prepare_merged_data`, por lo que
+# cada llamada es una búsqueda y no un recorrido del DataFrame.
+@profiled('data')
 def analyze_country_gdp(df, country_name, metric_type='total'):
     """Calcula métricas clave para un país, adaptándose al tipo de métrica."""
-    prefix = 'GDP_' if metric_type == 'total' else 'GDP_per_capita_'
-    try:
-        country_data = df[df['Country'] == country_name]
-        gdp_columns = [col for col in df.columns if col.startswith(prefix)]
-        country_gdp = country_data[gdp_columns].iloc[0]
-        
-        metrics = {
-            'gdp_actual': country_gdp[f'{prefix}2025'],
-            'max_gdp': {
-                'value': country_gdp.max(),
-                'year': int(country_gdp.idxmax().split('_')[-1])
-            },
-            'min_gdp': {
-                'value': country_gdp.min(),
-                'year': int(country_gdp.idxmin().split('_')[-1])
-            },
-            'avg_growth_percent': round(country_gdp.pct_change(fill_method=None).mean() * 100, 2)
-        }
-        return metrics
-    except (KeyError, IndexError, AttributeError):
+    return get_store(df).country_metrics(country_name, metric_type)
+
+@profiled('data')
+def analyze_countries(df, countries, metric_type='total'):
+    """
+    Métricas de muchos países en una sola pasada vectorizada. Devuelve un
+    DataFrame indexado por país con las columnas de `METRIC_COLUMNS`; si
+    `countries` es None incluye todos los países.
+    """
+    store = get_store(df)
+    if countries is None:
+        countries = store.countries
+    return store.countries_metrics(countries, metric_type)
+
+@profiled('data')
+def analyze_country_series(df, country_name, metric_type='total'):
+    """Serie anual (columnas 'year' y 'value') de un país, o None si no existe."""
+    return get_store(df).country_series(country_name, metric_type)
+
+@profiled('data')
+def analyze_series(df, countries, metric_type='total', years=None):
+    """
+    Series de varios países en formato largo (columnas 'country', 'year' y
+    'value'): un corte directo de la vista larga del almacén. `metric_type`
+    admite también 'population' y las métricas derivadas registradas
+    ('growth', 'cagr', 'share'…); `countries` None incluye todos los países y
+    `years` limita a esos años. None si la métrica no existe.
+    """
+    store = get_store(df)
+    long = store.long
+    if metric_type not in long.values and store.derived(metric_type) is None:
         return None
+    if countries is None:
+        countries = long.countries
+    return long.series(countries, metric_type, years)
 
+@profiled('data')
 def analyze_comparison(df, country_list, metric_type='total'):
     """Analiza una lista de países, adaptándose al tipo de métrica."""
     if not country_list: return None
-    all_metrics = []
-    for country in country_list:
-        metrics = analyze_country_gdp(df, country, metric_type)
-        if metrics:
-            metrics['country'] = country
-            all_metrics.append(metrics)
+    metrics = analyze_countries(df, country_list, metric_type)
+    if metrics.empty: return None
 
-    if not all_metrics: return None
-
-    try:
-        country_with_max_gdp = max(all_metrics, key=lambda x: x['max_gdp']['value'])
-        country_with_min_gdp = min(all_metrics, key=lambda x: x['min_gdp']['value'])
-        country_with_max_growth = max(all_metrics, key=lambda x: x.get('avg_growth_percent', -float('inf')))
-    except (TypeError, ValueError):
-        return None
-
-    return {
-        'overall_max_gdp': country_with_max_gdp,
-        'overall_min_gdp': country_with_min_gdp,
-        'highest_growth': country_with_max_growth
+    growth = metrics['avg_growth_percent']
+    winners = {
+        'overall_max_gdp': metrics['max_value'].idxmax(),
+        'overall_min_gdp': metrics['min_value'].idxmin(),
+        'highest_growth': growth.idxmax() if growth.notna().any() else metrics.index[0],
     }
 
+    result = {}
+    for key, country in winners.items():
+        country_metrics = analyze_country_gdp(df, country, metric_type)
+        country_metrics['country'] = country
+        result[key] = country_metrics
+    return result
+
+@profiled('data')
 def analyze_world_data(df):
-    """Calcula las métricas y datos agregados para la vista mundial."""
-    gdp_cols = [col for col in df.columns if col.startswith('GDP_') and 'per_capita' not in col]
-    gdp_cols_exist = [col for col in gdp_cols if col in df.columns]
-    if not gdp_cols_exist:
-        return None 
-
-    world_gdp_series = df[gdp_cols_exist].sum()
-    avg_growth = world_gdp_series.pct_change(fill_method=None).mean() * 100
-    
-    world_growth_df = (world_gdp_series.pct_change(fill_method=None).dropna() * 100).reset_index()
-    world_growth_df.columns = ['Año', 'Crecimiento (%)']
-    world_growth_df['Año'] = world_growth_df['Año'].str.replace('GDP_', '')
-    
-    metrics = {
-        'gdp_actual': world_gdp_series.get('GDP_2025', 0),
-        'max_gdp': {'value': world_gdp_series.max(), 'year': int(world_gdp_series.idxmax().split('_')[-1])},
-        'min_gdp': {'value': world_gdp_series.min(), 'year': int(world_gdp_series.idxmin().split('_')[-1])},
-        'avg_growth_percent': round(avg_growth, 2),
-        'world_total_gdp': world_gdp_series.reset_index().rename(columns={'index': 'Año', 0: 'PIB (Billones USD)'}),
-        'world_growth_data': world_growth_df
-    }
-    metrics['world_total_gdp']['Año'] = metrics['world_total_gdp']['Año'].str.replace('GDP_', '')
-    return metrics
+    """
+    Devuelve las métricas y datos agregados para la vista mundial.
+    Los DataFrames devueltos son compartidos entre llamadas: no modificarlos.
+    """
+    return get_store(df).world
 
+@profiled('data')
 def analyze_continent_growth(df, year):
     """
-    Calcula el crecimiento promedio, trabajando sobre una copia 
-    y siguiendo las mejores prácticas de Pandas.
+    Devuelve el crecimiento promedio por continente para `year`. Se calcula una
+    sola vez sobre la columna categórica 'Continent' al construir el almacén.
+    """
+    continent_growth = get_store(df).continent_growth.get(year)
+    if continent_growth is None:
+        return pd.DataFrame()
+    return continent_growth
+
+@profiled('data')
+def analyze_ranking(df, metric_type='total', year=None, n=10, countries=()):
+    """
+    Clasificación de `metric_type` en `year` (el último si es None): los `n`
+    primeros más los países de `countries` que queden fuera, con columnas
+    'rank', 'country', 'value', 'percentile' y, en PIB total, 'share_percent'.
+    Sale del índice de rankings del almacén, sin ordenar nada. None si la
+    métrica o el año no existen.
+    """
+    return get_store(df).ranking_table(metric_type, year, n, countries)
+
+@profiled('data')
+def analyze_population(df, year):
+    """Población por país en `year` (columnas 'country' y 'population'), o None si no hay datos de ese año."""
+    return get_store(df).population_by_year(year)
+
+# --- 4. TEXTOS DE LOS KPIs ---
+def selection_kpis(df, selected_countries, metric_type):
+    """
+    Textos de los cuatro KPIs del dashboard para uno o varios países
+    seleccionados (también los usan los informes de modules/snapshots.py).
+    'Sin datos' en los cuatro si la métrica no tiene valores para la selección
+    (p. ej. per cápita de un país sin población).
     """
-    df_copy = df.copy() 
-    previous_year_col = f'GDP_{year - 1}'
-    current_year_col = f'GDP_{year}'
-    
-    if previous_year_col not in df_copy.columns or current_year_col not in df_copy.columns:
-        return pd.DataFrame() 
-        
-    df_copy['Continent'] = df_copy['Country'].apply(get_continent)
-    
-    df_copy[previous_year_col] = pd.to_numeric(df_copy[previous_year_col], errors='coerce')
-    df_copy[current_year_col] = pd.to_numeric(df_copy[current_year_col], errors='coerce')
-    
-    df_copy_safe = df_copy[df_copy[previous_year_col].notna() & (df_copy[previous_year_col] != 0)].copy()
-    
-    if not df_copy_safe.empty:
-        # --- CORRECCIÓN PARA EL SettingWithCopyWarning ---
-        # Usamos .loc para asignar la nueva columna de forma segura
-        df_copy_safe.loc[:, 'Growth'] = (df_copy_safe[current_year_col] - df_copy_safe[previous_year_col]) / df_copy_safe[previous_year_col] * 100
-        continent_growth = df_copy_safe.groupby('Continent')['Growth'].mean().reset_index()
-        return continent_growth.sort_values(by='Growth', ascending=False)
+    value_format = '{:,.2f} B' if metric_type == 'total' else '${:,.0f}'
+    if len(selected_countries) == 1:
+        metrics = analyze_country_gdp(df, selected_countries[0], metric_type)
+        if metrics is None:
+            return ('Sin datos',) * 4
+        kpi_actual = value_format.format(metrics['gdp_actual'])
+        kpi_max = f"{value_format.format(metrics['max_gdp']['value'])} ({metrics['max_gdp']['year']})"
+        kpi_min = f"{value_format.format(metrics['min_gdp']['value'])} ({metrics['min_gdp']['year']})"
+        kpi_growth = f"{metrics['avg_growth_percent']}% anual"
     else:
-        return pd.DataFrame(columns=['Continent', 'Growth'])
\ No newline at end of file
+        comp_metrics = analyze_comparison(df, selected_countries, metric_type)
+        if comp_metrics is None:
+            return ('Sin datos',) * 4
+        max_gdp_data = comp_metrics['overall_max_gdp']
+        min_gdp_data = comp_metrics['overall_min_gdp']
+        growth_data = comp_metrics['highest_growth']
+        kpi_actual = "Comparación"
+        kpi_max = f"{max_gdp_data['country']}: {value_format.format(max_gdp_data['max_gdp']['value'])}"
+        kpi_min = f"{min_gdp_data['country']}: {value_format.format(min_gdp_data['min_gdp']['value'])}"
+        kpi_growth = f"{growth_data['country']}: {growth_data['avg_growth_percent']}%"
+    return kpi_actual, kpi_max, kpi_min, kpi_growth
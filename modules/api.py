@@ -0,0 +1,203 @@
+import hashlib
+
+import flask
+
+from modules.analyzer import (
+    analyze_countries, analyze_country_series, analyze_series, analyze_world_data,
+    analyze_continent_growth, analyze_population, analyze_ranking
+)
+from modules.analytics_store import get_store
+from modules.derived_metrics import DERIVED_METRICS
+from modules.transport import accepted_encoding, compress
+
+# --- 1. CONFIGURACIÓN ---
+METRIC_TYPES = ('total', 'per_capita')
+FORMATS = {'json': 'application/json', 'csv': 'text/csv; charset=utf-8'}
+
+
+class ApiError(Exception):
+    """Petición inválida: se responde con `status` y un JSON {'error': mensaje}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# --- 2. NEGOCIACIÓN, ETAG Y COMPRESIÓN ---
+def _response_format():
+    fmt = flask.request.args.get('format')
+    if fmt is None:
+        fmt = 'csv' if flask.request.accept_mimetypes.best_match(['application/json', 'text/csv']) == 'text/csv' else 'json'
+    if fmt not in FORMATS:
+        raise ApiError(400, f"formato desconocido: '{fmt}'")
+    return fmt
+
+
+def _etag(tag, fmt, encoding):
+    """
+    ETag fuerte: misma etiqueta del dataset, misma URL, mismo formato y misma
+    codificación producen exactamente los mismos bytes.
+    """
+    digest = hashlib.sha256(f'{tag}|{flask.request.full_path}|{fmt}'.encode('utf-8'))
+    return f'{digest.hexdigest()[:32]}-{encoding or "identity"}'
+
+
+def _render(frame, fmt):
+    if fmt == 'csv':
+        return frame.to_csv(index=False).encode('utf-8')
+    return frame.to_json(orient='records').encode('utf-8')
+
+
+def data_response(dataset, build):
+    """
+    Respuesta GET condicional para los datos de `build(df)`, un DataFrame.
+    Si el cliente ya tiene la versión vigente (`If-None-Match`) responde 304 sin
+    calcular nada; si no, serializa, comprime y añade las cabeceras de caché.
+    """
+    try:
+        df, _, tag = dataset.snapshot()
+        fmt = _response_format()
+        encoding = accepted_encoding()
+        etag = _etag(tag, fmt, encoding)
+
+        if flask.request.if_none_match.contains(etag):
+            response = flask.Response(status=304)
+        else:
+            body, applied = compress(_render(build(df), fmt), encoding)
+            response = flask.Response(body, mimetype=FORMATS[fmt])
+            if applied:
+                response.headers['Content-Encoding'] = applied
+    except ApiError as e:
+        return flask.jsonify({'error': e.message}), e.status
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={int(dataset.poll_seconds)}'
+    response.vary.add('Accept-Encoding')
+    response.vary.add('Accept')
+    return response
+
+
+# --- 3. PARÁMETROS ---
+def _metric_type(allowed=METRIC_TYPES):
+    metric_type = flask.request.args.get('metric', 'total')
+    if metric_type not in allowed:
+        raise ApiError(400, f"métrica desconocida: '{metric_type}'")
+    return metric_type
+
+
+def _year(available):
+    """Año pedido en ?year= o, si falta, el último disponible."""
+    available = [int(year) for year in available]
+    if not available:
+        raise ApiError(404, 'no hay años disponibles')
+    raw = flask.request.args.get('year')
+    if raw is None:
+        return available[-1]
+    if not raw.isdigit():
+        raise ApiError(400, 'el año debe ser un número entero')
+    if int(raw) not in available:
+        raise ApiError(404, f"año sin datos: '{raw}'")
+    return int(raw)
+
+
+def _top_n(default=10):
+    """Tamaño del top pedido en ?n= (entero positivo)."""
+    raw = flask.request.args.get('n')
+    if raw is None:
+        return default
+    if not raw.isdigit() or int(raw) < 1:
+        raise ApiError(400, 'n debe ser un entero positivo')
+    return int(raw)
+
+
+def _series_metrics():
+    """Métricas de /api/series: las del dashboard, la población y las derivadas registradas."""
+    return (*METRIC_TYPES, 'population', *(name for name in DERIVED_METRICS if name not in METRIC_TYPES))
+
+
+def _years():
+    """Años pedidos en ?year= (repetible), o None si no se pide ninguno."""
+    raw = flask.request.args.getlist('year')
+    if not all(year.isdigit() for year in raw):
+        raise ApiError(400, 'el año debe ser un número entero')
+    return [int(year) for year in raw] or None
+
+
+# --- 4. ENDPOINTS ---
+def create_api(dataset):
+    """
+    Blueprint de solo lectura con los datos del dashboard en JSON o CSV
+    (?format=csv o cabecera Accept), servido desde `dataset`:
+
+        /api/metrics                      métricas por país (?metric=, ?country= repetible)
+        /api/countries/<país>/series      serie anual de un país (?metric=)
+        /api/series                       series en formato largo (?metric= con 'population' y las
+                                          derivadas 'growth', 'cagr', 'share'; ?country= y ?year= repetibles)
+        /api/world                        PIB mundial total y crecimiento por año
+        /api/continents/growth            crecimiento por continente (?year=)
+        /api/population                   población por país (?year=)
+        /api/ranking                      top N con puesto, percentil y cuota (?metric=, ?year=, ?n=,
+                                          ?country= repetible para añadir sus puestos)
+    """
+    api = flask.Blueprint('api', __name__, url_prefix='/api')
+
+    @api.route('/metrics')
+    def metrics():
+        def build(df):
+            countries = flask.request.args.getlist('country') or None
+            return analyze_countries(df, countries, _metric_type()).reset_index()
+        return data_response(dataset, build)
+
+    @api.route('/countries/<path:country>/series')
+    def country_series(country):
+        def build(df):
+            series = analyze_country_series(df, country, _metric_type())
+            if series is None:
+                raise ApiError(404, f"país desconocido: '{country}'")
+            return series
+        return data_response(dataset, build)
+
+    @api.route('/series')
+    def series():
+        def build(df):
+            countries = flask.request.args.getlist('country') or None
+            return analyze_series(df, countries, _metric_type(_series_metrics()), _years())
+        return data_response(dataset, build)
+
+    @api.route('/world')
+    def world():
+        def build(df):
+            world_metrics = analyze_world_data(df)
+            totals = world_metrics['world_total_gdp'].rename(columns={'Año': 'year', 'PIB (Billones USD)': 'gdp'})
+            growth = world_metrics['world_growth_data'].rename(columns={'Año': 'year', 'Crecimiento (%)': 'growth_percent'})
+            return totals.merge(growth, on='year', how='left')
+        return data_response(dataset, build)
+
+    @api.route('/continents/growth')
+    def continent_growth():
+        def build(df):
+            year = _year(sorted(get_store(df).continent_growth))
+            growth = analyze_continent_growth(df, year)
+            return growth.rename(columns={'Continent': 'continent', 'Growth': 'growth_percent'})
+        return data_response(dataset, build)
+
+    @api.route('/population')
+    def population():
+        def build(df):
+            year = _year(get_store(df).pop_years)
+            frame = analyze_population(df, year)
+            if 'CCA3' in df.columns:
+                frame.insert(1, 'cca3', df['CCA3'].to_numpy())
+            return frame
+        return data_response(dataset, build)
+
+    @api.route('/ranking')
+    def ranking():
+        def build(df):
+            metric_type = _metric_type()
+            year = _year(get_store(df).rankings[metric_type].years)
+            return analyze_ranking(df, metric_type, year, _top_n(), flask.request.args.getlist('country'))
+        return data_response(dataset, build)
+
+    return api
@@ -0,0 +1,41 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# --- 1. CONFIGURACIÓN ---
+# Selecciones con al menos este número de países se calculan en segundo plano.
+MIN_COUNTRIES = int(os.environ.get('VIZPIB_BACKGROUND_MIN_COUNTRIES', 8))
+# Segundos que se conservan en disco los resultados (y las selecciones ya calculadas).
+RESULT_EXPIRE_SECONDS = int(os.environ.get('VIZPIB_BACKGROUND_EXPIRE', 3600))
+# Cada cuánto (ms) el navegador pregunta por el progreso de un cálculo en curso.
+POLL_INTERVAL_MS = int(os.environ.get('VIZPIB_BACKGROUND_POLL_MS', 250))
+
+
+def create_manager(cache_dir, cache_by=None):
+    """
+    Gestor de callbacks en segundo plano de Dash sobre diskcache: cada cálculo
+    corre en un proceso hijo y el resultado se deja en `cache_dir`, compartido
+    por todos los workers, sin broker externo. `cache_by` (lista de funciones)
+    se añade a la clave de los resultados, que se conservan y se reutilizan
+    mientras esas funciones devuelvan lo mismo.
+
+    Devuelve None si faltan las dependencias opcionales (diskcache, multiprocess,
+    psutil) o si VIZPIB_BACKGROUND=0; entonces todo se calcula en el propio worker.
+    """
+    if os.environ.get('VIZPIB_BACKGROUND', '1') == '0':
+        return None
+    try:
+        import diskcache
+        import multiprocess  # noqa: F401  (lo usa DiskcacheManager para lanzar los procesos)
+        import psutil  # noqa: F401  (lo usa DiskcacheManager para cancelar procesos)
+        from dash import DiskcacheManager
+    except ImportError:
+        logger.warning('diskcache/multiprocess/psutil no están instalados; las comparaciones se calculan en el worker.')
+        return None
+    return DiskcacheManager(diskcache.Cache(cache_dir), cache_by=cache_by, expire=RESULT_EXPIRE_SECONDS)
+
+
+def is_heavy(selected_countries, manager):
+    """True si la selección debe calcularse en segundo plano."""
+    return manager is not None and len(selected_countries or ()) >= MIN_COUNTRIES
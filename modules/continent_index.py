@@ -0,0 +1,63 @@
+import json
+import os
+
+import pandas as pd
+
+from modules.analyzer import get_continent
+
+# Fichero con el mapa país -> continente ya resuelto. Se regenera solo si
+# aparecen países nuevos; borrarlo fuerza una resolución completa.
+INDEX_FILENAME = 'continent_index.json'
+
+
+def default_index_path(pop_path):
+    """Ruta del índice, junto a los datos de población (data/cache/)."""
+    return os.path.join(os.path.dirname(pop_path), 'cache', INDEX_FILENAME)
+
+
+def load_continent_index(index_path):
+    """Lee el índice desde disco. Devuelve un dict vacío si no existe o está dañado."""
+    try:
+        with open(index_path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_continent_index(index_path, mapping):
+    """Escribe el índice de forma atómica para que otros procesos nunca lean un fichero a medias."""
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f'{index_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(mapping, fh, ensure_ascii=False, sort_keys=True, indent=0)
+    os.replace(tmp_path, index_path)
+
+
+def resolve_continents(countries, joined, index_path):
+    """
+    Devuelve una columna categórica de continentes alineada con `countries`.
+
+    `joined` trae el continente obtenido al unir con world_population.csv; solo
+    los países sin coincidencia se buscan en el índice en disco y, en último
+    término, con `get_continent` (pycountry_convert).
+    """
+    index = load_continent_index(index_path)
+    resolved = {}
+    pending = []
+    for country, continent in zip(countries, joined):
+        if isinstance(continent, str):
+            resolved[country] = continent
+        elif country in index:
+            resolved[country] = index[country]
+        else:
+            pending.append(country)
+
+    for country in pending:
+        resolved[country] = get_continent(country)
+
+    if pending or any(index.get(country) != continent for country, continent in resolved.items()):
+        index.update(resolved)
+        save_continent_index(index_path, index)
+
+    continents = [resolved[country] for country in countries]
+    return pd.Categorical(continents, categories=sorted(set(continents)))
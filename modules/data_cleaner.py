@@ -1,5 +1,9 @@
+import logging
+
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 def clean_gdp_data(df):
     """
     Limpia y estandariza el DataFrame del PIB.
@@ -16,6 +20,6 @@ def clean_gdp_data(df):
             cols_to_rename[col] = f'GDP_{col}'
 
     cleaned_df.rename(columns=cols_to_rename, inplace=True)
-    print(">>> Columnas de año estandarizadas a formato 'GDP_YYYY'.")
+    logger.debug("Columnas de año estandarizadas a formato 'GDP_YYYY'.")
     
     return cleaned_df
\ No newline at end of file
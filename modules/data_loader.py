@@ -1,14 +1,302 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_gdp_data(file_path):
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # Opcional: sin pyarrow se lee por bloques con pandas
+    pa = pa_csv = None
+
+logger = logging.getLogger(__name__)
+
+# --- LECTURA POR BLOQUES Y VALIDACIÓN ---
+# Tamaño de bloque: bytes con el lector de pyarrow (multihilo), filas con pandas.
+CHUNK_BYTES = int(os.environ.get('VIZPIB_CSV_CHUNK_BYTES', 16 << 20))
+CHUNK_ROWS = int(os.environ.get('VIZPIB_CSV_CHUNK_ROWS', 100_000))
+# Filas de ejemplo que se guardan en cada incidencia
+MAX_ISSUE_ROWS = 5
+
+
+class SourceSchema:
+    """
+    Esquema mínimo de un CSV fuente: columnas clave de texto (obligatorias y no
+    vacías) y columnas numéricas, reconocidas por `is_numeric(nombre)`. Se
+    exige al menos una columna numérica.
+    """
+
+    def __init__(self, name, keys, is_numeric):
+        self.name = name
+        self.keys = list(keys)
+        self.is_numeric = is_numeric
+
+    def numeric_columns(self, columns):
+        return [col for col in columns if self.is_numeric(str(col))]
+
+
+GDP_SCHEMA = SourceSchema('pib', ['Country'], lambda col: col.isdigit())
+POPULATION_SCHEMA = SourceSchema(
+    'población', ['Country/Territory'],
+    lambda col: col.endswith(' Population') and col.split(' ')[0].isdigit()
+)
+
+
+class LoadIssue:
+    """
+    Incidencia al leer una fuente, con sus datos en campos (no solo en el
+    texto): fichero, bloque, columna, filas de ejemplo (numeradas desde 1,
+    sin contar la cabecera) y número total de filas afectadas. Con `fatal`
+    la fuente entera se descarta.
+    """
+
+    def __init__(self, source, problem, chunk=None, column=None, rows=(), count=0, fatal=False):
+        self.source = source
+        self.problem = problem
+        self.chunk = chunk
+        self.column = column
+        self.rows = [int(row) for row in rows[:MAX_ISSUE_ROWS]]
+        self.count = int(count)
+        self.fatal = fatal
+
+    def as_dict(self):
+        return {
+            'source': self.source, 'problem': self.problem, 'chunk': self.chunk, 'column': self.column,
+            'rows': self.rows, 'count': self.count, 'fatal': self.fatal,
+        }
+
+    def __str__(self):
+        where = ', '.join(filter(None, (
+            f'bloque {self.chunk}' if self.chunk is not None else None,
+            f"columna '{self.column}'" if self.column is not None else None,
+            f'{self.count} filas (p. ej. {self.rows})' if self.count else None,
+        )))
+        return f"{self.source}: {self.problem}" + (f' [{where}]' if where else '')
+
+    def log(self):
+        level = logging.ERROR if self.fatal else logging.WARNING
+        logger.log(level, '%s', self, extra={'issue': self.as_dict()})
+
+
+def _arrow_chunks(file_path, schema, header):
+    """Bloques como DataFrame con el lector en streaming de pyarrow: claves como texto, numéricas como float64."""
+    column_types = {key: pa.string() for key in schema.keys}
+    column_types.update({col: pa.float64() for col in schema.numeric_columns(header)})
+    reader = pa_csv.open_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(block_size=CHUNK_BYTES, use_threads=True),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _pandas_chunks(file_path, schema):
+    """Bloques de `CHUNK_ROWS` filas con pandas; las claves se leen como texto."""
+    yield from pd.read_csv(file_path, chunksize=CHUNK_ROWS, dtype={key: str for key in schema.keys})
+
+
+def _validate_chunk(chunk, schema, source, number, first_row, issues):
+    """
+    Descarta filas sin clave y convierte las columnas numéricas a float64. Los
+    valores no numéricos quedan vacíos y se anotan en `issues`.
+    """
+    row_numbers = first_row + np.arange(len(chunk)) + 1
+    for key in schema.keys:
+        missing = chunk[key].isna().to_numpy() | (chunk[key].astype(str).str.strip() == '').to_numpy()
+        if missing.any():
+            rows = row_numbers[missing]
+            issues.append(LoadIssue(source, 'filas sin clave descartadas', number, key, rows, len(rows)))
+            chunk, row_numbers = chunk[~missing], row_numbers[~missing]
+
+    converted = {}
+    for col in schema.numeric_columns(chunk.columns):
+        if chunk[col].dtype == np.float64:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce').astype(np.float64)
+        invalid = (values.isna() & chunk[col].notna()).to_numpy()
+        if invalid.any():
+            rows = row_numbers[invalid]
+            issues.append(LoadIssue(source, 'valores no numéricos leídos como vacíos', number, col, rows, len(rows)))
+        converted[col] = values
+    return chunk.assign(**converted) if converted else chunk
+
+
+def _read_chunks(chunks, schema, source, issues):
+    frames, first_row = [], 0
+    for number, chunk in enumerate(chunks):
+        rows = len(chunk)
+        frames.append(_validate_chunk(chunk, schema, source, number, first_row, issues))
+        first_row += rows
+    return pd.concat(frames, ignore_index=True) if frames else None
+
 
+def read_source(file_path, schema, issues=None):
+    """
+    Lee un CSV fuente por bloques validando cada uno contra `schema`. Usa el
+    lector multihilo de pyarrow si está instalado; si algún valor no se puede
+    convertir, relee el fichero por bloques con pandas para localizarlo.
+
+    Devuelve el DataFrame o None si la fuente no se puede usar (no existe, no
+    es legible o le faltan columnas obligatorias). Las incidencias se registran
+    con `logging` y, si se pasa `issues`, se añaden también a esa lista.
+    """
+    found = []
+    df = None
     try:
-        df = pd.read_csv(file_path)
-        print(">>> Datos cargados exitosamente.")
-        return df
+        header = list(pd.read_csv(file_path, nrows=0).columns)
+        missing = [key for key in schema.keys if key not in header]
+        if missing or not schema.numeric_columns(header):
+            problem = f"faltan columnas obligatorias: {missing}" if missing else 'no hay columnas numéricas'
+            found.append(LoadIssue(file_path, f'esquema de {schema.name} no válido, {problem}', fatal=True))
+        elif pa_csv is not None:
+            try:
+                df = _read_chunks(_arrow_chunks(file_path, schema, header), schema, file_path, found)
+            except pa.ArrowInvalid as e:
+                logger.info('%s: pyarrow no pudo convertir el fichero (%s); se relee con pandas.', file_path, e)
+                found.clear()
+                df = _read_chunks(_pandas_chunks(file_path, schema), schema, file_path, found)
+        else:
+            df = _read_chunks(_pandas_chunks(file_path, schema), schema, file_path, found)
     except FileNotFoundError:
-        print(f">>> Error: El archivo no se encontró en la ruta '{file_path}'")
-        return None
-    except Exception as e:
-        print(f">>> Error al cargar los datos: {e}")
-        return None
\ No newline at end of file
+        found.append(LoadIssue(file_path, 'el archivo no existe', fatal=True))
+    except (OSError, ValueError, pd.errors.ParserError) as e:
+        found.append(LoadIssue(file_path, f'no se pudo leer: {e}', fatal=True))
+        df = None
+
+    for issue in found:
+        issue.log()
+    if issues is not None:
+        issues.extend(found)
+    if df is not None:
+        logger.info('%s: %d filas cargadas.', file_path, len(df), extra={'source': file_path, 'rows': len(df)})
+    return df
+
+
+def load_gdp_data(file_path, issues=None):
+    """CSV de PIB (Country + una columna por año) validado por bloques. None si no se puede usar."""
+    return read_source(file_path, GDP_SCHEMA, issues)
+
+
+# --- DESCUBRIMIENTO DE FICHEROS DE PIB AÑADIDOS ---
+def is_gdp_source(file_path):
+    """Un CSV es fuente de PIB si tiene columna 'Country' y al menos una columna de año."""
+    try:
+        header = pd.read_csv(file_path, nrows=0).columns
+    except Exception:
+        return False
+    return 'Country' in header and any(str(col).isdigit() for col in header)
+
+
+def discover_gdp_sources(data_dir, base_path, exclude=()):
+    """
+    Ficheros de PIB añadidos en `data_dir` además de `base_path`, ordenados por
+    fecha de modificación (y nombre) para aplicarlos en el orden en que llegaron.
+    """
+    skip = {os.path.abspath(path) for path in (base_path, *exclude)}
+    candidates = []
+    for entry in os.scandir(data_dir):
+        path = os.path.abspath(entry.path)
+        if entry.is_file() and entry.name.endswith('.csv') and path not in skip and is_gdp_source(path):
+            candidates.append((entry.stat().st_mtime_ns, entry.name, entry.path))
+    return [path for _, _, path in sorted(candidates)]
+
+
+# --- CACHÉ BINARIA DEL DATASET PREPARADO ---
+def file_fingerprint(file_path, previous=None):
+    """
+    Huella de un fichero fuente: mtime, tamaño y SHA-256 del contenido. Si mtime
+    y tamaño coinciden con `previous` se reutiliza su hash sin releer el fichero.
+    """
+    stat = os.stat(file_path)
+    if previous and previous.get('mtime') == stat.st_mtime_ns and previous.get('size') == stat.st_size:
+        return previous
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest.hexdigest()}
+
+
+class FrameCache:
+    """
+    Guarda el DataFrame preparado en Parquet junto a un manifiesto con las
+    huellas de los CSV de origen. La clave depende del contenido de los CSV y
+    de `version` (el formato de preparación), así que cualquier cambio en
+    ellos invalida la caché.
+    """
+
+    MANIFEST = 'merged_manifest.json'
+
+    def __init__(self, cache_dir, sources, version):
+        self.cache_dir = cache_dir
+        self.sources = [os.path.abspath(path) for path in sources]
+        self.version = version
+        self.manifest = self._read_manifest()
+        self.fingerprints = None
+        self.key = None
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.MANIFEST), encoding='utf-8') as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _compute_key(self):
+        previous = self.manifest.get('sources', {})
+        self.fingerprints = {path: file_fingerprint(path, previous.get(path)) for path in self.sources}
+        digest = hashlib.sha256(str(self.version).encode('utf-8'))
+        for path in self.sources:
+            digest.update(self.fingerprints[path]['sha256'].encode('utf-8'))
+        self.key = digest.hexdigest()[:16]
+
+    def _frame_path(self):
+        return os.path.join(self.cache_dir, f'merged_{self.key}.parquet')
+
+    def load(self):
+        """Devuelve el DataFrame cacheado o None si no existe o los CSV han cambiado."""
+        try:
+            self._compute_key()
+        except OSError:
+            return None
+        if self.manifest.get('key') != self.key or not os.path.exists(self._frame_path()):
+            return None
+        try:
+            df = pd.read_parquet(self._frame_path())
+        except Exception as e:
+            logger.warning('No se pudo leer la caché binaria (%s); se reconstruye desde CSV.', e)
+            return None
+        if self.manifest.get('sources') != self.fingerprints:
+            # Mismo contenido con otro mtime (p. ej. tras un checkout): refrescar el atajo
+            self._write_manifest()
+        logger.info('Datos preparados cargados desde la caché binaria.')
+        return df
+
+    def save(self, df):
+        """Escribe el DataFrame y el manifiesto de forma atómica. Un fallo solo se avisa."""
+        try:
+            if self.key is None:
+                self._compute_key()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{self._frame_path()}.{os.getpid()}.tmp'
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._frame_path())
+            self._write_manifest()
+            for name in os.listdir(self.cache_dir):
+                if name.startswith('merged_') and name.endswith('.parquet') and name != os.path.basename(self._frame_path()):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except Exception as e:
+            logger.warning('No se pudo escribir la caché binaria: %s', e)
+
+    def _write_manifest(self):
+        self.manifest = {'key': self.key, 'version': self.version, 'sources': self.fingerprints}
+        manifest_path = os.path.join(self.cache_dir, self.MANIFEST)
+        tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(self.manifest, fh, indent=2)
+        os.replace(tmp_path, manifest_path)
@@ -1,64 +1,200 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-from modules.data_loader import load_gdp_data
+from modules.data_loader import load_gdp_data, read_source, FrameCache, POPULATION_SCHEMA
+from modules.data_cleaner import clean_gdp_data
+from modules.analytics_store import build_store, shared_array_dir
+from modules.continent_index import default_index_path, resolve_continents
+from modules.derived_metrics import with_derived_columns
+
+# Versión del formato preparado: incrementarla al cambiar la lógica de este
+# módulo invalida la caché binaria de todos los despliegues.
+PREPARED_FORMAT_VERSION = 6
+
+logger = logging.getLogger(__name__)
+
+# Con VIZPIB_SHARED_ARRAYS=1 las matrices numéricas del almacén se mapean desde
+# disco y todos los workers de gunicorn comparten las mismas páginas.
+SHARED_ARRAYS = os.environ.get('VIZPIB_SHARED_ARRAYS', '0') == '1'
+
+# Con VIZPIB_FLOAT32=1 las columnas de PIB, per cápita y población (y las
+# matrices del almacén) se guardan en float32: la mitad de memoria por worker a
+# cambio de unas 7 cifras significativas.
+FLOAT32 = os.environ.get('VIZPIB_FLOAT32', '0') == '1'
 
-def prepare_merged_data(gdp_path, pop_path):
+# Claves de texto que se guardan como categóricas
+KEY_COLUMNS = ['Country', 'CCA3']
+
+def prepare_merged_data(gdp_path, pop_path, extra_gdp_paths=(), cache_dir=None, use_cache=True, issues=None):
     """
     Carga, une y prepara los datos de PIB y población (histórica).
     VERSIÓN CON CORRECCIÓN DE SettingWithCopyWarning.
+
+    `extra_gdp_paths` son ficheros de PIB añadidos después (años o países
+    nuevos) que se incorporan sobre el principal en modo append-only. Todos
+    los CSV se leen a la vez, cada uno en su hilo; las incidencias de lectura
+    se añaden a `issues` si se pasa una lista (ver `read_source`).
+
+    El resultado se guarda en una caché Parquet (por defecto data/cache/) y los
+    arranques siguientes la leen directamente mientras los CSV no cambien.
     """
-    # 1. Cargar datos de PIB
-    df_gdp = load_gdp_data(gdp_path)
-    if df_gdp is None:
-        return None
-    cols_to_rename_gdp = {col: f'GDP_{col}' for col in df_gdp.columns if col.isdigit()}
-    df_gdp.rename(columns=cols_to_rename_gdp, inplace=True)
-
-    # 2. Cargar y preparar datos de población
-    try:
-        df_pop_raw = pd.read_csv(pop_path)
-        
-        columns_to_map = {
-            'Country/Territory': 'Country',
-            'CCA3': 'CCA3',
-            '2022 Population': 'Population_2022',
-            '2020 Population': 'Population_2020',
-            '2015 Population': 'Population_2015',
-            '2010 Population': 'Population_2010',
-            '2000 Population': 'Population_2000',
-            '1990 Population': 'Population_1990',
-            '1980 Population': 'Population_1980',
-            '1970 Population': 'Population_1970'
-        }
-
-        existing_cols = [col for col in columns_to_map.keys() if col in df_pop_raw.columns]
-        
-        # --- CORRECCIÓN DEFINITIVA ---
-        # Forzamos a Pandas a crear una COPIA explícita
-        df_pop = df_pop_raw[existing_cols].copy()
-        # -----------------------------
-        
-        df_pop.rename(columns=columns_to_map, inplace=True)
-
-        if 'Population_2022' in df_pop.columns:
-            # Ahora esta asignación SÍ es segura
-            df_pop['Population'] = df_pop['Population_2022']
-
-    except FileNotFoundError:
-        print(f">>> Error: El archivo de población no se encontró en '{pop_path}'")
+    # 0. Caché binaria
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(gdp_path), 'cache')
+    sources = [gdp_path, *extra_gdp_paths, pop_path]
+    version = f'{PREPARED_FORMAT_VERSION}-float32' if FLOAT32 else PREPARED_FORMAT_VERSION
+    frame_cache = FrameCache(cache_dir, sources, version) if use_cache else None
+    cached_df = frame_cache.load() if frame_cache else None
+    if cached_df is not None:
+        cached_df = compact_frame(cached_df)
+        build_store(cached_df, shared_dir=_shared_dir(cache_dir, frame_cache))
+        return cached_df
+
+    # 1. Leer a la vez el PIB (fichero principal + añadidos) y la población
+    with ThreadPoolExecutor(max_workers=len(extra_gdp_paths) + 2, thread_name_prefix='vizpib-load') as pool:
+        gdp_loads = [pool.submit(load_gdp_data, path, issues) for path in (gdp_path, *extra_gdp_paths)]
+        pop_load = pool.submit(load_population_data, pop_path, issues)
+        gdp_frames = [load.result() for load in gdp_loads]
+        df_pop = pop_load.result()
+
+    # 2. PIB principal y añadidos en modo append-only
+    df_gdp = clean_gdp_data(gdp_frames[0])
+    if df_gdp is None or df_pop is None:
         return None
-    
+    for df_extra in map(clean_gdp_data, gdp_frames[1:]):
+        if df_extra is None:
+            continue
+        df_gdp, added, _, _ = append_gdp_source(df_gdp, df_extra)
+        df_gdp = pd.concat([df_gdp, added], ignore_index=True)
+
     # 3. Unir los dos datasets
+    df_merged = attach_population(df_gdp, df_pop, pop_path)
+
+    # 4. Métricas derivadas guardadas como columnas (PIB per cápita por año)
+    df_merged = with_derived_columns(df_merged, gdp_year_columns(df_merged))
+    df_merged = compact_frame(order_columns(df_merged))
+
+    # 5. Guardar en caché y precalcular el almacén analítico (una sola vez por proceso)
+    if frame_cache:
+        frame_cache.save(df_merged)
+    build_store(df_merged, shared_dir=_shared_dir(cache_dir, frame_cache))
+
+    logger.info('Datos de PIB y población (histórica) unidos y procesados: %d países.', len(df_merged))
+    return df_merged
+
+def load_population_data(pop_path, issues=None):
+    """Lee world_population.csv (validado por bloques) y lo adapta al esquema del dashboard. None si no se puede usar."""
+    df_pop_raw = read_source(pop_path, POPULATION_SCHEMA, issues)
+    if df_pop_raw is None:
+        return None
+
+    columns_to_map = {
+        'Country/Territory': 'Country',
+        'CCA3': 'CCA3',
+        'Continent': 'Continent',
+        '2022 Population': 'Population_2022',
+        '2020 Population': 'Population_2020',
+        '2015 Population': 'Population_2015',
+        '2010 Population': 'Population_2010',
+        '2000 Population': 'Population_2000',
+        '1990 Population': 'Population_1990',
+        '1980 Population': 'Population_1980',
+        '1970 Population': 'Population_1970'
+    }
+
+    existing_cols = [col for col in columns_to_map.keys() if col in df_pop_raw.columns]
+
+    # --- CORRECCIÓN DEFINITIVA ---
+    # Forzamos a Pandas a crear una COPIA explícita
+    df_pop = df_pop_raw[existing_cols].copy()
+    # -----------------------------
+
+    df_pop.rename(columns=columns_to_map, inplace=True)
+
+    if 'Population_2022' in df_pop.columns:
+        # Ahora esta asignación SÍ es segura
+        df_pop['Population'] = df_pop['Population_2022']
+    return df_pop
+
+def attach_population(df_gdp, df_pop, pop_path):
+    """Une población, CCA3 y continente a un DataFrame de PIB (Country + GDP_YYYY)."""
     df_merged = pd.merge(df_gdp, df_pop, on='Country', how='left')
 
-    # 4. Calcular el PIB per cápita
-    if 'Population' in df_merged.columns:
-        gdp_cols = [col for col in df_merged.columns if 'GDP_' in col]
-        for col in gdp_cols:
-            year = col.split('_')[1]
-            try:
-                df_merged[f'GDP_per_capita_{year}'] = (df_merged[col].astype(float) * 1_000_000_000) / df_merged['Population'].astype(float)
-            except (TypeError, ValueError):
-                df_merged[f'GDP_per_capita_{year}'] = pd.NA
-    
-    print(">>> Datos de PIB y población (histórica) unidos y procesados.")
-    return df_merged
\ No newline at end of file
+    # Continente: el que trae el CSV de población y, para los países sin
+    # coincidencia, el índice persistente / pycountry_convert
+    joined_continents = df_merged['Continent'] if 'Continent' in df_merged.columns else [None] * len(df_merged)
+    df_merged['Continent'] = resolve_continents(df_merged['Country'], joined_continents, default_index_path(pop_path))
+    return df_merged
+
+def gdp_year_columns(df):
+    """Columnas 'GDP_YYYY' (sin las per cápita) ordenadas por año."""
+    return sorted(col for col in df.columns if col.startswith('GDP_') and col[4:].isdigit())
+
+def order_columns(df):
+    """Country, PIB por año, columnas de población/atributos y PIB per cápita por año."""
+    gdp_cols = gdp_year_columns(df)
+    pc_cols = sorted(col for col in df.columns if col.startswith('GDP_per_capita_'))
+    others = [col for col in df.columns if col != 'Country' and col not in gdp_cols and col not in pc_cols]
+    return df[['Country', *gdp_cols, *others, *pc_cols]]
+
+def compact_frame(df, float32=FLOAT32):
+    """
+    Versión compacta del DataFrame preparado: claves de texto (`KEY_COLUMNS`)
+    categóricas, índice por país para búsquedas O(1) con `df.loc[país]` y, con
+    `float32`, columnas de PIB, per cápita y población en float32. El almacén
+    analítico hereda el tipo de esas columnas.
+    """
+    dtypes = {col: 'category' for col in KEY_COLUMNS if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)}
+    if float32:
+        dtypes.update({
+            col: np.float32 for col in df.columns
+            if col.startswith(('GDP_', 'Population')) and df[col].dtype != np.float32
+        })
+    # Sin columnas que convertir, copia superficial: el índice nuevo no debe tocar el `df` del llamador
+    compact = df.astype(dtypes) if dtypes else df.copy(deep=False)
+    compact.index = pd.CategoricalIndex(compact['Country'], name='country')
+    return compact
+
+def append_gdp_source(df, new):
+    """
+    Incorpora un fichero de PIB ya normalizado (Country + GDP_YYYY) sin alterar
+    datos existentes: los años nuevos se añaden como columnas y solo se rellenan
+    celdas vacías de los países conocidos.
+
+    Devuelve (df_actualizado, países_nuevos, filas_modificadas, columnas_nuevas).
+    Los países nuevos se devuelven aparte para que el llamador los complete
+    antes de añadirlos al final.
+    """
+    new = new.drop_duplicates(subset='Country', keep='last')
+    gdp_cols = gdp_year_columns(new)
+    new_cols = [col for col in gdp_cols if col not in df.columns]
+
+    positions = pd.Index(df['Country']).get_indexer(new['Country'])
+    known = new[positions >= 0]
+    rows = positions[positions >= 0]
+
+    updated = df.copy()
+    for col in new_cols:
+        updated[col] = np.nan
+
+    dirty_rows = set()
+    for col in gdp_cols:
+        values = pd.to_numeric(known[col], errors='coerce').to_numpy(dtype=float)
+        current = pd.to_numeric(updated[col], errors='coerce').to_numpy(dtype=float)[rows]
+        fill = np.isnan(current) & ~np.isnan(values)
+        if fill.any():
+            updated.iloc[rows[fill], updated.columns.get_loc(col)] = values[fill]
+            if col not in new_cols:
+                dirty_rows.update(rows[fill].tolist())
+
+    added = new[positions < 0][['Country', *gdp_cols]].reset_index(drop=True)
+    return updated, added, sorted(dirty_rows), new_cols
+
+def _shared_dir(cache_dir, frame_cache):
+    """Bundle .npy asociado a la versión cacheada del dataset, si el modo compartido está activo."""
+    if not SHARED_ARRAYS or frame_cache is None or frame_cache.key is None:
+        return None
+    return shared_array_dir(cache_dir, frame_cache.key)
@@ -0,0 +1,154 @@
+import math
+import re
+
+import pandas as pd
+
+from modules.profiling import profiled
+
+# --- 1. CONFIGURACIÓN DE LA TABLA ---
+PAGE_SIZE = 20
+HIDDEN_COLUMNS = ['Continent']
+
+# Operadores que genera el filtro de dash_table (con prefijo opcional 's'/'i'
+# para distinguir mayúsculas) y su equivalente en pandas.
+_FILTER_PATTERN = re.compile(
+    r'\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>[si]?(?:contains|datestartswith|eq|ne|lt|le|gt|ge)|[si]?(?:>=|<=|!=|=|<|>))\s*'
+    r'(?P<value>.*)'
+)
+_OPERATOR_ALIASES = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+
+
+def _column_format(col):
+    """Formato de presentación de cada columna, el mismo que usaba la tabla completa."""
+    if col.startswith('GDP_per_capita_'):
+        return '${:,.0f}'
+    if col.startswith('GDP_'):
+        return '{:,.2f} B'
+    if col.startswith('Population'):
+        return '{:,.0f}'
+    return None
+
+
+def table_columns(df):
+    """Definición de columnas para `raw-data-table`, marcando como numéricas las que lo son."""
+    columns = []
+    for col in df.columns:
+        if col in HIDDEN_COLUMNS:
+            continue
+        column = {'name': col, 'id': col}
+        if _column_format(col):
+            column['type'] = 'numeric'
+        columns.append(column)
+    return columns
+
+
+# --- 2. FILTRADO Y ORDENACIÓN SOBRE LOS VALORES ORIGINALES ---
+def _parse_value(raw):
+    value = raw.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1]
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _filter_mask(df, filter_query):
+    """Traduce `filter_query` de dash_table a una máscara booleana sobre el DataFrame."""
+    mask = pd.Series(True, index=df.index)
+    if not filter_query:
+        return mask
+
+    for part in filter_query.split(' && '):
+        match = _FILTER_PATTERN.match(part.strip())
+        if not match or match['column'] not in df.columns:
+            continue
+        column = df[match['column']]
+        operator = match['operator'].lstrip('si')
+        operator = _OPERATOR_ALIASES.get(operator, operator)
+        value = _parse_value(match['value'])
+
+        if operator in ('contains', 'datestartswith'):
+            # Texto tal cual lo escribió el usuario: '1' no debe convertirse en '1.0'
+            value = value if isinstance(value, str) else match['value'].strip()
+            text = column.astype(str)
+            case = not match['operator'].startswith('i')
+            if operator == 'contains':
+                mask &= text.str.contains(value, case=case, regex=False)
+            else:
+                mask &= text.str.startswith(value)
+        else:
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype(object)  # Las categóricas solo admiten ==/!= con sus categorías
+            if isinstance(value, float):
+                column = pd.to_numeric(column, errors='coerce')
+            mask &= getattr(column, operator)(value).fillna(False).astype(bool)
+    return mask
+
+
+def _format_page(page):
+    """Formatea solo las filas visibles; el resto del DataFrame nunca se convierte a texto."""
+    formatted = {}
+    for col in page.columns:
+        if col in HIDDEN_COLUMNS:
+            continue
+        fmt = _column_format(col)
+        values = page[col]
+        if fmt:
+            values = values.map(lambda x, fmt=fmt: fmt.format(x) if pd.notna(x) else 'N/A')
+        else:
+            values = values.astype(object).where(values.notna(), 'N/A')
+        formatted[col] = values
+    return pd.DataFrame(formatted).to_dict('records')
+
+
+@profiled('data')
+def table_page(df, page_current, page_size, sort_by, filter_query):
+    """
+    Devuelve (filas, número de páginas) para la página solicitada por la tabla,
+    aplicando filtro y orden sobre los valores numéricos originales.
+    """
+    page_size = page_size or PAGE_SIZE
+    page_current = page_current or 0
+
+    view = df[_filter_mask(df, filter_query)] if filter_query else df
+    if sort_by:
+        columns = [item['column_id'] for item in sort_by if item['column_id'] in view.columns]
+        ascending = [item['direction'] == 'asc' for item in sort_by if item['column_id'] in view.columns]
+        if columns:
+            view = view.sort_values(by=columns, ascending=ascending, na_position='last')
+
+    page_count = max(1, math.ceil(len(view) / page_size))
+    start = page_current * page_size
+    return _format_page(view.iloc[start:start + page_size]), page_count
+
+
+# --- 3. CLASIFICACIÓN ---
+LEADERBOARD_COLUMNS = [
+    {'name': 'Puesto', 'id': 'rank'},
+    {'name': 'País', 'id': 'country'},
+    {'name': 'Valor', 'id': 'value'},
+    {'name': 'Percentil', 'id': 'percentile'},
+    {'name': 'Cuota mundial', 'id': 'share_percent'},
+]
+
+
+def leaderboard_rows(table, metric_type):
+    """Filas de `ranking-leaderboard` a partir de `analyze_ranking`, con los formatos de la tabla principal."""
+    if table is None:
+        return []
+    value_format = _column_format('GDP_per_capita_' if metric_type == 'per_capita' else 'GDP_')
+    shares = table['share_percent'] if 'share_percent' in table.columns else [None] * len(table)
+    return [
+        {
+            'rank': int(rank),
+            'country': str(country),
+            'value': value_format.format(value),
+            'percentile': f'{percentile:.1f}',
+            'share_percent': f'{share:.2f}%' if share is not None and pd.notna(share) else 'N/A',
+        }
+        for rank, country, value, percentile, share in zip(
+            table['rank'], table['country'], table['value'], table['percentile'], shares
+        )
+    ]
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+# --- 1. POBLACIÓN ALINEADA CON LOS AÑOS DE PIB ---
+def population_year_columns(df):
+    """Columnas 'Population_YYYY' (años censales) como [(año, columna)] ordenado por año."""
+    return sorted((int(col[11:]), col) for col in df.columns if col.startswith('Population_') and col[11:].isdigit())
+
+
+def aligned_population(pop_years, pop_matrix, years):
+    """
+    Población de cada fila en cada año de `years`, interpolada linealmente
+    entre los años censales `pop_years` (1970…2022 en el CSV de población).
+    Antes del primer censo y después del último se mantiene el valor más
+    cercano, sin extrapolar; si falta uno de los dos extremos del tramo se usa
+    el otro. Una sola operación sobre la matriz (filas × censos), sin bucles.
+    """
+    pop_years = np.asarray(pop_years, dtype=float)
+    pop_matrix = np.asarray(pop_matrix, dtype=np.float64)
+    years = np.asarray(years, dtype=float)
+    if not len(pop_years):
+        return np.full((pop_matrix.shape[0], len(years)), np.nan)
+
+    right = np.clip(np.searchsorted(pop_years, years, side='left'), 0, len(pop_years) - 1)
+    left = np.clip(right - 1, 0, len(pop_years) - 1)
+    span = pop_years[right] - pop_years[left]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.clip(np.where(span > 0, (years - pop_years[left]) / span, 1.0), 0.0, 1.0)
+
+    low, high = pop_matrix[:, left], pop_matrix[:, right]
+    values = low * (1 - weight) + high * weight
+    values = np.where(np.isnan(low), high, values)
+    return np.where(np.isnan(high), low, values)
+
+
+# --- 2. REGISTRO DE MÉTRICAS DERIVADAS ---
+class MetricInputs:
+    """
+    Datos de partida de las métricas derivadas: matriz de PIB (filas × `years`)
+    y población censal. La población alineada con `years` se interpola la
+    primera vez que una métrica la pide.
+    """
+
+    def __init__(self, gdp, years, pop_years=(), pop_matrix=None):
+        self.gdp = np.asarray(gdp, dtype=np.float64)
+        self.years = np.asarray(years, dtype=int)
+        self.pop_years = np.asarray(pop_years, dtype=int)
+        self.pop_matrix = pop_matrix
+        self._population = None
+
+    @property
+    def population(self):
+        if self._population is None:
+            pop_matrix = self.pop_matrix if self.pop_matrix is not None else np.empty((self.gdp.shape[0], 0))
+            self._population = aligned_population(self.pop_years, pop_matrix, self.years)
+        return self._population
+
+
+class DerivedMetric:
+    """
+    Métrica calculada a partir de `MetricInputs`: `compute(inputs)` devuelve una
+    matriz filas × años de PIB. Con `prefix`, la métrica se guarda en el
+    DataFrame preparado como columnas '<prefix>YYYY'; sin él, se calcula bajo
+    demanda desde el almacén analítico (`AnalyticsStore.derived`).
+    """
+
+    def __init__(self, name, compute, prefix=None):
+        self.name = name
+        self.compute = compute
+        self.prefix = prefix
+
+
+DERIVED_METRICS = {}
+
+
+def register_metric(name, prefix=None):
+    """
+    Decorador que registra `compute(inputs)` como métrica derivada `name`:
+
+        @register_metric('gdp_per_km2', prefix='GDP_per_km2_')
+        def gdp_per_km2(inputs):
+            return inputs.gdp / AREA[:, np.newaxis]
+    """
+    def decorator(compute):
+        DERIVED_METRICS[name] = DerivedMetric(name, compute, prefix)
+        return compute
+    return decorator
+
+
+@register_metric('per_capita', prefix='GDP_per_capita_')
+def per_capita(inputs):
+    """PIB per cápita (USD) con la población interpolada de cada año; el PIB viene en millones de USD."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return inputs.gdp * 1_000_000 / inputs.population
+
+
+@register_metric('growth')
+def growth(inputs):
+    """Variación porcentual frente al año anterior; el primer año queda en NaN."""
+    result = np.full(inputs.gdp.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[:, 1:] = (inputs.gdp[:, 1:] / inputs.gdp[:, :-1] - 1) * 100
+    return result
+
+
+@register_metric('cagr')
+def cagr(inputs):
+    """
+    Tasa de crecimiento anual compuesta (%) desde el primer año con dato de
+    cada fila hasta cada año; la última columna es la CAGR de toda la serie.
+    """
+    gdp = inputs.gdp
+    result = np.full(gdp.shape, np.nan)
+    if not gdp.size:
+        return result
+    present = ~np.isnan(gdp)
+    first = present.argmax(axis=1)
+    base = gdp[np.arange(gdp.shape[0]), first][:, np.newaxis]
+    elapsed = inputs.years[np.newaxis, :] - inputs.years[first][:, np.newaxis]
+    valid = present.any(axis=1)[:, np.newaxis] & (elapsed > 0) & (base > 0) & (gdp > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = (np.power(gdp / base, 1.0 / np.maximum(elapsed, 1)) - 1) * 100
+    result[valid] = rates[valid]
+    return result
+
+
+@register_metric('share')
+def share(inputs):
+    """Peso (%) de cada fila en el PIB mundial de cada año."""
+    totals = np.nansum(inputs.gdp, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0, inputs.gdp / totals * 100, np.nan)
+
+
+# --- 3. CÁLCULO ---
+def derive(name, inputs):
+    """Matriz filas × años de la métrica registrada `name`. KeyError si no existe."""
+    return DERIVED_METRICS[name].compute(inputs)
+
+
+def frame_inputs(df, gdp_cols):
+    """`MetricInputs` de las columnas `gdp_cols` ('GDP_YYYY') y de la población censal de `df`."""
+    pop_cols = population_year_columns(df)
+    if not pop_cols and 'Population' in df.columns:
+        # Sin histórico: la población actual para todos los años
+        pop_cols = [(0, 'Population')]
+    pop_matrix = df[[col for _, col in pop_cols]].to_numpy(dtype=np.float64, na_value=np.nan) if pop_cols else None
+    return MetricInputs(
+        df[gdp_cols].to_numpy(dtype=np.float64, na_value=np.nan),
+        [int(col[4:]) for col in gdp_cols],
+        [year for year, _ in pop_cols],
+        pop_matrix,
+    )
+
+
+def with_derived_columns(df, gdp_cols):
+    """
+    Copia de `df` con las columnas de las métricas registradas con prefijo
+    ('GDP_per_capita_YYYY', …) para los años de `gdp_cols`, calculadas como
+    matrices y añadidas (o sustituidas) de una vez con un único concat.
+    """
+    materialized = [metric for metric in DERIVED_METRICS.values() if metric.prefix]
+    if not gdp_cols or not materialized:
+        return df
+    inputs = frame_inputs(df, list(gdp_cols))
+    blocks = []
+    for metric in materialized:
+        columns = [f'{metric.prefix}{year}' for year in inputs.years]
+        blocks.append(pd.DataFrame(derive(metric.name, inputs), index=df.index, columns=columns))
+    derived = pd.concat(blocks, axis=1)
+    return pd.concat([df.drop(columns=[col for col in derived.columns if col in df.columns]), derived], axis=1)
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+# --- 1. CONFIGURACIÓN ---
+# Por encima de este número de puntos (sumando todas las trazas) se dibuja con WebGL.
+WEBGL_POINT_THRESHOLD = int(os.environ.get('VIZPIB_WEBGL_POINTS', 2000))
+# Puntos máximos por traza que se envían al navegador; el resto se reduce con LTTB.
+MAX_POINTS_PER_TRACE = int(os.environ.get('VIZPIB_MAX_POINTS_PER_TRACE', 400))
+
+
+# --- 2. LARGEST-TRIANGLE-THREE-BUCKETS ---
+def lttb(x, y, n_out):
+    """
+    Reduce la serie (x, y) a `n_out` puntos conservando su forma visual
+    (Largest-Triangle-Three-Buckets). Conserva el primer y el último punto; `x`
+    debe estar ordenado y sin NaN en `y`.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if n_out >= size or n_out < 3:
+        return x, y
+
+    # Límites de los n_out - 2 cubos interiores
+    edges = np.linspace(1, size - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Vértice C: media del cubo siguiente (o el último punto)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else size
+        cx, cy = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        ax, ay = x[previous], y[previous]
+        areas = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        previous = start + int(areas.argmax())
+        keep[bucket + 1] = previous
+    return x[keep], y[keep]
+
+
+def window(x, y, x_range):
+    """Puntos de la ventana `x_range` más uno a cada lado, para que la línea llegue a los bordes."""
+    if x_range is None:
+        return x, y
+    low, high = np.searchsorted(x, x_range[0], side='left'), np.searchsorted(x, x_range[1], side='right')
+    low, high = max(low - 1, 0), min(high + 1, len(x))
+    return x[low:high], y[low:high]
+
+
+def reduce_series(x, y, x_range=None, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Serie lista para dibujar: recortada a `x_range` y reducida con LTTB si
+    supera `max_points`. Devuelve (x, y, reducida). Los huecos (NaN) se
+    conservan salvo cuando hay que reducir.
+    """
+    x, y = window(np.asarray(x), np.asarray(y, dtype=float), x_range)
+    if len(x) <= max_points:
+        return x, y, False
+    valid = ~np.isnan(y)
+    x_out, y_out = lttb(x[valid], y[valid], max_points)
+    return x_out, y_out, True
+
+
+def zoom_range(relayout_data):
+    """
+    Ventana del eje X en un `relayoutData` de Plotly: (mín, máx), 'auto' al
+    volver a la vista completa o None si el evento no cambia el eje X.
+    """
+    if not relayout_data:
+        return None
+    if relayout_data.get('xaxis.autorange'):
+        return 'auto'
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return float(relayout_data['xaxis.range[0]']), float(relayout_data['xaxis.range[1]'])
+    if 'xaxis.range' in relayout_data:
+        low, high = relayout_data['xaxis.range']
+        return float(low), float(high)
+    return None
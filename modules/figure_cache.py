@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from modules.profiling import PROFILER
+
+# Presupuesto de memoria por proceso para las figuras serializadas (bytes).
+DEFAULT_MAX_BYTES = int(os.environ.get('VIZPIB_FIGURE_CACHE_BYTES', 64 * 1024 * 1024))
+# Accesos registrados tras los que se dividen a la mitad todas las frecuencias,
+# para que lo popular hace tiempo deje sitio a lo popular ahora.
+FREQUENCY_SAMPLE_SIZE = 10_000
+
+
+def figure_key(callback, metric_type=None, countries=None, year=None, variant=None):
+    """
+    Clave normalizada de una figura. El orden de selección de los países no
+    cambia la figura (las trazas siguen el orden del DataFrame), así que se
+    ordenan. `variant` distingue otras opciones de la figura (p. ej. el N del top).
+    """
+    countries = tuple(sorted(countries)) if countries else ()
+    return (callback, metric_type, countries, year, variant)
+
+
+class AccessFrequency:
+    """
+    Frecuencia de acceso aproximada por clave, con envejecimiento: cada
+    `sample_size` registros todos los contadores se dividen a la mitad (y los
+    que llegan a cero se olvidan), así que la memoria queda acotada. No es
+    thread-safe: lo protege quien la usa.
+    """
+
+    def __init__(self, sample_size=FREQUENCY_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._counts = {}
+        self._records = 0
+
+    def record(self, key):
+        """Registra un acceso a `key` y devuelve su frecuencia actual."""
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        self._records += 1
+        if self._records >= self.sample_size:
+            self._counts = {key: value // 2 for key, value in self._counts.items() if value > 1}
+            self._records = 0
+        return count
+
+    def count(self, key):
+        return self._counts.get(key, 0)
+
+    def clear(self):
+        self._counts.clear()
+        self._records = 0
+
+
+class FigureCache:
+    """
+    Caché de figuras serializadas a JSON, limitada por tamaño total en bytes.
+    Expulsa por LRU con admisión por frecuencia: con la caché llena, una
+    entrada nueva solo entra si se ha pedido al menos tantas veces como las que
+    tendría que expulsar, de modo que una ráfaga de selecciones únicas no
+    desplaza a las populares. Las entradas fijadas (`pinned`, p. ej. los grupos
+    predefinidos) no se expulsan nunca.
+
+    `max_bytes` es un límite estricto, también para las fijadas: una entrada
+    fijada se salta la admisión por frecuencia (expulsa las no fijadas que
+    haga falta), pero si ni así cabe se rechaza como cualquier otra.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._pinned = set()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.frequency = AccessFrequency()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def __contains__(self, key):
+        """True si `key` está en caché (sin contar como acierto ni como acceso)."""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Devuelve la figura como dict listo para Dash, o None si no está en caché."""
+        with self._lock:
+            self.frequency.record(key)
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        with PROFILER.phase('cache'):
+            return json.loads(payload)
+
+    def put(self, key, figure, pinned=False):
+        """
+        Guarda `figure` (una figura Plotly o cualquier valor JSON) bajo `key`.
+        Devuelve False si la política de admisión la rechaza o no cabe en
+        `max_bytes` sin expulsar entradas fijadas.
+        """
+        payload = figure.to_json() if hasattr(figure, 'to_json') else json.dumps(figure)
+        payload = payload.encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.get(key)
+            excess = self._size - len(previous or b'') + len(payload) - self.max_bytes
+            victims = self._victims(key, excess, pinned)
+            if victims is None:
+                self.rejected += 1
+                return False
+            for victim in victims:
+                self._size -= len(self._entries.pop(victim))
+            if previous is not None:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._size += len(payload)
+            if pinned:
+                self._pinned.add(key)
+        return True
+
+    def _victims(self, key, excess, pinned=False):
+        """
+        Entradas no fijadas, de la menos reciente a la más, que habría que
+        expulsar para liberar `excess` bytes. None si entre todas no liberan
+        tanto o, salvo para una entrada fijada, si alguna se ha pedido más
+        veces que `key` (la nueva no merece entrar).
+        """
+        victims = []
+        if excess <= 0:
+            return victims
+        frequency = self.frequency.count(key)
+        for victim, payload in self._entries.items():
+            if victim == key or victim in self._pinned:
+                continue
+            if not pinned and self.frequency.count(victim) > frequency:
+                return None
+            victims.append(victim)
+            excess -= len(payload)
+            if excess <= 0:
+                return victims
+        return None
+
+    def get_or_build(self, key, builder, *args):
+        """Devuelve la figura cacheada o la construye con `builder(*args)` y la guarda."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        figure = builder(*args)
+        self.put(key, figure)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._size = 0
+
+    def prometheus(self):
+        """Estado de la caché como líneas de métricas Prometheus."""
+        stats = self.stats()
+        return [
+            '# TYPE vizpib_figure_cache_hits_total counter', f"vizpib_figure_cache_hits_total {stats['hits']}",
+            '# TYPE vizpib_figure_cache_misses_total counter', f"vizpib_figure_cache_misses_total {stats['misses']}",
+            '# TYPE vizpib_figure_cache_bytes gauge', f"vizpib_figure_cache_bytes {stats['bytes']}",
+            '# TYPE vizpib_figure_cache_entries gauge', f"vizpib_figure_cache_entries {stats['entries']}",
+            '# TYPE vizpib_figure_cache_pinned gauge', f"vizpib_figure_cache_pinned {stats['pinned']}",
+            '# TYPE vizpib_figure_cache_rejected_total counter', f"vizpib_figure_cache_rejected_total {stats['rejected']}",
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'pinned': len(self._pinned),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'rejected': self.rejected,
+            }
+
+
+# Caché compartida por todos los callbacks del proceso
+FIGURES = FigureCache()
@@ -0,0 +1,323 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from modules.analyzer import analyze_world_data, analyze_continent_growth
+from modules.analytics_store import get_store
+from modules.downsampling import WEBGL_POINT_THRESHOLD, reduce_series
+from modules.projections import PROJECTION_MODELS, project
+from modules.profiling import profiled
+
+# Variable global para el template de Plotly (modo oscuro): 'plotly_dark'
+# reducido a lo que usan estas figuras (ver `template`)
+PLOTLY_TEMPLATE = "vizpib_dark"
+BASE_TEMPLATE = "plotly_dark"
+# Tipos de traza y claves de layout de BASE_TEMPLATE que se conservan
+TEMPLATE_TRACES = ('scatter', 'scattergl', 'bar', 'pie', 'choropleth')
+TEMPLATE_LAYOUT = (
+    'font', 'title', 'paper_bgcolor', 'plot_bgcolor', 'colorway', 'hovermode', 'hoverlabel',
+    'autotypenumbers', 'xaxis', 'yaxis', 'geo', 'coloraxis',
+)
+# plotly.express (~80 ms de import) se importa dentro de cada función que lo usa:
+# arrancar la aplicación no lo necesita hasta construir la primera figura.
+
+def template():
+    """
+    Nombre del template de las figuras, que se registra en plotly la primera
+    vez. Cada figura viaja con su template completo dentro del JSON:
+    'plotly_dark' añade ~7,5 KB a cada una, con valores por defecto para 25
+    tipos de traza y para escenas 3D, polares o ternarias que el dashboard no
+    usa. El compacto (~1,7 KB) conserva TEMPLATE_TRACES, TEMPLATE_LAYOUT y,
+    de las escalas de color, solo la secuencial; las figuras se ven igual.
+    """
+    if PLOTLY_TEMPLATE not in pio.templates:
+        base = pio.templates[BASE_TEMPLATE]
+        compact = go.layout.Template(
+            data={trace: base.data[trace] for trace in TEMPLATE_TRACES},
+            layout={key: base.layout[key] for key in TEMPLATE_LAYOUT},
+        )
+        compact.layout.colorscale = {'sequential': base.layout.colorscale.sequential}
+        pio.templates[PLOTLY_TEMPLATE] = compact
+    return PLOTLY_TEMPLATE
+
+# --- 1. GRÁFICO PRINCIPAL ---
+@profiled('figure')
+def world_evolution_figure(df):
+    """Evolución del PIB mundial total (vista inicial)."""
+    import plotly.express as px
+    world_metrics = analyze_world_data(df)
+    fig_line = px.line(
+        world_metrics['world_total_gdp'], x='Año', y='PIB (Billones USD)',
+        title='Evolución del PIB Mundial Total', markers=True,
+        template=template()
+    )
+    fig_line.update_layout(margin=dict(l=20, r=20, t=40, b=20))
+    fig_line.update_xaxes(tickformat='d')
+    return fig_line
+
+@profiled('figure')
+def empty_evolution_figure():
+    import plotly.express as px
+    return px.line(title='Seleccione países y presione "Aplicar"', template=template())
+
+def _selected_rows(store, selected_countries):
+    """Filas del almacén de los países seleccionados, en el orden del DataFrame."""
+    return sorted(store.country_index[country] for country in set(selected_countries) if country in store.country_index)
+
+def _series_figure(years, matrix, names, y_label, title, x_range=None):
+    """
+    Una línea por fila de `matrix`. Con muchos puntos se dibuja con WebGL y sin
+    marcadores, y cada serie larga se reduce con LTTB; si se pasa `x_range`
+    solo se envía esa ventana (a resolución completa mientras quepa).
+    """
+    webgl = np.count_nonzero(~np.isnan(matrix)) > WEBGL_POINT_THRESHOLD
+    trace_type = go.Scattergl if webgl else go.Scatter
+    traces = []
+    for name, values in zip(names, matrix):
+        x, y, _ = reduce_series(years, values, x_range)
+        traces.append(trace_type(
+            x=x, y=y, name=name, mode='lines' if webgl else 'lines+markers',
+            hovertemplate=f'Country={name}<br>Año=%{{x}}<br>{y_label}=%{{y}}<extra></extra>'
+        ))
+
+    fig = go.Figure(traces)
+    fig.update_layout(
+        template=template(), title=title, xaxis_title='Año', yaxis_title=y_label,
+        margin=dict(l=20, r=20, t=40, b=20), legend_title_text='Países'
+    )
+    fig.update_xaxes(tickformat='d')
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+@profiled('figure')
+def country_evolution_figure(df, selected_countries, metric_type, x_range=None):
+    """
+    Evolución de la métrica elegida para los países seleccionados. Las series
+    salen del almacén (sin melt); `x_range` limita el envío a una ventana de años.
+    """
+    y_axis_label = 'PIB (Billones USD)' if metric_type == 'total' else 'PIB Per Cápita (USD)'
+    title_suffix = 'PIB Total' if metric_type == 'total' else 'PIB Per Cápita'
+
+    store = get_store(df)
+    block = store.metrics[metric_type]
+    rows = _selected_rows(store, selected_countries)
+    return _series_figure(
+        block.years, block.matrix[rows], store.countries[rows], y_axis_label,
+        f'Evolución del {title_suffix}', x_range
+    )
+
+# Marca (atributo `meta` de Plotly) de las trazas de proyección y separador
+# del título: con ellos se retira una proyección anterior de la figura del cliente
+PROJECTION_META = 'projection'
+PROJECTION_TITLE = ' · proyección '
+
+def without_projection(fig):
+    """
+    `fig` (el dict de la figura, que se modifica) sin las trazas ni el título
+    de una proyección anterior. Sirve para la figura que ya tiene el cliente.
+    """
+    fig['data'] = [trace for trace in fig['data'] if trace.get('meta') != PROJECTION_META]
+    title = fig['layout'].get('title')
+    if isinstance(title, dict) and title.get('text'):
+        title['text'] = title['text'].split(PROJECTION_TITLE)[0]
+    return fig
+
+@profiled('figure')
+def projection_figure(base, df, selected_countries, metric_type, model, horizon, multiplier):
+    """
+    `base` (la evolución de la selección) con la proyección de cada país en
+    línea discontinua del mismo color, desde el último año con datos. Devuelve
+    un dict listo para Dash: `base` puede ser una figura Plotly, que no se
+    modifica, o un dict (el de FIGURES o la figura que ya tiene el cliente),
+    que se amplía sin copiarlo ni validarlo otra vez y del que antes se retira
+    la proyección anterior. Los parámetros del modelo se ajustan una sola vez
+    por métrica para todos los países (ver `AnalyticsStore.projection`); cada
+    escenario solo los vuelve a aplicar.
+    """
+    fig = without_projection(base if isinstance(base, dict) else base.to_plotly_json())
+    store = get_store(df)
+    fitted = store.projection(metric_type, model)
+    if fitted is None:
+        return fig
+    rows = _selected_rows(store, selected_countries)
+    start_year = store.metrics[metric_type].years[-1]
+    years, values = project(fitted, start_year, horizon, multiplier, rows)
+
+    y_axis_label = 'PIB (Billones USD)' if metric_type == 'total' else 'PIB Per Cápita (USD)'
+    # Las series de `base` no fijan color: toman el de su posición en la paleta del template
+    colorway = pio.templates[template()].layout.colorway
+    traces = fig['data']
+    trace_type = traces[0].get('type', 'scatter') if traces else 'scatter'
+    for trace in traces:
+        # Mismo grupo de leyenda que su proyección: ocultar un país oculta las dos
+        trace['legendgroup'] = trace.get('name')
+    for position, (name, projected) in enumerate(zip(store.countries[rows], values)):
+        if np.isnan(projected).all():
+            continue
+        traces.append({
+            'type': trace_type, 'x': years, 'y': projected, 'name': f'{name} (proyección)',
+            'legendgroup': name, 'showlegend': False, 'mode': 'lines', 'meta': PROJECTION_META,
+            'line': {'dash': 'dash', 'color': colorway[position % len(colorway)]},
+            'hovertemplate': f'Country={name}<br>Año=%{{x}}<br>{y_axis_label} (proyección)=%{{y}}<extra></extra>',
+        })
+    title = fig['layout'].setdefault('title', {})
+    title['text'] = f"{title.get('text', '')}{PROJECTION_TITLE}{PROJECTION_MODELS[model].label} ×{multiplier:g}"
+    return fig
+
+# --- 2. GRÁFICOS INFERIORES ---
+@profiled('figure')
+def distribution_pie_figure(df, metric_type='total', year=None, n=5):
+    """
+    Las `n` primeras economías de `year` (por defecto el último año) según el
+    índice de rankings del almacén. En PIB total el resto se agrupa como
+    'Otros'; en per cápita la suma no tiene sentido y solo se muestran las `n`.
+    """
+    import plotly.express as px
+    store = get_store(df)
+    ranking = store.rankings[metric_type]
+    year = int(ranking.years[-1]) if year is None else int(year)
+    col = ranking.year_index[year]
+    top = ranking.top(year, n)
+    names = [*store.countries[top]]
+    values = [*store.metrics[metric_type].matrix[top, col]]
+    if metric_type == 'total':
+        names.append('Otros')
+        values.append(ranking.rest(year, n))
+    label = 'Total' if metric_type == 'total' else 'Per Cápita'
+    value_col = f'GDP_{year}' if metric_type == 'total' else f'GDP_per_capita_{year}'
+
+    return px.pie(
+        pd.DataFrame({'Country': names, value_col: values}), names='Country', values=value_col,
+        title=f'Distribución GDP Mundial {year} ({label})', hole=0.4,
+        template=template()
+    )
+
+@profiled('figure')
+def world_growth_figure(df):
+    import plotly.express as px
+    world_metrics = analyze_world_data(df)
+    fig = px.bar(
+        world_metrics['world_growth_data'], x='Año', y='Crecimiento (%)',
+        title='Crecimiento Anual del PIB Mundial (%)',
+        template=template()
+    )
+    fig.update_xaxes(tickformat='d')
+    return fig
+
+@profiled('figure')
+def empty_growth_figure():
+    import plotly.express as px
+    return px.bar(title='Comparación de Crecimiento Anual (%)', template=template())
+
+@profiled('figure')
+def growth_comparison_figure(df, selected_countries):
+    """
+    Crecimiento anual (%) de los países seleccionados, en barras agrupadas. Con
+    demasiados puntos para barras legibles se dibuja como líneas WebGL.
+    """
+    store = get_store(df)
+    block = store.metrics['total']
+    rows = _selected_rows(store, selected_countries)
+    growth, years, names = block.growth[rows], block.years[1:], store.countries[rows]
+    title = 'Comparación de Crecimiento Anual (%)'
+
+    if np.count_nonzero(~np.isnan(growth)) > WEBGL_POINT_THRESHOLD:
+        return _series_figure(years, growth, names, 'Crecimiento (%)', title)
+
+    fig = go.Figure([
+        go.Bar(x=years, y=values, name=name, hovertemplate=f'Country={name}<br>Año=%{{x}}<br>Crecimiento (%)=%{{y}}<extra></extra>')
+        for name, values in zip(names, growth)
+    ])
+    fig.update_layout(
+        template=template(), title=title, barmode='group',
+        xaxis_title='Año', yaxis_title='Crecimiento (%)', legend_title_text='Country'
+    )
+    fig.update_xaxes(tickformat='d')
+    return fig
+
+@profiled('figure')
+def continent_growth_figure(df, selected_year):
+    import plotly.express as px
+    continent_growth_df = analyze_continent_growth(df, selected_year)
+    fig_continent = px.bar(
+        continent_growth_df, x='Growth', y='Continent', orientation='h',
+        title=f"Crecimiento Promedio por Continente ({selected_year})",
+        template=template()
+    )
+    fig_continent.update_layout(margin=dict(l=20, r=20, t=40, b=20), yaxis={'categoryorder':'total ascending'})
+    fig_continent.update_traces(text=continent_growth_df['Growth'].apply(lambda x: f'{x:.2f}%'), textposition='outside')
+    return fig_continent
+
+# --- 3. MAPA ---
+def _map_frame(df, years):
+    """
+    País, CCA3 y población de `years` de los países con código CCA3: solo esas
+    columnas. Las poblaciones completas y enteras pasan a int64 (el cargador las
+    lee como float64) para que la figura las envíe como enteros.
+    """
+    map_data = df.loc[df['CCA3'].notna(), ['Country', 'CCA3', *(f'Population_{year}' for year in years)]]
+    whole = {}
+    for col in map_data.columns[2:]:
+        values = map_data[col].to_numpy()
+        if values.dtype.kind == 'f' and not np.isnan(values).any() and (values == np.round(values)).all():
+            whole[col] = 'int64'
+    return map_data.astype(whole) if whole else map_data
+
+@profiled('figure')
+def population_map_figure(df, selected_year):
+    """Mapa de un único año (modo servidor: una figura completa por posición del slider)."""
+    import plotly.express as px
+    pop_col_map = f'Population_{selected_year}'
+    map_data = _map_frame(df, [selected_year]).dropna(subset=[pop_col_map])
+    fig_map = px.choropleth(
+        map_data,
+        locations="CCA3",
+        color=pop_col_map,
+        hover_name="Country",
+        color_continuous_scale=px.colors.sequential.Viridis,
+        title=f"Concentración de Población Mundial en {selected_year}",
+        template=template()
+    )
+    fig_map.update_layout(
+        geo=dict(showframe=False, showcoastlines=False),
+        margin={"r":0,"t":40,"l":0,"b":0}
+    )
+    return fig_map
+
+@profiled('figure')
+def population_map_frames_figure(df):
+    """
+    Mapa con todos los años de población embebidos: `customdata` guarda la
+    matriz países × años y `layout.meta.years` el orden de sus columnas. El
+    callback de cliente `population_map.switch_year` solo sustituye `z`.
+    """
+    import plotly.express as px
+    store = get_store(df)
+    years = [int(year) for year in store.pop_years]
+    latest_year, latest_col = years[-1], f'Population_{years[-1]}'
+
+    map_data = _map_frame(df, years)
+    fig_map = px.choropleth(
+        map_data,
+        locations="CCA3",
+        color=latest_col,
+        hover_name="Country",
+        color_continuous_scale=px.colors.sequential.Viridis,
+        title=f"Concentración de Población Mundial en {latest_year}",
+        template=template()
+    )
+    # Listas JSON planas (no arrays tipados en base64) para que el callback de cliente las indexe
+    year_matrix = map_data[[f'Population_{year}' for year in years]].astype(object)
+    fig_map.update_traces(
+        customdata=year_matrix.where(year_matrix.notna(), None).values.tolist(),
+        hovertemplate='<b>%{hovertext}</b><br>Población=%{z:,.0f}<extra></extra>'
+    )
+    fig_map.update_layout(
+        geo=dict(showframe=False, showcoastlines=False),
+        margin={"r":0,"t":40,"l":0,"b":0},
+        coloraxis_colorbar_title_text='Población',
+        meta={'years': years}
+    )
+    return fig_map
@@ -0,0 +1,31 @@
+import flask
+
+
+def create_health(dataset):
+    """
+    Blueprint con la sonda de disponibilidad del worker:
+
+        GET /health    200 {"status": "ready", ...} cuando puede servir el dashboard;
+                       503 mientras prepara los datos ('idle', 'loading') o si la
+                       carga falló ('failed', con el error)
+
+    Cualquier petición, la propia sonda incluida, lanza la carga de `dataset` si
+    aún no había empezado (arranque con VIZPIB_STARTUP=lazy), así que basta con
+    apuntar la readiness probe del orquestador o el health check del balanceador
+    a /health: el worker no recibe tráfico hasta tener los datos listos.
+    """
+    bp = flask.Blueprint('health', __name__)
+
+    @bp.before_app_request
+    def start_loading():
+        dataset.start()
+
+    @bp.route('/health')
+    def health():
+        status = dataset.status()
+        response = flask.jsonify(status)
+        response.status_code = 200 if status['status'] == 'ready' else 503
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    return bp
@@ -0,0 +1,272 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from modules.analytics_store import get_store, register_store
+from modules.data_cleaner import clean_gdp_data
+from modules.data_loader import discover_gdp_sources, load_gdp_data
+from modules.derived_metrics import with_derived_columns
+from modules.data_preparer import (
+    prepare_merged_data, load_population_data, attach_population,
+    append_gdp_source, order_columns, gdp_year_columns, compact_frame, KEY_COLUMNS
+)
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántos segundos, como mínimo, se revisa data/ en busca de ficheros nuevos.
+POLL_SECONDS = float(os.environ.get('VIZPIB_DATA_POLL_SECONDS', 30))
+# Incidencias de lectura que se conservan: las más recientes, aunque el worker recargue durante meses
+MAX_LOAD_ISSUES = 500
+
+
+class Dataset:
+    """
+    Dataset vivo del dashboard. Carga el fichero principal más los ficheros de
+    PIB añadidos en data/ y, mientras la aplicación corre, incorpora los que
+    vayan llegando (años o países nuevos) sin reiniciar el proceso ni
+    reconstruir desde cero: el almacén analítico se amplía de forma incremental.
+
+    El DataFrame (con su almacén ya registrado), su número de versión y su
+    etiqueta de contenido se sustituyen juntos en una sola asignación, así que
+    un callback siempre ve una versión completa y coherente. La versión cuenta
+    las incorporaciones de este proceso; la etiqueta identifica los ficheros
+    aplicados y coincide entre workers que hayan cargado lo mismo.
+
+    `issues` guarda las últimas MAX_LOAD_ISSUES incidencias de lectura
+    (`LoadIssue`) de la carga inicial y de los ficheros incorporados después.
+
+    Con `lazy=True` el constructor no lee nada: `start()` prepara los datos en
+    un hilo y quien los pida antes de tiempo (`df`, `current()`…) espera a que
+    terminen. `status()` dice en qué punto está ('idle', 'loading', 'ready' o
+    'failed'); una carga fallida se reintenta en el siguiente `start()`.
+    """
+
+    def __init__(self, gdp_path, pop_path, data_dir=None, poll_seconds=POLL_SECONDS, lazy=False):
+        self.gdp_path = gdp_path
+        self.pop_path = pop_path
+        self.data_dir = data_dir or os.path.dirname(gdp_path) or '.'
+        self.poll_seconds = poll_seconds
+        self._listeners = []
+        self._ready_listeners = []
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self.issues = deque(maxlen=MAX_LOAD_ISSUES)
+        self._seen = {}
+        self._snapshot = None
+        # Datos de la carga en curso, visibles solo para el hilo que la hace (y sus oyentes)
+        self._preparing = threading.local()
+
+        self._state = 'idle'
+        self._state_lock = threading.Lock()
+        self._done = threading.Event()
+        self.error = None
+        self.load_seconds = None
+        if not lazy:
+            self._state = 'loading'
+            self._load()
+
+    @property
+    def df(self):
+        return self._loaded_snapshot()[0]
+
+    @property
+    def version(self):
+        return self._loaded_snapshot()[1]
+
+    @property
+    def tag(self):
+        return self._loaded_snapshot()[2]
+
+    @property
+    def ready(self):
+        return self._state == 'ready'
+
+    def snapshot(self):
+        """(DataFrame, versión, etiqueta) vigentes, revisando antes si hay ficheros nuevos."""
+        self.current()
+        return self._loaded_snapshot()
+
+    def _loaded_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = getattr(self._preparing, 'snapshot', None)
+        if snapshot is None:
+            self.wait()
+            snapshot = self._snapshot
+        return snapshot
+
+    # --- Carga inicial (diferida con lazy=True) ---
+    def on_ready(self, listener):
+        """
+        Registra `listener(dataset)`, llamado al terminar la carga inicial y antes
+        de darla por lista (si ya lo está, se llama en el acto). Un fallo en un
+        oyente cuenta como fallo de la carga. Durante los oyentes solo el hilo
+        de la carga ve los datos: el resto espera a que acaben.
+        """
+        if self.ready:
+            listener(self)
+        else:
+            self._ready_listeners.append(listener)
+
+    def start(self):
+        """Lanza la carga inicial en un hilo si no está hecha ni en curso. No espera."""
+        if self._state in ('loading', 'ready'):
+            return
+        with self._state_lock:
+            if self._state in ('loading', 'ready'):
+                return
+            self._state = 'loading'
+            self._done.clear()
+        threading.Thread(target=self._load_in_background, name='vizpib-load', daemon=True).start()
+
+    def wait(self, timeout=None):
+        """
+        Espera a que el dataset esté listo, lanzando la carga si no había
+        empezado. TimeoutError si no termina en `timeout` segundos y
+        RuntimeError (con la causa original) si la carga falla.
+        """
+        if self.ready:
+            return
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f'Los datos no están listos tras {timeout} s.')
+        if self._state == 'failed':
+            raise RuntimeError('Fallo al preparar los datos.') from self.error
+
+    def status(self):
+        """Estado de la carga para sondas de salud: {'status', 'version', 'tag', 'load_seconds', 'error'}."""
+        snapshot = self._snapshot if self.ready else None
+        return {
+            'status': self._state,
+            'version': snapshot[1] if snapshot else None,
+            'tag': snapshot[2] if snapshot else None,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'error': repr(self.error) if self._state == 'failed' else None,
+        }
+
+    def _load_in_background(self):
+        try:
+            self._load()
+        except Exception as exc:
+            logger.exception('Fallo al preparar los datos.')
+            self.error = exc
+            self._state = 'failed'
+            self._done.set()
+
+    def _load(self):
+        start = time.perf_counter()
+        self.issues.clear()  # Una carga reintentada no arrastra las incidencias de la fallida
+        sources = discover_gdp_sources(self.data_dir, self.gdp_path, exclude=[self.pop_path])
+        df = prepare_merged_data(self.gdp_path, self.pop_path, extra_gdp_paths=sources, issues=self.issues)
+        self._seen = {path: os.stat(path).st_mtime_ns for path in sources}
+        snapshot = (df, 0, self._content_tag())
+        self._last_check = time.monotonic()
+        # Figuras iniciales, grupos precalculados…: la carga no está lista hasta que
+        # acaban, así que los datos no se publican para el resto de hilos hasta entonces
+        self._preparing.snapshot = snapshot
+        try:
+            for listener in self._ready_listeners:
+                listener(self)
+        finally:
+            del self._preparing.snapshot
+        self._snapshot = snapshot
+        self.load_seconds = time.perf_counter() - start
+        self.error = None
+        self._state = 'ready'
+        self._done.set()
+        logger.info('Datos listos en %.2f s.', self.load_seconds)
+
+    def _content_tag(self):
+        """Huella de los ficheros aplicados (ruta, mtime y tamaño, en orden de aplicación)."""
+        digest = hashlib.sha256()
+        for path in (self.gdp_path, self.pop_path, *self._seen):
+            stat = os.stat(path)
+            digest.update(f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}\n'.encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def on_change(self, listener):
+        """Registra `listener(dataset)`, llamado tras incorporar datos nuevos."""
+        self._listeners.append(listener)
+
+    def current(self):
+        """DataFrame vigente; como mucho cada `poll_seconds` revisa si hay ficheros nuevos."""
+        if time.monotonic() - self._last_check >= self.poll_seconds:
+            self.refresh()
+        return self.df
+
+    def refresh(self):
+        """Incorpora los ficheros nuevos o modificados de data/. Devuelve True si hubo cambios."""
+        if not self.ready or not self._lock.acquire(blocking=False):
+            return False  # Sin datos todavía, u otro hilo ya está revisando
+        try:
+            self._last_check = time.monotonic()
+            changed = False
+            for path in discover_gdp_sources(self.data_dir, self.gdp_path, exclude=[self.pop_path]):
+                mtime = os.stat(path).st_mtime_ns
+                if self._seen.get(path) == mtime:
+                    continue
+                self._seen[path] = mtime
+                changed = self.ingest(path) or changed
+        finally:
+            self._lock.release()
+
+        if changed:
+            for listener in self._listeners:
+                listener(self)
+        return changed
+
+    def ingest(self, path):
+        """
+        Aplica un fichero de PIB en modo append-only: años nuevos como columnas,
+        países nuevos al final y celdas vacías rellenadas. Devuelve True si el
+        dataset cambió.
+        """
+        df_new = clean_gdp_data(load_gdp_data(path, self.issues))
+        if df_new is None or 'Country' not in df_new.columns:
+            return False
+
+        df = self.df
+        updated, added, dirty_rows, new_cols = append_gdp_source(df, df_new)
+        if added.empty and not dirty_rows and not new_cols:
+            return False
+
+        # Métricas derivadas (PIB per cápita) de los años nuevos y de las celdas rellenadas
+        touched_cols = new_cols + (gdp_year_columns(df) if dirty_rows else [])
+        updated = with_derived_columns(updated, touched_cols)
+
+        if not added.empty:
+            df_pop = load_population_data(self.pop_path, self.issues)
+            if df_pop is None:
+                return False
+            for col in gdp_year_columns(updated):
+                if col not in added.columns:
+                    added[col] = float('nan')
+            added = attach_population(added, df_pop, self.pop_path)
+            added = with_derived_columns(added, gdp_year_columns(added))
+            # Mismo tipo numérico que el dataset (float32 con VIZPIB_FLOAT32) para unir sin conversiones
+            added = added.astype({
+                col: updated[col].dtype for col in added.columns
+                if col in updated.columns and pd.api.types.is_float_dtype(updated[col].dtype)
+            })
+            continents = pd.concat([updated['Continent'].astype(str), added['Continent'].astype(str)], ignore_index=True)
+            for col in KEY_COLUMNS:
+                # Claves como texto para unir; `compact_frame` las vuelve a categorizar
+                updated[col] = updated[col].astype(object)
+            updated = pd.concat([updated, added], ignore_index=True)
+            updated['Continent'] = pd.Categorical(continents, categories=sorted(set(continents)))
+
+        updated = compact_frame(order_columns(updated))
+        store = get_store(df)
+        if store.can_extend_to(updated):
+            register_store(updated, store.extended(updated, dirty_rows))
+        else:
+            get_store(updated)  # Años intercalados: se recalcula el almacén, sin releer los CSV
+
+        self._snapshot = (updated, self.version + 1, self._content_tag())
+        logger.info("Datos incorporados desde '%s': %d países y %d años nuevos.", path, len(added), len(new_cols))
+        return True
@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+
+# --- 1. CONFIGURACIÓN ---
+LEVEL = os.environ.get('VIZPIB_LOG_LEVEL', 'INFO').upper()
+# 'text' (legible) o 'json' (una línea JSON por registro, para agregadores de logs)
+FORMAT = os.environ.get('VIZPIB_LOG_FORMAT', 'text')
+# Campos estructurados que los módulos pasan en `extra` y que el formato JSON conserva
+STRUCTURED_FIELDS = ('issue', 'source', 'rows')
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `STRUCTURED_FIELDS` que traiga."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=LEVEL, fmt=FORMAT):
+    """
+    Envía a stderr los registros de los loggers 'modules.*' con el nivel y el
+    formato indicados. No toca el logger raíz (werkzeug, gunicorn y Dash
+    siguen con su configuración) y llamarla varias veces no duplica salidas.
+    """
+    logger = logging.getLogger('modules')
+    logger.setLevel(level)
+    logger.propagate = False
+    if not any(getattr(handler, '_vizpib', False) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler._vizpib = True
+        logger.addHandler(handler)
+    for handler in logger.handlers:
+        if getattr(handler, '_vizpib', False):
+            handler.setFormatter(
+                JsonFormatter() if fmt == 'json' else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+            )
+    return logger
@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from modules.analytics_store import get_store
+from modules.figure_cache import AccessFrequency
+
+logger = logging.getLogger(__name__)
+
+# --- 1. GRUPOS PREDEFINIDOS ---
+# Valor en `country-dropdown` de cada grupo: 'preset:<nombre>'
+PRESET_PREFIX = 'preset:'
+GROUPS = {
+    'G7': ['Canada', 'France', 'Germany', 'Italy', 'Japan', 'United Kingdom', 'United States'],
+    # Miembros fundadores (la ampliación de 2024 no tiene series completas en los CSV)
+    'BRICS': ['Brazil', 'Russia', 'India', 'China', 'South Africa'],
+    'UE': [
+        'Austria', 'Belgium', 'Bulgaria', 'Croatia', 'Cyprus', 'Czech Republic', 'Denmark', 'Estonia', 'Finland',
+        'France', 'Germany', 'Greece', 'Hungary', 'Ireland', 'Italy', 'Latvia', 'Lithuania', 'Luxembourg', 'Malta',
+        'Netherlands', 'Poland', 'Portugal', 'Romania', 'Slovakia', 'Slovenia', 'Spain', 'Sweden',
+    ],
+}
+# Además de GROUPS, las N mayores economías del último año con datos
+TOP_N = 10
+# Veces que debe pedirse una selección de usuario para precalcularla como un grupo más
+PROMOTE_AFTER = int(os.environ.get('VIZPIB_PROMOTE_AFTER', 3))
+# Selecciones promocionadas que se fijan en la caché; las siguientes quedan sujetas a expulsión
+MAX_PROMOTED = int(os.environ.get('VIZPIB_MAX_PROMOTED', 32))
+
+
+def top_countries(df, n=TOP_N):
+    """Los `n` países con más PIB en el último año, de mayor a menor (sin NaN)."""
+    store = get_store(df)
+    if not store.years.size:
+        return []
+    latest = store.gdp[:, -1]
+    rows = np.flatnonzero(~np.isnan(latest))
+    rows = rows[np.argsort(-latest[rows], kind='stable')[:n]]
+    return [str(country) for country in store.countries[rows]]
+
+
+def preset_groups(df):
+    """
+    {nombre: países} de los grupos predefinidos con los países presentes en
+    `df`; se omiten los que se quedan con menos de dos.
+    """
+    index = get_store(df).country_index
+    groups = {name: [country for country in members if country in index] for name, members in GROUPS.items()}
+    groups[f'Top {TOP_N}'] = top_countries(df)
+    return {name: members for name, members in groups.items() if len(members) >= 2}
+
+
+def preset_options(df):
+    """Opciones del desplegable para los grupos, antes de los países."""
+    return [
+        {'label': f'★ {name} ({len(members)} países)', 'value': f'{PRESET_PREFIX}{name}'}
+        for name, members in preset_groups(df).items()
+    ]
+
+
+def expand_presets(values, groups):
+    """
+    Sustituye cada 'preset:<nombre>' de `values` por los países del grupo,
+    sin duplicados y conservando el orden. Los grupos desconocidos se descartan.
+    """
+    expanded = []
+    for value in values or ():
+        if isinstance(value, str) and value.startswith(PRESET_PREFIX):
+            members = groups.get(value[len(PRESET_PREFIX):], ())
+        else:
+            members = (value,)
+        expanded += [country for country in members if country not in expanded]
+    return expanded
+
+
+def has_presets(values):
+    return any(isinstance(value, str) and value.startswith(PRESET_PREFIX) for value in values or ())
+
+
+# --- 2. PRECÁLCULO Y PROMOCIÓN ---
+class SelectionWarmer:
+    """
+    Precalcula selecciones completas (figuras y KPIs de las dos métricas) con
+    `warm(df, countries, pinned)`, que las deja en la caché de figuras.
+
+    Los grupos predefinidos se calculan al arrancar, en el propio hilo para que
+    con `gunicorn --preload` los workers hereden la caché ya llena, y se fijan
+    en ella. Las selecciones de usuario se cuentan: al llegar a `promote_after`
+    peticiones se calculan en un hilo aparte y pasan a servirse desde la caché,
+    incluso las que de otro modo irían a segundo plano. Las `max_promoted`
+    primeras se fijan; el resto compite por su sitio como cualquier figura.
+    """
+
+    def __init__(self, warm, promote_after=PROMOTE_AFTER, max_promoted=MAX_PROMOTED):
+        self.warm = warm
+        self.promote_after = promote_after
+        self.max_promoted = max_promoted
+        self.frequency = AccessFrequency()
+        self._warmed = set()
+        self._promoted = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def warm_groups(self, df):
+        """Calcula y fija en la caché todos los grupos predefinidos de `df` (tras vaciarla, nada queda fijado)."""
+        with self._lock:
+            self._warmed.clear()
+            self._promoted = 0
+        groups = preset_groups(df)
+        for members in groups.values():
+            self._warm(df, members, pinned=True)
+        logger.info('Grupos predefinidos precalculados: %s.', ', '.join(groups))
+
+    def rewarm_groups(self, df):
+        """Como `warm_groups`, en segundo plano (p. ej. tras incorporar datos nuevos)."""
+        self._submit(self.warm_groups, df)
+
+    def record(self, df, countries):
+        """Cuenta una petición de `countries`; la precalcula en segundo plano si se ha vuelto popular."""
+        key = tuple(sorted(countries))
+        with self._lock:
+            count = self.frequency.record(key)
+            if count < self.promote_after or key in self._warmed:
+                return False
+            self._warmed.add(key)
+            pinned = self._promoted < self.max_promoted
+            self._promoted += pinned
+        logger.info('Selección popular (%d peticiones) precalculada: %d países.', count, len(key))
+        self._submit(self._warm, df, list(key), pinned)
+        return True
+
+    def _warm(self, df, countries, pinned):
+        with self._lock:
+            self._warmed.add(tuple(sorted(countries)))
+        self.warm(df, countries, pinned)
+
+    def _submit(self, func, *args):
+        # El hilo se crea al primer uso, ya dentro del worker (no sobrevive a un fork)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vizpib-warm')
+            executor = self._executor
+        future = executor.submit(func, *args)
+        future.add_done_callback(_log_failure)
+        return future
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error('Fallo al precalcular una selección.', exc_info=future.exception())
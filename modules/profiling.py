@@ -0,0 +1,441 @@
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+import flask
+
+logger = logging.getLogger(__name__)
+
+# --- 1. CONFIGURACIÓN ---
+# VIZPIB_PROFILE=0 desactiva toda la instrumentación (los decoradores quedan como llamadas directas).
+ENABLED = os.environ.get('VIZPIB_PROFILE', '1') != '0'
+# Muestreo opcional de callbacks completos: 'cprofile' o 'pyinstrument' (si está instalado).
+SAMPLER = os.environ.get('VIZPIB_PROFILE_SAMPLER', '').lower()
+SAMPLE_RATE = float(os.environ.get('VIZPIB_PROFILE_SAMPLE_RATE', 0.01))
+# Los endpoints /metrics y /debug/profile solo se registran con VIZPIB_PROFILE_ENDPOINTS=1:
+# exponen el informe del muestreo y los tiempos internos. Con VIZPIB_PROFILE_TOKEN
+# además exigen la cabecera 'Authorization: Bearer <token>'.
+ENDPOINTS = os.environ.get('VIZPIB_PROFILE_ENDPOINTS', '0') == '1'
+ENDPOINTS_TOKEN = os.environ.get('VIZPIB_PROFILE_TOKEN', '')
+# Cada cuántas respuestas de un callback se mide el tamaño de cada Output (hay que parsear el JSON).
+PAYLOAD_EVERY = int(os.environ.get('VIZPIB_PROFILE_PAYLOAD_EVERY', 10))
+
+# Límites (segundos) de los histogramas de latencia en formato Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Timing:
+    """Contador, suma, máximo e histograma acumulado de una serie de duraciones."""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for position, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[position] += 1
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else None,
+            'max_ms': round(self.max * 1000, 3),
+            'total_s': round(self.total, 4),
+        }
+
+
+class _Frame:
+    """Fase en curso dentro de un callback; el tiempo de las fases anidadas se descuenta."""
+
+    __slots__ = ('phase', 'start', 'children')
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.start = time.perf_counter()
+        self.children = 0.0
+
+
+# --- 2. REGISTRO ---
+class Profiler:
+    """
+    Registro de tiempos por callback (total y por fase), por función instrumentada
+    y bytes enviados por cada Output. El tiempo de un callback se reparte en:
+
+        data       funciones de análisis y preparación (`profiled('data')`)
+        figure     construcción de figuras Plotly (`profiled('figure')`)
+        cache      lectura de figuras ya serializadas de la caché
+        other      el resto del cuerpo del callback (formato de KPIs, etc.)
+        serialize  petición completa menos el callback: JSON de la respuesta y Dash
+
+    Cada fase cuenta su tiempo exclusivo, así que las fases de un callback suman su total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.callbacks = {}
+        self.functions = {}
+        self.payloads = {}
+        self.responses = {}
+        self.samples = SampleRecorder(SAMPLER, SAMPLE_RATE)
+
+    def _timing(self, table, key):
+        timing = table.get(key)
+        if timing is None:
+            timing = table.setdefault(key, _Timing())
+        return timing
+
+    # --- Fases y funciones ---
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, phase):
+        frame = _Frame(phase)
+        self._stack().append(frame)
+        return frame
+
+    def _exit(self, frame):
+        elapsed = time.perf_counter() - frame.start
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        phases = getattr(self._local, 'phases', None)
+        if phases is not None:
+            phases[frame.phase] = phases.get(frame.phase, 0.0) + elapsed - frame.children
+        return elapsed
+
+    def phase(self, phase):
+        """Context manager que atribuye el bloque a `phase` dentro del callback en curso."""
+        return _PhaseContext(self, phase)
+
+    def record_function(self, name, phase, seconds):
+        with self._lock:
+            self._timing(self.functions, (name, phase)).observe(seconds)
+
+    # --- Callbacks ---
+    def run_callback(self, name, func, args, kwargs):
+        self._local.phases = {}
+        self._local.stack = []
+        start = time.perf_counter()
+        try:
+            return self.samples.run(name, func, args, kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            phases = self._local.phases
+            self._local.phases = None
+            phases['other'] = max(elapsed - sum(phases.values()), 0.0)
+            with self._lock:
+                self._timing(self.callbacks, (name, 'total')).observe(elapsed)
+                for phase, seconds in phases.items():
+                    self._timing(self.callbacks, (name, phase)).observe(seconds)
+            request_state = getattr(self._local, 'request', None)
+            if request_state is not None:
+                request_state['callback'] = name
+                request_state['callback_seconds'] = elapsed
+
+    # --- Peticiones de Dash ---
+    def start_request(self):
+        self._local.request = {'start': time.perf_counter()}
+
+    def finish_request(self, response):
+        """Tras `_dash-update-component`: serialización y bytes por Output del callback."""
+        request_state = getattr(self._local, 'request', None)
+        self._local.request = None
+        if not request_state or 'callback' not in request_state:
+            return response
+        name = request_state['callback']
+        serialize = max(time.perf_counter() - request_state['start'] - request_state['callback_seconds'], 0.0)
+        size = response.calculate_content_length() or 0
+
+        with self._lock:
+            self._timing(self.callbacks, (name, 'serialize')).observe(serialize)
+            counter = self.responses.setdefault(name, {'count': 0, 'bytes': 0})
+            counter['count'] += 1
+            counter['bytes'] += size
+            measure = PAYLOAD_EVERY > 0 and (counter['count'] - 1) % PAYLOAD_EVERY == 0
+        if measure and response.status_code == 200:
+            self._record_payloads(name, response)
+        return response
+
+    def _record_payloads(self, name, response):
+        try:
+            outputs = json.loads(response.get_data()).get('response', {})
+        except ValueError:
+            return
+        sizes = {
+            f'{component}.{prop}': len(json.dumps(value, separators=(',', ':')))
+            for component, props in outputs.items() for prop, value in props.items()
+        }
+        with self._lock:
+            for output, size in sizes.items():
+                payload = self.payloads.setdefault((name, output), {'count': 0, 'bytes': 0, 'last': 0, 'max': 0})
+                payload['count'] += 1
+                payload['bytes'] += size
+                payload['last'] = size
+                payload['max'] = max(payload['max'], size)
+
+    # --- Informes ---
+    def summary(self):
+        with self._lock:
+            callbacks = {}
+            for (name, phase), timing in sorted(self.callbacks.items()):
+                callbacks.setdefault(name, {})[phase] = timing.summary()
+            return {
+                'callbacks': callbacks,
+                'functions': {f'{name} [{phase}]': timing.summary() for (name, phase), timing in sorted(self.functions.items())},
+                'responses': {name: dict(counter) for name, counter in sorted(self.responses.items())},
+                'payload_bytes': {f'{name} -> {output}': dict(payload) for (name, output), payload in sorted(self.payloads.items())},
+                'sampler': self.samples.summary(),
+            }
+
+    def prometheus(self, extra=()):
+        """Métricas en formato de texto de Prometheus. `extra`: líneas adicionales ya formateadas."""
+        lines = []
+        with self._lock:
+            _histogram(lines, 'vizpib_callback_seconds', 'Duración de los callbacks de Dash por fase.',
+                       {(('callback', name), ('phase', phase)): timing for (name, phase), timing in self.callbacks.items()})
+            _histogram(lines, 'vizpib_function_seconds', 'Duración de las funciones instrumentadas.',
+                       {(('function', name), ('phase', phase)): timing for (name, phase), timing in self.functions.items()})
+            lines += ['# HELP vizpib_response_bytes_total Bytes de respuesta de _dash-update-component por callback.',
+                      '# TYPE vizpib_response_bytes_total counter']
+            lines += [f'vizpib_response_bytes_total{_labels((("callback", name),))} {counter["bytes"]}'
+                      for name, counter in sorted(self.responses.items())]
+            lines += ['# HELP vizpib_output_payload_bytes Tamaño JSON de cada Output (muestreado).',
+                      '# TYPE vizpib_output_payload_bytes summary']
+            for (name, output), payload in sorted(self.payloads.items()):
+                labels = _labels((('callback', name), ('output', output)))
+                lines.append(f'vizpib_output_payload_bytes_sum{labels} {payload["bytes"]}')
+                lines.append(f'vizpib_output_payload_bytes_count{labels} {payload["count"]}')
+        lines += list(extra)
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.callbacks.clear()
+            self.functions.clear()
+            self.payloads.clear()
+            self.responses.clear()
+        self.samples.reset()
+
+
+class _PhaseContext:
+    __slots__ = ('profiler', 'phase_name', 'frame')
+
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase_name = phase
+
+    def __enter__(self):
+        self.frame = self.profiler._enter(self.phase_name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self.frame)
+        return False
+
+
+def _labels(pairs):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs) + '}'
+
+
+def _histogram(lines, metric, help_text, series):
+    lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} histogram')
+    for pairs, timing in sorted(series.items()):
+        for bound, count in zip(BUCKETS, timing.buckets):
+            lines.append(f'{metric}_bucket{_labels(pairs + (("le", bound),))} {count}')
+        lines.append(f'{metric}_bucket{_labels(pairs + (("le", "+Inf"),))} {timing.count}')
+        lines.append(f'{metric}_sum{_labels(pairs)} {timing.total}')
+        lines.append(f'{metric}_count{_labels(pairs)} {timing.count}')
+
+
+# --- 3. MUESTREO CON CPROFILE / PYINSTRUMENT ---
+class SampleRecorder:
+    """
+    Perfila con cProfile o pyinstrument una fracción `rate` de las ejecuciones de
+    callbacks. Solo un callback se perfila a la vez (un único profiler activo por
+    intérprete); el resto se ejecuta sin perfilar.
+    """
+
+    def __init__(self, mode, rate):
+        self.mode = mode if mode in ('cprofile', 'pyinstrument') else ''
+        self.rate = rate
+        self._busy = threading.Lock()
+        self._stats = None
+        self._reports = deque(maxlen=5)
+        self.sampled = 0
+        # PROFILER se crea al importar el módulo, antes de configure_logging():
+        # la disponibilidad de pyinstrument se comprueba en el primer callback
+        # para que el aviso salga con el formato de los registros
+        self._checked = self.mode != 'pyinstrument'
+
+    def _check_pyinstrument(self):
+        self._checked = True
+        try:
+            from pyinstrument import Profiler as _Pyinstrument  # noqa: F401
+        except ImportError:
+            logger.warning('pyinstrument no está instalado; muestreo desactivado.')
+            self.mode = ''
+
+    def run(self, name, func, args, kwargs):
+        if not self._checked:
+            self._check_pyinstrument()
+        if not self.mode or random.random() >= self.rate or not self._busy.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            if self.mode == 'cprofile':
+                return self._run_cprofile(func, args, kwargs)
+            return self._run_pyinstrument(name, func, args, kwargs)
+        finally:
+            self.sampled += 1
+            self._busy.release()
+
+    def _run_cprofile(self, func, args, kwargs):
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def _run_pyinstrument(self, name, func, args, kwargs):
+        from pyinstrument import Profiler as Pyinstrument
+
+        profiler = Pyinstrument()
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.stop()
+            self._reports.append((name, profiler.output_text(unicode=True)))
+
+    def report(self, limit=40):
+        """Texto con lo acumulado: funciones por tiempo acumulado (cProfile) o los últimos árboles (pyinstrument)."""
+        if self.mode == 'cprofile':
+            if self._stats is None:
+                return ''
+            buffer = io.StringIO()
+            self._stats.stream = buffer
+            self._stats.sort_stats('cumulative').print_stats(limit)
+            return buffer.getvalue()
+        return '\n'.join(f'=== {name} ===\n{text}' for name, text in self._reports)
+
+    def summary(self):
+        return {'mode': self.mode or None, 'rate': self.rate, 'sampled': self.sampled}
+
+    def reset(self):
+        self._stats = None
+        self._reports.clear()
+        self.sampled = 0
+
+
+# Registro global del proceso
+PROFILER = Profiler()
+
+
+# --- 4. DECORADORES ---
+def profiled(phase, name=None):
+    """
+    Mide cada llamada a la función decorada y atribuye su tiempo exclusivo a
+    `phase` dentro del callback en curso (si lo hay).
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = PROFILER._enter(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record_function(label, phase, PROFILER._exit(frame))
+        return wrapper
+    return decorator
+
+
+def profiled_callback(func):
+    """Mide un callback de Dash (total y por fase). Va debajo de `@app.callback`."""
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return PROFILER.run_callback(func.__name__, func, args, kwargs)
+    return wrapper
+
+
+# --- 5. ENDPOINTS ---
+def install(server, extra_metrics=None):
+    """
+    Registra en `server` los hooks de `_dash-update-component` y, con
+    ENDPOINTS, los endpoints `/metrics` (Prometheus) y `/debug/profile` (JSON;
+    ?format=text devuelve el informe del muestreo; un POST devuelve el resumen
+    y vacía el registro). `extra_metrics()` devuelve líneas Prometheus adicionales.
+    """
+    if not ENABLED:
+        return
+
+    def is_dash_update():
+        return flask.request.path.endswith('/_dash-update-component')
+
+    @server.before_request
+    def _profile_start():
+        if is_dash_update():
+            PROFILER.start_request()
+
+    @server.after_request
+    def _profile_finish(response):
+        if is_dash_update():
+            return PROFILER.finish_request(response)
+        return response
+
+    if not ENDPOINTS:
+        return
+
+    def authorized():
+        return not ENDPOINTS_TOKEN or flask.request.headers.get('Authorization') == f'Bearer {ENDPOINTS_TOKEN}'
+
+    @server.route('/metrics')
+    def prometheus_metrics():
+        if not authorized():
+            flask.abort(401)
+        extra = extra_metrics() if extra_metrics else ()
+        return flask.Response(PROFILER.prometheus(extra), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/debug/profile', methods=['GET', 'POST'])
+    def debug_profile():
+        if not authorized():
+            flask.abort(401)
+        if flask.request.method == 'GET' and flask.request.args.get('format') == 'text':
+            return flask.Response(PROFILER.samples.report(), mimetype='text/plain')
+        summary = PROFILER.summary()
+        if flask.request.method == 'POST':
+            PROFILER.reset()
+        return flask.jsonify(summary)
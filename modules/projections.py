@@ -0,0 +1,191 @@
+import numpy as np
+
+# --- 1. CONFIGURACIÓN ---
+# Años proyectados por defecto y máximo que ofrece el slider del dashboard
+DEFAULT_HORIZON = 5
+MAX_HORIZON = 15
+# Multiplicador del escenario: 1 repite el crecimiento ajustado, 0 lo congela, 2 lo dobla
+MIN_MULTIPLIER = 0.0
+MAX_MULTIPLIER = 2.0
+# Suavizado exponencial doble (Holt): peso del último dato en el nivel y en la tendencia
+HOLT_ALPHA = 0.6
+HOLT_BETA = 0.3
+
+
+class FittedModel:
+    """
+    Parámetros de un modelo ajustado a la vez para todas las filas de una
+    matriz filas × años: el punto de partida (`anchor`, en `anchor_year`) y el
+    ritmo (`rate`). Con `compound`, `rate` es una tasa anual (0.03 = 3 %) que
+    se compone cada año; si no, una pendiente en unidades de la métrica por
+    año. Las filas con menos de dos datos quedan en NaN.
+    """
+
+    __slots__ = ('anchor', 'anchor_year', 'rate', 'compound')
+
+    def __init__(self, anchor, anchor_year, rate, compound):
+        self.anchor = anchor
+        self.anchor_year = anchor_year
+        self.rate = rate
+        self.compound = compound
+
+    def arrays(self):
+        return [self.anchor, self.anchor_year, self.rate]
+
+
+class ProjectionModel:
+    """Modelo registrado: `fit(years, matrix)` devuelve un `FittedModel` con una entrada por fila."""
+
+    def __init__(self, name, label, fit):
+        self.name = name
+        self.label = label
+        self.fit = fit
+
+
+PROJECTION_MODELS = {}
+
+
+def register_model(name, label):
+    """Decorador que registra `fit(years, matrix)` como modelo de proyección `name`."""
+    def decorator(fit):
+        PROJECTION_MODELS[name] = ProjectionModel(name, label, fit)
+        return fit
+    return decorator
+
+
+def model_options():
+    """Opciones del selector de modelo del dashboard, en orden de registro."""
+    return [{'label': model.label, 'value': name} for name, model in PROJECTION_MODELS.items()]
+
+
+# --- 2. AJUSTE POR LOTES ---
+# Cada ajuste opera sobre la matriz completa con máscaras de NaN: ningún bucle
+# recorre los países (Holt recorre los años, que son pocos).
+def _last_observed(years, matrix, present):
+    """(valor, año) del último dato de cada fila; NaN en las filas sin datos."""
+    rows = np.arange(matrix.shape[0])
+    last = matrix.shape[1] - 1 - present[:, ::-1].argmax(axis=1)
+    has_data = present.any(axis=1)
+    anchor = np.where(has_data, matrix[rows, last], np.nan)
+    anchor_year = np.where(has_data, years[last], np.nan)
+    return anchor, anchor_year
+
+
+def _trend_slope(x, y, present):
+    """Pendiente por mínimos cuadrados de `y` frente a `x` en cada fila, solo con sus datos."""
+    weights = present.astype(np.float64)
+    count = weights.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = (weights * x).sum(axis=1) / count
+        y_filled = np.where(present, y, 0.0)
+        y_mean = y_filled.sum(axis=1) / count
+        dx = (x - x_mean[:, np.newaxis]) * weights
+        slope = (dx * (y_filled - y_mean[:, np.newaxis])).sum(axis=1) / (dx * dx).sum(axis=1)
+    return np.where(count >= 2, slope, np.nan)
+
+
+def _as_float(years, matrix):
+    return np.asarray(years, dtype=np.float64), np.asarray(matrix, dtype=np.float64)
+
+
+@register_model('cagr', 'CAGR')
+def fit_cagr(years, matrix):
+    """Tasa compuesta entre el primer y el último dato positivo de cada fila."""
+    years, matrix = _as_float(years, matrix)
+    present = ~np.isnan(matrix) & (matrix > 0)
+    rows = np.arange(matrix.shape[0])
+    first = present.argmax(axis=1)
+    anchor, anchor_year = _last_observed(years, matrix, present)
+    elapsed = anchor_year - years[first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.power(anchor / matrix[rows, first], 1.0 / elapsed) - 1
+    return FittedModel(anchor, anchor_year, np.where(elapsed > 0, rate, np.nan), compound=True)
+
+
+@register_model('linear', 'Tendencia lineal')
+def fit_linear(years, matrix):
+    """Pendiente de la recta de mínimos cuadrados, aplicada desde el último dato."""
+    years, matrix = _as_float(years, matrix)
+    present = ~np.isnan(matrix)
+    anchor, anchor_year = _last_observed(years, matrix, present)
+    return FittedModel(anchor, anchor_year, _trend_slope(years, matrix, present), compound=False)
+
+
+@register_model('log_linear', 'Tendencia log-lineal')
+def fit_log_linear(years, matrix):
+    """Recta sobre el logaritmo: crecimiento porcentual constante estimado con todos los datos."""
+    years, matrix = _as_float(years, matrix)
+    present = ~np.isnan(matrix) & (matrix > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.log(np.where(present, matrix, 1.0))
+    anchor, anchor_year = _last_observed(years, matrix, present)
+    return FittedModel(anchor, anchor_year, np.expm1(_trend_slope(years, logs, present)), compound=True)
+
+
+@register_model('holt', 'Suavizado exponencial')
+def fit_holt(years, matrix, alpha=HOLT_ALPHA, beta=HOLT_BETA):
+    """
+    Suavizado exponencial doble (Holt): nivel y tendencia se actualizan año a
+    año con todas las filas a la vez. El nivel arranca en el primer dato y la
+    tendencia en la diferencia con el segundo; los años sin dato se saltan.
+    Como en el resto de modelos, la proyección parte del último dato (no del
+    nivel suavizado, que dejaría un salto en el gráfico) y avanza con la
+    tendencia suavizada.
+    """
+    years, matrix = _as_float(years, matrix)
+    rows = matrix.shape[0]
+    level = np.full(rows, np.nan)
+    trend = np.full(rows, np.nan)
+    seen = np.full(rows, np.nan)
+    for col, year in enumerate(years):
+        values = matrix[:, col]
+        has = ~np.isnan(values)
+        started = has & ~np.isnan(level)
+        with np.errstate(invalid='ignore'):
+            elapsed = year - seen
+        first = has & np.isnan(level)
+        second = started & np.isnan(trend)
+        update = started & ~np.isnan(trend)
+
+        predicted = level + trend * elapsed
+        smoothed = alpha * values + (1 - alpha) * predicted
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_trend = np.where(
+                update, beta * (smoothed - level) / elapsed + (1 - beta) * trend, (values - level) / elapsed
+            )
+        trend = np.where(update | second, new_trend, trend)
+        level = np.where(update, smoothed, np.where(first | second, values, level))
+        seen = np.where(has, year, seen)
+    anchor, anchor_year = _last_observed(years, matrix, ~np.isnan(matrix))
+    return FittedModel(anchor, anchor_year, trend, compound=False)
+
+
+def fit_model(name, years, matrix):
+    """`FittedModel` del modelo registrado `name`. KeyError si no existe."""
+    return PROJECTION_MODELS[name].fit(years, matrix)
+
+
+# --- 3. ESCENARIOS ---
+def project(fitted, start_year, horizon=DEFAULT_HORIZON, multiplier=1.0, rows=None):
+    """
+    (años, matriz filas × años) desde `start_year` hasta `start_year + horizon`
+    con el crecimiento ajustado multiplicado por `multiplier`. Solo
+    aritmética sobre los parámetros ya ajustados: recalcular un escenario no
+    vuelve a ajustar nada. `rows` limita el cálculo a esas filas. Las filas
+    cuyo último dato es anterior a `start_year` se proyectan desde ese dato;
+    los valores nunca bajan de cero. Las filas sin ritmo ajustado (menos de
+    dos datos) quedan enteras en NaN, también en el año de partida.
+    """
+    years = np.arange(int(start_year), int(start_year) + int(horizon) + 1)
+    anchor, anchor_year, rate = fitted.anchor, fitted.anchor_year, fitted.rate
+    if rows is not None:
+        anchor, anchor_year, rate = anchor[rows], anchor_year[rows], rate[rows]
+    steps = np.maximum(years[np.newaxis, :] - anchor_year[:, np.newaxis], 0)
+    scaled = rate[:, np.newaxis] * multiplier
+    if fitted.compound:
+        values = anchor[:, np.newaxis] * np.power(np.maximum(1 + scaled, 0), steps)
+    else:
+        values = np.maximum(anchor[:, np.newaxis] + scaled * steps, 0)
+    # NaN ** 0 vale 1: sin la máscara, el año de partida conservaría el ancla
+    values[np.isnan(rate)] = np.nan
+    return years, values
@@ -0,0 +1,417 @@
+"""
+Informes estáticos del dashboard: una instantánea por país y otra por
+continente, con los mismos KPIs, figuras y clasificación que muestra app.py
+para esa selección (modules.analyzer y modules.figures).
+
+El dataset se prepara una sola vez en el proceso principal y las instantáneas
+se reparten entre un pool de procesos. Con 'fork' los workers heredan el
+DataFrame y su almacén analítico ya construidos; con 'spawn' o 'forkserver'
+cada worker lo lee de la caché de data/cache. Cada instantánea guarda en
+manifest.json un hash de los datos que dibuja (filas de sus países, su puesto
+en las clasificaciones, versión del renderizador y formatos): las que no han
+cambiado desde la ejecución anterior no se vuelven a generar.
+
+HTML siempre (todas comparten un único plotly.min.js); PNG y PDF de cada
+figura solo si está instalado el paquete opcional 'kaleido'.
+
+    python -m modules.snapshots                          # HTML en reports/
+    python -m modules.snapshots --format html,png --workers 4
+    python -m modules.snapshots --only Spain --force
+"""
+import argparse
+import hashlib
+import html
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from modules.analytics_store import get_store
+from modules.analyzer import analyze_ranking, selection_kpis
+from modules import figures
+
+logger = logging.getLogger(__name__)
+
+# --- 1. CONFIGURACIÓN ---
+# Cambiarlo invalida todas las instantáneas ya generadas (p. ej. al modificar la plantilla)
+RENDERER_VERSION = 1
+FORMATS = ('html', 'png', 'pdf')
+IMAGE_FORMATS = ('png', 'pdf')
+MANIFEST_NAME = 'manifest.json'
+PLOTLYJS_NAME = 'plotly.min.js'
+# Países de un continente que entran en sus gráficos de evolución y crecimiento
+CONTINENT_TOP = 10
+IMAGE_SIZE = (1100, 500)
+METRIC_LABELS = {'total': 'PIB Total', 'per_capita': 'PIB Per Cápita'}
+KPI_LABELS = (
+    'GDP Actual / Selección', 'Máximo PIB del Período', 'Mínimo PIB del Período', 'Mayor Crecimiento Promedio',
+)
+
+# DataFrame de los workers: heredado del proceso principal con 'fork' o leído en `_init_worker`
+_WORKER_DF = None
+
+
+class Snapshot:
+    """Una instantánea: `kind` ('pais' o 'continente'), su nombre y los países que abarca."""
+
+    __slots__ = ('kind', 'name', 'countries')
+
+    def __init__(self, kind, name, countries):
+        self.kind = kind
+        self.name = name
+        self.countries = tuple(countries)
+
+    @property
+    def slug(self):
+        ascii_name = unicodedata.normalize('NFKD', self.name).encode('ascii', 'ignore').decode()
+        text = re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')
+        return f'{self.kind}-{text or "sin-nombre"}'
+
+
+# --- 2. INSTANTÁNEAS Y HUELLAS ---
+def build_snapshots(df, only=None):
+    """Instantáneas de todos los países y continentes; `only` filtra por texto en el nombre."""
+    store = get_store(df)
+    snapshots = [Snapshot('pais', country, [country]) for country in store.countries]
+    continents = pd.Series(store.countries).groupby(np.asarray(store.continents, dtype=object), sort=True)
+    for continent, members in continents:
+        if continent and continent != 'Unknown':
+            snapshots.append(Snapshot('continente', continent, members.tolist()))
+    if only:
+        snapshots = [snapshot for snapshot in snapshots if only.lower() in snapshot.name.lower()]
+    return snapshots
+
+
+def snapshot_digest(df, snapshot, formats):
+    """
+    Hash de todo lo que dibuja la instantánea: las series de sus países, su
+    puesto en las clasificaciones del último año (depende del resto de países),
+    la versión del renderizador, la de plotly y los formatos pedidos.
+    """
+    import plotly
+
+    store = get_store(df)
+    rows = [store.country_index[country] for country in snapshot.countries]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((RENDERER_VERSION, plotly.__version__, snapshot.kind, snapshot.countries, formats)).encode())
+    for block in store.metrics.values():
+        digest.update(block.years.tobytes())
+        digest.update(np.ascontiguousarray(block.matrix[rows]).tobytes())
+    digest.update(store.pop_years.tobytes())
+    digest.update(np.ascontiguousarray(store.population[rows]).tobytes())
+    for ranking in store.rankings.values():
+        if len(ranking.years):
+            year = ranking.years[-1]
+            positions = [(ranking.rank(year, row), ranking.percentile(year, row)) for row in rows]
+            digest.update(repr((int(year), ranking.total(year), positions)).encode())
+    return digest.hexdigest()
+
+
+def available_formats(requested):
+    """Los formatos de `requested` que se pueden generar aquí (PNG y PDF necesitan 'kaleido')."""
+    unknown = set(requested) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Formatos no soportados: {', '.join(sorted(unknown))}.")
+    formats = tuple(fmt for fmt in FORMATS if fmt in requested)
+    if any(fmt in IMAGE_FORMATS for fmt in formats) and importlib.util.find_spec('kaleido') is None:
+        logger.warning("Sin el paquete 'kaleido' no se generan imágenes: solo HTML.")
+        formats = tuple(fmt for fmt in formats if fmt not in IMAGE_FORMATS)
+    return formats
+
+
+# --- 3. RENDERIZADO ---
+def snapshot_content(df, snapshot):
+    """
+    (KPIs por métrica, [(clave, figura)], {métrica: (año, clasificación)}) de
+    la instantánea; las clasificaciones son las del último año.
+    """
+    countries = list(snapshot.countries)
+    store = get_store(df)
+    rankings = {
+        metric_type: (int(store.rankings[metric_type].years[-1]), analyze_ranking(df, metric_type, None, 0, countries))
+        for metric_type in METRIC_LABELS if len(store.rankings[metric_type].years)
+    }
+    kpis = {metric_type: selection_kpis(df, countries, metric_type) for metric_type in METRIC_LABELS}
+
+    plotted = countries
+    if len(countries) > CONTINENT_TOP and 'total' in rankings and rankings['total'][1] is not None:
+        plotted = rankings['total'][1].sort_values('rank')['country'].head(CONTINENT_TOP).tolist()
+    charts = [
+        (f'evolucion-{metric_type}', figures.country_evolution_figure(df, plotted, metric_type))
+        for metric_type in METRIC_LABELS
+    ]
+    charts.append(('crecimiento', figures.growth_comparison_figure(df, plotted)))
+    if snapshot.kind == 'continente':
+        for key, fig in charts:
+            fig.update_layout(title_text=f'{fig.layout.title.text} · {snapshot.name} (top {len(plotted)})')
+    return kpis, charts, rankings
+
+
+def _ranking_html(metric_type, year, table):
+    if table is None or table.empty:
+        return ''
+    table = table.sort_values('rank')
+    unit = '{:,.2f} B' if metric_type == 'total' else '${:,.0f}'
+    header = '<tr><th>Puesto</th><th>País</th><th>Valor</th><th>Percentil</th>'
+    header += '<th>Cuota</th></tr>' if 'share_percent' in table else '</tr>'
+    body = []
+    for row in table.itertuples(index=False):
+        cells = [str(row.rank), html.escape(str(row.country)), unit.format(row.value), f'{row.percentile:.1f}']
+        if 'share_percent' in table:
+            cells.append(f'{row.share_percent:.2f}%')
+        body.append('<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>')
+    return f'<h2>Clasificación · {METRIC_LABELS[metric_type]} ({year})</h2><table>{header}{"".join(body)}</table>'
+
+
+def snapshot_html(snapshot, kpis, charts, rankings):
+    """Página HTML autónoma salvo por plotly.min.js, que se enlaza desde el mismo directorio."""
+    import plotly.io as pio
+
+    kind = 'País' if snapshot.kind == 'pais' else 'Continente'
+    parts = [
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">',
+        f'<title>{html.escape(snapshot.name)} · VIZ-PIB</title>',
+        f'<script src="{PLOTLYJS_NAME}"></script>',
+        '<style>body{background:#222;color:#ddd;font-family:sans-serif;margin:24px}'
+        'table{border-collapse:collapse;margin-bottom:24px}td,th{border:1px solid #444;padding:4px 10px;text-align:right}'
+        'th{background:#303030}td:nth-child(2){text-align:left}</style></head><body>',
+        f'<h1>{html.escape(snapshot.name)} <small>({kind})</small></h1>',
+    ]
+    if snapshot.kind == 'continente':
+        parts.append(f'<p>{len(snapshot.countries)} países.</p>')
+    for metric_type, values in kpis.items():
+        parts.append(f'<h2>KPIs · {METRIC_LABELS[metric_type]}</h2><table>')
+        parts += [f'<tr><th>{label}</th><td>{html.escape(value)}</td></tr>' for label, value in zip(KPI_LABELS, values)]
+        parts.append('</table>')
+    for key, fig in charts:
+        parts.append(pio.to_html(
+            fig, full_html=False, include_plotlyjs=False, div_id=key,
+            default_height=f'{IMAGE_SIZE[1]}px', config={'displaylogo': False},
+        ))
+    parts += [_ranking_html(metric_type, year, table) for metric_type, (year, table) in rankings.items()]
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def render_snapshot(snapshot, out_dir, formats):
+    """
+    Genera los ficheros de una instantánea en `out_dir` (se ejecuta en los
+    workers) y devuelve (slug, [ficheros], segundos).
+    """
+    start = time.perf_counter()
+    kpis, charts, rankings = snapshot_content(_WORKER_DF, snapshot)
+    files = []
+    if 'html' in formats:
+        name = f'{snapshot.slug}.html'
+        _write_atomic(os.path.join(out_dir, name), snapshot_html(snapshot, kpis, charts, rankings).encode('utf-8'))
+        files.append(name)
+    images = [
+        (fig, f'{snapshot.slug}-{key}.{fmt}') for fmt in formats if fmt in IMAGE_FORMATS for key, fig in charts
+    ]
+    if images:
+        import plotly.io as pio
+
+        # Una sola llamada por instantánea: kaleido reutiliza el navegador para todas sus imágenes
+        width, height = IMAGE_SIZE
+        pio.write_images(
+            [fig for fig, _ in images], [os.path.join(out_dir, name) for _, name in images], width=width, height=height
+        )
+        files += [name for _, name in images]
+    return snapshot.slug, files, time.perf_counter() - start
+
+
+def _init_worker(gdp_path, pop_path):
+    """Con 'spawn' o 'forkserver' el worker no hereda el DataFrame: lo lee de la caché de data/cache."""
+    global _WORKER_DF
+    if _WORKER_DF is None:
+        from modules.ingestion import Dataset
+
+        _WORKER_DF = Dataset(gdp_path, pop_path).df
+    figures.template()
+
+
+# --- 4. MANIFIESTO ---
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    data = json.dumps(manifest, indent=2, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME), data)
+
+
+def is_current(entry, digest, out_dir):
+    """True si la instantánea ya está generada con este hash y no falta ninguno de sus ficheros."""
+    return (
+        entry is not None and entry.get('digest') == digest
+        and all(os.path.exists(os.path.join(out_dir, name)) for name in entry.get('files', ()))
+    )
+
+
+def write_plotlyjs(out_dir):
+    from plotly.offline import get_plotlyjs
+
+    path = os.path.join(out_dir, PLOTLYJS_NAME)
+    body = get_plotlyjs().encode('utf-8')
+    if not os.path.exists(path) or os.path.getsize(path) != len(body):
+        _write_atomic(path, body)
+
+
+# --- 5. EJECUCIÓN ---
+def render_all(df, out_dir, formats=('html',), workers=None, only=None, force=False, start_method=None,
+               gdp_path=None, pop_path=None):
+    """
+    Genera las instantáneas que falten o hayan cambiado y devuelve las cifras
+    de la ejecución (ver `throughput_report`). Con `workers` <= 1 se renderiza
+    en este mismo proceso, sin pool.
+    """
+    global _WORKER_DF
+    os.makedirs(out_dir, exist_ok=True)
+    formats = available_formats(formats)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+
+    snapshots = build_snapshots(df, only)
+    manifest = load_manifest(out_dir)
+    entries = manifest.setdefault('snapshots', {})
+    digests = {snapshot.slug: snapshot_digest(df, snapshot, formats) for snapshot in snapshots}
+    pending = [
+        snapshot for snapshot in snapshots if force or not is_current(entries.get(snapshot.slug), digests[snapshot.slug], out_dir)
+    ]
+    if 'html' in formats and pending:
+        write_plotlyjs(out_dir)
+    planned = time.perf_counter() - start
+
+    # Todo lo que los workers comparten se prepara antes de crearlos: con 'fork' lo heredan
+    _WORKER_DF = df
+    figures.template()
+    method = start_method or ('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    render_seconds, failed, written = [], [], 0
+
+    def record(slug, files, seconds):
+        nonlocal written
+        entries[slug] = {'digest': digests[slug], 'files': files}
+        render_seconds.append(seconds)
+        written += sum(os.path.getsize(os.path.join(out_dir, name)) for name in files)
+
+    try:
+        if workers <= 1 or len(pending) <= 1:
+            method = 'inline'
+            for snapshot in pending:
+                try:
+                    record(*render_snapshot(snapshot, out_dir, formats))
+                except Exception:
+                    logger.exception('Fallo al generar la instantánea %s.', snapshot.slug)
+                    failed.append(snapshot.slug)
+        else:
+            context = multiprocessing.get_context(method)
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)), mp_context=context,
+                initializer=_init_worker, initargs=(gdp_path, pop_path),
+            ) as executor:
+                futures = {executor.submit(render_snapshot, snapshot, out_dir, formats): snapshot for snapshot in pending}
+                for future in as_completed(futures):
+                    slug = futures[future].slug
+                    try:
+                        record(*future.result())
+                    except Exception:
+                        logger.error('Fallo al generar la instantánea %s.', slug, exc_info=future.exception())
+                        failed.append(slug)
+    finally:
+        # Lo ya generado queda registrado aunque la ejecución se interrumpa
+        manifest['renderer'] = RENDERER_VERSION
+        save_manifest(out_dir, manifest)
+
+    return {
+        'snapshots': len(snapshots),
+        'countries': sum(snapshot.kind == 'pais' for snapshot in snapshots),
+        'continents': sum(snapshot.kind == 'continente' for snapshot in snapshots),
+        'rendered': len(render_seconds),
+        'skipped': len(snapshots) - len(pending),
+        'failed': failed,
+        'formats': formats,
+        'workers': 1 if method == 'inline' else min(workers, len(pending)),
+        'start_method': method,
+        'plan_seconds': planned,
+        'total_seconds': time.perf_counter() - start,
+        'render_seconds': render_seconds,
+        'bytes_written': written,
+    }
+
+
+def throughput_report(stats):
+    """Líneas de texto con el rendimiento de una ejecución de `render_all`."""
+    rendered, elapsed = stats['rendered'], stats['total_seconds']
+    lines = [
+        f"Instantáneas: {stats['snapshots']} ({stats['countries']} países, {stats['continents']} continentes); "
+        f"formatos: {', '.join(stats['formats'])}",
+        f"Generadas: {rendered}   sin cambios (omitidas): {stats['skipped']}   fallidas: {len(stats['failed'])}",
+        f"Workers: {stats['workers']} ({stats['start_method']})   CPUs: {os.cpu_count()}",
+        f"Tiempo total: {elapsed:.2f} s (hashes y plan: {stats['plan_seconds'] * 1000:.0f} ms)",
+    ]
+    if rendered:
+        seconds = sorted(stats['render_seconds'])
+        p95 = seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+        lines += [
+            f"Rendimiento: {rendered / elapsed:.1f} instantáneas/s   "
+            f"por instantánea: mediana {statistics.median(seconds) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms",
+            f"Escrito: {stats['bytes_written'] / 1024 / 1024:.1f} MB",
+        ]
+    return lines
+
+
+# --- 6. PROGRAMA ---
+def main():
+    parser = argparse.ArgumentParser(description='Informes estáticos de VIZ-PIB por país y por continente.')
+    parser.add_argument('--gdp', default=os.environ.get('VIZPIB_GDP_PATH', 'data/2020-2025.csv'))
+    parser.add_argument('--pop', default=os.environ.get('VIZPIB_POP_PATH', 'data/world_population.csv'))
+    parser.add_argument('--out', default='reports', help='Directorio de salida (por defecto reports/)')
+    parser.add_argument('--format', default='html', help=f"Formatos separados por comas: {', '.join(FORMATS)}")
+    parser.add_argument('--workers', type=int, help='Procesos del pool; por defecto uno por CPU')
+    parser.add_argument('--start-method', choices=('fork', 'forkserver', 'spawn'))
+    parser.add_argument('--only', help='Solo las instantáneas cuyo nombre contenga este texto')
+    parser.add_argument('--force', action='store_true', help='Regenera también las que no han cambiado')
+    args = parser.parse_args()
+
+    from modules.ingestion import Dataset
+    from modules.logs import configure_logging
+
+    configure_logging()
+    start = time.perf_counter()
+    df = Dataset(args.gdp, args.pop).df
+    loaded = time.perf_counter() - start
+
+    stats = render_all(
+        df, args.out, [fmt.strip() for fmt in args.format.split(',') if fmt.strip()], args.workers,
+        args.only, args.force, args.start_method, args.gdp, args.pop,
+    )
+    print(f'\nCarga de datos: {loaded:.2f} s')
+    print('\n'.join(throughput_report(stats)))
+    print(f">>> Instantáneas en {os.path.abspath(args.out)}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+import flask
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete 'brotli' solo se ofrece gzip
+    brotli = None
+
+# --- 1. CONFIGURACIÓN ---
+# Por debajo de este tamaño la compresión no compensa.
+MIN_COMPRESS_BYTES = int(os.environ.get('VIZPIB_COMPRESS_MIN_BYTES', 1024))
+# Respuestas de Dash que se comprimen: figuras y tabla de los callbacks, el layout y las dependencias
+DASH_ENDPOINTS = ('/_dash-update-component', '/_dash-layout', '/_dash-dependencies')
+# Niveles para respuestas generadas en cada petición: casi toda la reducción por una fracción del tiempo
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Niveles máximos solo para los assets, que se comprimen una vez al arrancar
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+# Respuestas a partir de este tamaño se comprimen una sola vez mientras sus bytes se
+# repitan (el layout, figuras servidas desde la caché): basta un hash del cuerpo
+CACHE_MIN_BYTES = 64 * 1024
+CACHE_ENTRIES = 16
+# Los assets con huella no cambian nunca bajo la misma URL
+IMMUTABLE = 'public, max-age=31536000, immutable'
+TEXT_ASSETS = ('.css', '.js', '.json', '.svg', '.txt', '.map')
+
+
+# --- 2. COMPRESIÓN ---
+def accepted_encoding():
+    """'br', 'gzip' o None según el `Accept-Encoding` de la petición en curso."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return flask.request.accept_encodings.best_match(offered)
+
+
+def compress(body, encoding, brotli_quality=BROTLI_QUALITY):
+    """
+    (cuerpo, codificación aplicada); sin comprimir si no hay codificación o el
+    cuerpo es pequeño. Por defecto con los niveles de las respuestas dinámicas.
+    """
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality), 'br'
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+
+
+class ResponseCompressor:
+    """
+    Compresión de las respuestas dinámicas con sus contadores para /metrics. Los
+    cuerpos grandes se guardan ya comprimidos (LRU de `max_entries`, por hash
+    del contenido y codificación): el layout de la escala grande pesa ~1,4 MB
+    y gzip tarda ~110 ms en cada carga de página.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hits = 0
+
+    def compress(self, body, encoding):
+        key = None
+        if encoding is not None and len(body) >= CACHE_MIN_BYTES:
+            key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self.cache_hits += 1
+                    self._record(len(body), len(cached))
+                    return cached, encoding
+        compressed, applied = compress(body, encoding)
+        if applied:
+            with self._lock:
+                if key is not None:
+                    self._entries[key] = compressed
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                self._record(len(body), len(compressed))
+        return compressed, applied
+
+    def _record(self, bytes_in, bytes_out):
+        self.responses += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def prometheus(self):
+        return [
+            '# TYPE vizpib_compressed_responses_total counter', f'vizpib_compressed_responses_total {self.responses}',
+            '# TYPE vizpib_compressed_bytes_in_total counter', f'vizpib_compressed_bytes_in_total {self.bytes_in}',
+            '# TYPE vizpib_compressed_bytes_out_total counter', f'vizpib_compressed_bytes_out_total {self.bytes_out}',
+            '# TYPE vizpib_compressed_cache_hits_total counter', f'vizpib_compressed_cache_hits_total {self.cache_hits}',
+        ]
+
+
+COMPRESSION = ResponseCompressor()
+
+
+def install_compression(server, endpoints=DASH_ENDPOINTS):
+    """
+    Comprime con brotli o gzip (según `Accept-Encoding`) las respuestas de
+    `endpoints` a partir de MIN_COMPRESS_BYTES. Se registra antes que el resto
+    de hooks `after_request` para ejecutarse el último (Flask los recorre en
+    orden inverso): la instrumentación sigue midiendo el JSON sin comprimir.
+    """
+    @server.after_request
+    def _compress_response(response):
+        if (
+            not flask.request.path.endswith(endpoints)
+            or response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+        compressed, applied = COMPRESSION.compress(response.get_data(), accepted_encoding())
+        if applied:
+            response.set_data(compressed)
+            response.headers['Content-Encoding'] = applied
+        return response
+
+
+# --- 3. ASSETS CON HUELLA ---
+class AssetManifest:
+    """
+    Huella (sha256 del contenido, 12 caracteres) de cada fichero de `folder`.
+    `url(path)` devuelve '<prefix>/<huella>/<path>': una URL distinta por
+    contenido que el navegador puede guardar para siempre. Los ficheros de
+    texto se guardan ya comprimidos en memoria (son pocos y pequeños). Se
+    leen una sola vez, al construir el manifiesto: un asset cambiado se sirve
+    con la aplicación siguiente.
+    """
+
+    def __init__(self, folder, prefix='/_assets'):
+        self.folder = folder
+        self.prefix = prefix
+        self.files = {}
+        for current, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.relpath(os.path.join(current, name), folder).replace(os.sep, '/')
+                self.files[path] = self._entry(path)
+
+    def _entry(self, path):
+        with open(os.path.join(self.folder, path), 'rb') as fh:
+            body = fh.read()
+        entry = {'digest': hashlib.sha256(body).hexdigest()[:12], 'identity': body}
+        if path.endswith(TEXT_ASSETS):
+            entry['gzip'] = gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                entry['br'] = brotli.compress(body, quality=STATIC_BROTLI_QUALITY)
+        return entry
+
+    def url(self, path):
+        return f"{self.prefix}/{self.files[path]['digest']}/{path}"
+
+    def blueprint(self):
+        """
+        Sirve '<prefix>/<huella>/<path>' con `Cache-Control: immutable`. Una
+        huella que no coincide (una página de la versión anterior, o una URL
+        inventada) redirige a la URL actual sin leer ni comprimir nada: el
+        manifiesto no se modifica desde las peticiones.
+        """
+        bp = flask.Blueprint('assets_manifest', __name__)
+
+        @bp.route(f'{self.prefix}/<digest>/<path:path>')
+        def fingerprinted_asset(digest, path):
+            if path not in self.files:
+                flask.abort(404)
+            entry = self.files[path]
+            if entry['digest'] != digest:
+                response = flask.redirect(self.url(path))
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            encoding = accepted_encoding()
+            body = entry.get(encoding) if encoding else None  # Solo los de texto tienen versión comprimida
+            response = flask.Response(body or entry['identity'], mimetype=mimetypes.guess_type(path)[0])
+            if body is not None:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = IMMUTABLE
+            response.set_etag(entry['digest'])
+            return response
+
+        return bp
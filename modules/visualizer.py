@@ -1,6 +1,14 @@
 from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
 
+from modules.analytics_store import get_store
+from modules.data_table import PAGE_SIZE, LEADERBOARD_COLUMNS, table_columns
+from modules.presets import preset_options
+from modules.projections import DEFAULT_HORIZON, MAX_HORIZON, MIN_MULTIPLIER, MAX_MULTIPLIER, model_options
+
+# Economías que muestran por defecto el pie y la clasificación
+DEFAULT_RANKING_N = 5
+
 def create_kpi_card(title, value_id):
     """Función auxiliar para crear una tarjeta de KPI."""
     return dbc.Card(
@@ -12,12 +20,45 @@ def create_kpi_card(title, value_id):
         className="text-center shadow-sm h-100" # El tema DARKLY hace las tarjetas oscuras
     )
 
-def create_layout(df):
+def data_control_props(df):
+    """
+    Propiedades de los controles que dependen de los años y países presentes en
+    los datos. Las usa el layout inicial y el callback que las refresca cuando
+    llegan datos nuevos. Los grupos predefinidos (G7, BRICS…) encabezan las
+    opciones de países. Sin `df` (datos aún sin preparar), todas vacías.
+    """
+    if df is None:
+        return {
+            'country_options': [], 'continent_year_options': [], 'continent_year_value': None,
+            'ranking_year_options': [], 'ranking_year_value': None, 'map_years': [], 'table_columns': [],
+        }
+    store = get_store(df)
+    continent_years = [int(year) for year in store.years[1:]]
+    ranking_years = [int(year) for year in store.years[::-1]]
+    return {
+        'country_options': preset_options(df) + [{'label': country, 'value': country} for country in df['Country'].unique()],
+        'continent_year_options': [{'label': str(year), 'value': year} for year in continent_years],
+        'continent_year_value': continent_years[-1] if continent_years else None,
+        'ranking_year_options': [{'label': str(year), 'value': year} for year in ranking_years],
+        'ranking_year_value': ranking_years[0] if ranking_years else None,
+        'map_years': [int(year) for year in store.pop_years],
+        'table_columns': table_columns(df),
+    }
+
+def create_layout(df, population_map=None, distribution_pie=None, leaderboard=None, refresh_seconds=60, data_version=None):
     """
     Crea el layout de la aplicación Dash usando Dash Bootstrap Components (Modo Oscuro).
+    Si se pasa `population_map`, el mapa se envía ya construido con el layout y
+    el slider lo actualiza en el navegador. `distribution_pie` y `leaderboard`
+    (filas de la clasificación) llegan igual, ya construidos para los valores
+    por defecto de sus selectores. `data_version` es la versión del dataset con
+    que se construyó el layout: mientras no cambie, el navegador no pide de
+    nuevo sus controles. Con `df=None` devuelve el esqueleto del layout, con
+    todos sus componentes pero sin datos.
     """
-    country_options = [{'label': country, 'value': country} for country in df['Country'].unique()]
-    map_years = [1970, 1980, 1990, 2000, 2010, 2015, 2020, 2022]
+    props = data_control_props(df)
+    country_options = props['country_options']
+    map_years = props['map_years']
 
     # --- Encabezado ---
     header = dbc.Navbar(
@@ -96,12 +137,51 @@ def create_layout(df):
                 ],
                 className="mb-4"
             ),
+            # Progreso de las comparaciones que se calculan en segundo plano
+            dbc.Row(
+                dbc.Col(dbc.Progress(id='kpi-progress', value=0, max=3, striped=True, animated=True)),
+                id='kpi-progress-row',
+                style={'display': 'none'},
+                className="mb-4"
+            ),
             
             # Fila Gráfico Principal
             dbc.Row(
                 dbc.Col(
                     dbc.Card(
-                        dbc.CardBody(dcc.Graph(id='gdp-evolution-graph', style={'height': '50vh'})),
+                        dbc.CardBody([
+                            dcc.Graph(id='gdp-evolution-graph', style={'height': '50vh'}),
+                            # Proyección de los países seleccionados: modelo, años y escenario
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id='projection-model',
+                                            options=[{'label': 'Sin proyección', 'value': 'none'}] + model_options(),
+                                            value='none',
+                                            clearable=False,
+                                            style={'color': '#212529'}
+                                        ),
+                                        md=4
+                                    ),
+                                    dbc.Col(
+                                        dcc.Slider(
+                                            id='projection-horizon', min=1, max=MAX_HORIZON, step=1, value=DEFAULT_HORIZON,
+                                            marks={n: f'{n} años' for n in (1, 5, 10, MAX_HORIZON)}
+                                        ),
+                                        md=4
+                                    ),
+                                    dbc.Col(
+                                        dcc.Slider(
+                                            id='projection-multiplier', min=MIN_MULTIPLIER, max=MAX_MULTIPLIER, step=0.1, value=1.0,
+                                            marks={value: f'{value:g}×' for value in (0, 0.5, 1, 1.5, 2)}
+                                        ),
+                                        md=4
+                                    ),
+                                ],
+                                className="mt-2 align-items-center"
+                            ),
+                        ]),
                         className="shadow-sm"
                     ),
                     width=12
@@ -112,7 +192,49 @@ def create_layout(df):
             # Fila Gráficos Inferiores
             dbc.Row(
                 [
-                    dbc.Col(dbc.Card(dbc.CardBody(dcc.Graph(id='gdp-distribution-pie')), className="shadow-sm"), md=4),
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody([
+                                # Métrica, año y N del top: también gobiernan la clasificación
+                                dcc.RadioItems(
+                                    id='ranking-metric',
+                                    options=[
+                                        {'label': 'PIB Total', 'value': 'total'},
+                                        {'label': 'Per Cápita', 'value': 'per_capita'}
+                                    ],
+                                    value='total',
+                                    inline=True,
+                                    inputClassName="me-1",
+                                    labelClassName="me-3"
+                                ),
+                                dbc.Row(
+                                    [
+                                        dbc.Col(
+                                            dcc.Dropdown(
+                                                id='ranking-year',
+                                                options=props['ranking_year_options'],
+                                                value=props['ranking_year_value'],
+                                                clearable=False,
+                                                style={'color': '#212529'}
+                                            ),
+                                            width=4
+                                        ),
+                                        dbc.Col(
+                                            dcc.Slider(
+                                                id='ranking-n', min=3, max=20, step=1, value=DEFAULT_RANKING_N,
+                                                marks={n: f'Top {n}' for n in (3, 5, 10, 20)}
+                                            ),
+                                            width=8
+                                        ),
+                                    ],
+                                    className="mt-2 align-items-center"
+                                ),
+                                dcc.Graph(id='gdp-distribution-pie', figure=distribution_pie or {})
+                            ]),
+                            className="shadow-sm"
+                        ),
+                        md=4
+                    ),
                     dbc.Col(dbc.Card(dbc.CardBody(dcc.Graph(id='growth-comparison-bar')), className="shadow-sm"), md=4),
                     dbc.Col(
                         dbc.Card(
@@ -120,8 +242,8 @@ def create_layout(df):
                                 html.H5("Top Continentes por Crecimiento Anual"),
                                 dcc.RadioItems(
                                     id='continent-year-selector',
-                                    options=[{'label': str(year), 'value': year} for year in range(2021, 2026)],
-                                    value=2025,
+                                    options=props['continent_year_options'],
+                                    value=props['continent_year_value'],
                                     inline=True,
                                     inputClassName="me-1",
                                     labelClassName="me-3"
@@ -136,18 +258,51 @@ def create_layout(df):
                 className="mb-4"
             ),
 
+            # Fila Clasificación: el top N del selector del pie y, debajo, los
+            # países seleccionados que queden fuera, con su puesto y percentil
+            dbc.Row(
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody([
+                            html.H5("Clasificación de Economías"),
+                            dash_table.DataTable(
+                                id='ranking-leaderboard',
+                                columns=LEADERBOARD_COLUMNS,
+                                data=leaderboard or [],
+                                style_as_list_view=True,
+                                style_cell={
+                                    'padding': '8px',
+                                    'textAlign': 'left',
+                                    'backgroundColor': '#343a40',
+                                    'color': 'white'
+                                },
+                                style_header={
+                                    'backgroundColor': '#212529',
+                                    'fontWeight': 'bold',
+                                    'color': 'white',
+                                    'borderBottom': '2px solid white'
+                                },
+                            )
+                        ]),
+                        className="shadow-sm"
+                    ),
+                    width=12
+                ),
+                className="mb-4"
+            ),
+
             # Fila Mapa
             dbc.Row(
                 dbc.Col(
                     dbc.Card(
                         dbc.CardBody([
                             html.H5("Mapa de Calor de Población Mundial (1970-2022)"),
-                            dcc.Graph(id='population-heatmap'),
+                            dcc.Graph(id='population-heatmap', figure=population_map or {}),
                             dcc.Slider(
                                 id='map-year-slider',
-                                min=min(map_years),
-                                max=max(map_years),
-                                value=max(map_years),
+                                min=min(map_years, default=0),
+                                max=max(map_years, default=0),
+                                value=max(map_years, default=None),
                                 marks={year: str(year) for year in map_years},
                                 step=None,
                                 className="mt-3"
@@ -168,6 +323,17 @@ def create_layout(df):
                             html.H5("Tabla de Datos Completos"),
                             dash_table.DataTable(
                                 id='raw-data-table',
+                                columns=props['table_columns'],
+                                # Paginación, orden y filtro se resuelven en el servidor:
+                                # solo viaja la página visible
+                                page_action='custom',
+                                page_current=0,
+                                page_size=PAGE_SIZE,
+                                sort_action='custom',
+                                sort_mode='multi',
+                                sort_by=[],
+                                filter_action='custom',
+                                filter_query='',
                                 style_table={'height': '400px', 'overflowY': 'auto'},
                                 style_as_list_view=True,
                                 
@@ -199,4 +365,15 @@ def create_layout(df):
         className="p-4" 
     )
 
-    return html.Div([header, body])
\ No newline at end of file
+    # Revisión periódica de datos nuevos (ver `update_data_controls` en app.py),
+    # selección que muestra el gráfico principal (ver `refine_evolution_window`) y
+    # peticiones de cálculo en segundo plano (ver `compute_background_selection`)
+    data_refresh = html.Div([
+        dcc.Interval(id='data-refresh-interval', interval=int(refresh_seconds * 1000)),
+        dcc.Store(id='data-version', data=data_version),
+        dcc.Store(id='evolution-view'),
+        dcc.Store(id='background-request'),
+        dcc.Store(id='background-trigger'),
+    ])
+
+    return html.Div([header, body, data_refresh])
\ No newline at end of file
@@ -0,0 +1,22 @@
+import flask
+import pytest
+
+from modules.api import ApiError, _year
+
+APP = flask.Flask(__name__)
+
+
+def requested_year(query, available=(2020, 2021)):
+    with APP.test_request_context(f'/api/population{query}'):
+        return _year(available)
+
+
+def test_year_defaults_to_the_last_available():
+    assert requested_year('') == 2021
+
+
+@pytest.mark.parametrize('query, status', [('?year=abc', 400), ('?year=-1', 400), ('?year=1999', 404)])
+def test_malformed_year_is_400_and_missing_year_is_404(query, status):
+    with pytest.raises(ApiError) as error:
+        requested_year(query)
+    assert error.value.status == status
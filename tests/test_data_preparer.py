@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from modules.data_preparer import compact_frame
+
+
+def test_compact_frame_does_not_touch_callers_frame():
+    df = pd.DataFrame({
+        'Country': pd.Categorical(['Spain', 'France']),
+        'Continent': pd.Categorical(['Europe', 'Europe']),
+        'GDP_2020': [1.0, 2.0],
+    })
+    original_index = df.index.copy()
+    compact = compact_frame(df, float32=False)  # Nada que convertir: claves ya categóricas
+    assert df.index.equals(original_index)
+    assert list(compact.index) == ['Spain', 'France']
+    assert compact.loc['France', 'GDP_2020'] == 2.0
+
+
+def test_compact_frame_converts_keys_and_floats():
+    df = pd.DataFrame({'Country': ['Spain'], 'GDP_2020': [1.5], 'Population_2020': [47.0]})
+    compact = compact_frame(df, float32=True)
+    assert isinstance(compact['Country'].dtype, pd.CategoricalDtype)
+    assert compact['GDP_2020'].dtype == np.float32
+    assert df['GDP_2020'].dtype == np.float64
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.derived_metrics import aligned_population, with_derived_columns
+
+# Dos censos (2010 y 2020) y años de PIB dentro y fuera de su rango
+CENSUS = pd.DataFrame({
+    'Country': ['A', 'B'],
+    'Population_2010': [100.0, 1_000.0],
+    'Population_2020': [200.0, np.nan],
+    'GDP_2005': [10.0, 1.0],
+    'GDP_2015': [30.0, 2.0],
+    'GDP_2025': [40.0, 3.0],
+})
+GDP_COLS = ['GDP_2005', 'GDP_2015', 'GDP_2025']
+
+
+def test_population_is_interpolated_between_censuses():
+    population = aligned_population([2010, 2020], [[100.0, 200.0]], [2012, 2015, 2020])
+    np.testing.assert_allclose(population, [[120.0, 150.0, 200.0]])
+
+
+def test_population_is_clamped_outside_census_range():
+    population = aligned_population([2010, 2020], [[100.0, 200.0]], [2000, 2030])
+    np.testing.assert_allclose(population, [[100.0, 200.0]])
+
+
+def test_missing_census_uses_the_other_end():
+    population = aligned_population([2010, 2020], [[1_000.0, np.nan]], [2005, 2015, 2025])
+    np.testing.assert_allclose(population, [[1_000.0] * 3])
+
+
+def test_per_capita_uses_population_of_its_year():
+    result = with_derived_columns(CENSUS, GDP_COLS)
+    # GDP en millones de USD: per cápita = GDP * 1e6 / población del año
+    assert result.loc[0, 'GDP_per_capita_2015'] == pytest.approx(30.0 * 1e6 / 150.0)  # Interpolado
+    assert result.loc[0, 'GDP_per_capita_2005'] == pytest.approx(10.0 * 1e6 / 100.0)  # Antes del primer censo
+    assert result.loc[0, 'GDP_per_capita_2025'] == pytest.approx(40.0 * 1e6 / 200.0)  # Después del último
+    assert result.loc[1, 'GDP_per_capita_2025'] == pytest.approx(3.0 * 1e6 / 1_000.0)
+
+
+def test_per_capita_matches_a_known_value():
+    # España 2020 en los CSV del repositorio: 1.288.751 millones de USD y 47.363.807 habitantes
+    spain = pd.DataFrame({'Country': ['Spain'], 'Population_2020': [47_363_807.0], 'GDP_2020': [1_288_751.0]})
+    result = with_derived_columns(spain, ['GDP_2020'])
+    assert result.loc[0, 'GDP_per_capita_2020'] == pytest.approx(27_209.6, abs=0.1)
@@ -0,0 +1,74 @@
+import pytest
+
+from modules.figure_cache import FigureCache
+
+
+def value(size):
+    """Valor JSON que ocupa exactamente `size` bytes serializado (un string entre comillas)."""
+    return 'x' * (size - 2)
+
+
+def test_evicts_least_recent_first():
+    cache = FigureCache(max_bytes=100)
+    for key in ('a', 'b', 'c'):
+        assert cache.put(key, value(30))
+    cache.get('a')  # 'a' pasa a ser la más reciente
+    assert cache.put('d', value(30))
+    assert 'b' not in cache
+    assert all(key in cache for key in ('a', 'c', 'd'))
+    assert cache._size <= cache.max_bytes
+
+
+def test_rejects_entry_less_popular_than_its_victims():
+    cache = FigureCache(max_bytes=100)
+    cache.put('popular', value(60))
+    for _ in range(3):
+        cache.get('popular')
+    assert not cache.put('once', value(60))
+    assert cache.rejected == 1
+    assert 'popular' in cache and 'once' not in cache
+
+
+def test_admits_entry_as_popular_as_its_victims():
+    cache = FigureCache(max_bytes=100)
+    cache.put('old', value(60))
+    cache.get('old')
+    cache.get('new')  # Fallo: también cuenta como acceso
+    assert cache.put('new', value(60))
+    assert 'old' not in cache
+    assert cache.rejected == 0
+
+
+def test_unpinned_insert_never_exceeds_budget_when_only_pinned_remain():
+    cache = FigureCache(max_bytes=100)
+    assert cache.put('preset', value(60), pinned=True)
+    assert not cache.put('selection', value(64))
+    assert cache.rejected == 1
+    assert cache._size == 60
+    assert 'preset' in cache
+
+
+def test_pinned_insert_skips_admission_but_not_budget():
+    cache = FigureCache(max_bytes=100)
+    cache.put('popular', value(50))
+    for _ in range(3):
+        cache.get('popular')
+    assert cache.put('preset', value(60), pinned=True)  # Expulsa la popular aunque se pida más
+    assert 'popular' not in cache
+    assert not cache.put('preset2', value(60), pinned=True)  # Solo quedan fijadas: no cabe
+    assert cache._size == 60
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_size_stays_within_budget_with_mixed_puts(seed):
+    import random
+
+    rng = random.Random(seed)
+    cache = FigureCache(max_bytes=500)
+    for step in range(300):
+        key = f'k{rng.randrange(40)}'
+        if rng.random() < 0.3:
+            cache.get(key)
+        cache.put(key, value(rng.randrange(10, 120)), pinned=rng.random() < 0.1)
+        assert cache._size <= cache.max_bytes
+        assert cache._size == sum(len(payload) for payload in cache._entries.values())
@@ -0,0 +1,44 @@
+import os
+import shutil
+import threading
+
+from modules import ingestion
+from modules.ingestion import Dataset
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def make_dataset(tmp_path, lazy=False):
+    gdp_path = tmp_path / 'gdp.csv'
+    gdp_path.write_text('Country,2020,2021\nSpain,1288751,x\nFrance,2639009,2957880\n')
+    pop_path = tmp_path / 'world_population.csv'
+    shutil.copy(os.path.join(DATA_DIR, 'world_population.csv'), pop_path)
+    return Dataset(str(gdp_path), str(pop_path), poll_seconds=1e9, lazy=lazy)
+
+
+def test_load_issues_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, 'MAX_LOAD_ISSUES', 3)
+    dataset = make_dataset(tmp_path)
+    assert [issue.column for issue in dataset.issues] == ['2021']
+    for _ in range(5):
+        dataset.ingest(dataset.gdp_path)  # Cada recarga vuelve a anotar la celda no numérica
+    assert len(dataset.issues) == 3
+
+
+def test_data_is_published_after_the_ready_listeners(tmp_path):
+    dataset = make_dataset(tmp_path, lazy=True)
+    events, readers = [], []
+
+    def listener(ds):
+        # El hilo de la carga ya ve los datos; cualquier otro espera a que acaben los oyentes
+        events.append(('listener', ds.version))
+        reader = threading.Thread(target=lambda: events.append(('reader', len(ds.df))))
+        reader.start()
+        reader.join(timeout=0.2)
+        events.append(('listener done', reader.is_alive()))
+        readers.append(reader)
+
+    dataset.on_ready(listener)
+    dataset.wait(timeout=10)
+    readers[0].join(timeout=10)
+    assert events == [('listener', 0), ('listener done', True), ('reader', 2)]
@@ -0,0 +1,37 @@
+import flask
+import pytest
+
+from modules import profiling
+
+
+def make_client(monkeypatch, endpoints, token=''):
+    monkeypatch.setattr(profiling, 'ENDPOINTS', endpoints)
+    monkeypatch.setattr(profiling, 'ENDPOINTS_TOKEN', token)
+    server = flask.Flask(__name__)
+    profiling.install(server)
+    return server.test_client()
+
+
+@pytest.mark.skipif(not profiling.ENABLED, reason='VIZPIB_PROFILE=0')
+def test_endpoints_are_not_registered_by_default(monkeypatch):
+    client = make_client(monkeypatch, endpoints=False)
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/debug/profile').status_code == 404
+
+
+@pytest.mark.skipif(not profiling.ENABLED, reason='VIZPIB_PROFILE=0')
+def test_token_is_required_when_configured(monkeypatch):
+    client = make_client(monkeypatch, endpoints=True, token='secreto')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secreto'}).status_code == 200
+
+
+@pytest.mark.skipif(not profiling.ENABLED, reason='VIZPIB_PROFILE=0')
+def test_only_post_resets_the_registry(monkeypatch):
+    client = make_client(monkeypatch, endpoints=True)
+    resets = []
+    monkeypatch.setattr(profiling.PROFILER, 'reset', lambda: resets.append(True))
+    assert client.get('/debug/profile?reset=1').status_code == 200
+    assert resets == []
+    assert client.post('/debug/profile').status_code == 200
+    assert resets == [True]
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from modules.projections import PROJECTION_MODELS, fit_model, project
+
+YEARS = np.arange(2015, 2021)
+MATRIX = np.array([
+    [100.0, 110.0, 121.0, 133.1, 146.41, 161.051],  # +10 % anual
+    [50.0, np.nan, 60.0, 64.0, np.nan, 75.0],        # Con huecos
+    [np.nan, np.nan, np.nan, np.nan, np.nan, 20.0],  # Un solo dato: sin proyección
+])
+
+
+@pytest.mark.parametrize('model', sorted(PROJECTION_MODELS))
+def test_projection_starts_at_last_observation(model):
+    fitted = fit_model(model, YEARS, MATRIX)
+    years, values = project(fitted, YEARS[-1], horizon=3)
+    assert years.tolist() == [2020, 2021, 2022, 2023]
+    np.testing.assert_allclose(values[:2, 0], [161.051, 75.0])
+    assert np.isnan(values[2]).all()
+
+
+def test_holt_continues_from_last_value_with_smoothed_trend():
+    fitted = fit_model('holt', YEARS, MATRIX)
+    _, values = project(fitted, YEARS[-1], horizon=2)
+    np.testing.assert_allclose(values[0], [161.051, 161.051 + fitted.rate[0], 161.051 + 2 * fitted.rate[0]])
+
+
+def test_constant_growth_models_recover_the_rate():
+    for model in ('cagr', 'log_linear'):
+        assert fit_model(model, YEARS, MATRIX).rate[0] == pytest.approx(0.10)
+
+
+def test_multiplier_scales_growth():
+    fitted = fit_model('cagr', YEARS, MATRIX)
+    _, frozen = project(fitted, YEARS[-1], horizon=2, multiplier=0)
+    _, doubled = project(fitted, YEARS[-1], horizon=1, multiplier=2)
+    np.testing.assert_allclose(frozen[0], [161.051] * 3)
+    assert doubled[0, 1] == pytest.approx(161.051 * 1.2)
+
+
+def test_without_projection_restores_the_client_figure():
+    from modules.figures import PROJECTION_META, without_projection
+    fig = {
+        'data': [
+            {'type': 'scatter', 'name': 'A'},
+            {'type': 'scatter', 'name': 'A (proyección)', 'meta': PROJECTION_META},
+        ],
+        'layout': {'title': {'text': 'Evolución del PIB Total · proyección CAGR ×1.5'}},
+    }
+    assert without_projection(fig) == {
+        'data': [{'type': 'scatter', 'name': 'A'}],
+        'layout': {'title': {'text': 'Evolución del PIB Total'}},
+    }
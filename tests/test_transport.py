@@ -0,0 +1,34 @@
+import flask
+
+from modules.transport import AssetManifest
+
+
+def make_client(tmp_path):
+    (tmp_path / 'style.css').write_text('body { color: red; }' * 100)
+    manifest = AssetManifest(str(tmp_path))
+    server = flask.Flask(__name__)
+    server.register_blueprint(manifest.blueprint())
+    return manifest, server.test_client()
+
+
+def test_current_digest_is_served_immutable(tmp_path):
+    manifest, client = make_client(tmp_path)
+    response = client.get(manifest.url('style.css'), headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_stale_digest_redirects_without_rereading(tmp_path, monkeypatch):
+    manifest, client = make_client(tmp_path)
+    entry = manifest.files['style.css']
+
+    def reread(path):
+        raise AssertionError(f'{path} releído desde una petición')
+
+    monkeypatch.setattr(manifest, '_entry', reread)
+    response = client.get('/_assets/000000000000/style.css')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(manifest.url('style.css'))
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert manifest.files['style.css'] is entry